@@ -0,0 +1,58 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+Databases created earlier by init_db() already have these tables; mark them
+with ``alembic stamp 0001`` before upgrading.
+"""
+import json
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _country_codes():
+    path = os.path.join(os.path.dirname(__file__), '..', '..', 'database', 'countries.json')
+    with open(path) as f:
+        return [country["COUNTRY_CODE"] for country in json.load(f)["countries"]]
+
+
+def upgrade() -> None:
+    op.create_table(
+        'campaigns',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(), nullable=True),
+        sa.Column('landing_url', sa.String(), nullable=True),
+        sa.Column('is_running', sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_campaigns_id', 'campaigns', ['id'])
+    op.create_table(
+        'payouts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('country', sa.Enum(*_country_codes(), name='countryenum'), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('campaign_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['campaign_id'], ['campaigns.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_payouts_id', 'payouts', ['id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_payouts_id', table_name='payouts')
+    op.drop_table('payouts')
+    op.drop_index('ix_campaigns_id', table_name='campaigns')
+    op.drop_table('campaigns')
+    sa.Enum(name='countryenum').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,72 @@
+"""campaign search indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:30:00.000000
+
+Postgres: pg_trgm GIN indexes on title and landing_url, which serve the
+ILIKE '%term%' searches. SQLite: an FTS5 trigram table over the same columns,
+kept in sync with campaigns by triggers and backfilled here.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SQLITE_UPGRADE = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS campaigns_fts USING fts5(
+        title, landing_url, content='campaigns', content_rowid='id', tokenize='trigram'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS campaigns_fts_ai AFTER INSERT ON campaigns BEGIN
+        INSERT INTO campaigns_fts(rowid, title, landing_url) VALUES (new.id, new.title, new.landing_url);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS campaigns_fts_ad AFTER DELETE ON campaigns BEGIN
+        INSERT INTO campaigns_fts(campaigns_fts, rowid, title, landing_url) VALUES ('delete', old.id, old.title, old.landing_url);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS campaigns_fts_au AFTER UPDATE OF title, landing_url ON campaigns BEGIN
+        INSERT INTO campaigns_fts(campaigns_fts, rowid, title, landing_url) VALUES ('delete', old.id, old.title, old.landing_url);
+        INSERT INTO campaigns_fts(rowid, title, landing_url) VALUES (new.id, new.title, new.landing_url);
+    END""",
+    "INSERT INTO campaigns_fts(campaigns_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS campaigns_fts_au",
+    "DROP TRIGGER IF EXISTS campaigns_fts_ad",
+    "DROP TRIGGER IF EXISTS campaigns_fts_ai",
+    "DROP TABLE IF EXISTS campaigns_fts",
+]
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.create_index(
+            'ix_campaigns_title_trgm', 'campaigns', ['title'],
+            postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'}, if_not_exists=True
+        )
+        op.create_index(
+            'ix_campaigns_landing_url_trgm', 'campaigns', ['landing_url'],
+            postgresql_using='gin', postgresql_ops={'landing_url': 'gin_trgm_ops'}, if_not_exists=True
+        )
+    elif dialect == 'sqlite':
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.drop_index('ix_campaigns_landing_url_trgm', table_name='campaigns')
+        op.drop_index('ix_campaigns_title_trgm', table_name='campaigns')
+    elif dialect == 'sqlite':
+        for statement in SQLITE_DOWNGRADE:
+            op.execute(statement)
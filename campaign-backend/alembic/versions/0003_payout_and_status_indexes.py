@@ -0,0 +1,77 @@
+"""payout and campaign status indexes
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 10:00:00.000000
+
+A unique (campaign_id, country) index on payouts, which also serves lookups
+by campaign_id alone, an index on payouts.country, and partial indexes on
+campaigns(id) for running and paused campaigns.
+
+The unique index cannot be built while a campaign has two payouts for one
+country, so the upgrade stops and lists them. With
+MIGRATE_DEDUPLICATE_PAYOUTS=1 it deletes all but the newest row of each
+instead: that is destructive, and the downgrade cannot bring them back.
+"""
+import logging
+from typing import Sequence, Union
+
+from alembic import op
+from decouple import config
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+# Duplicates named in the error when the upgrade stops
+LISTED_DUPLICATES = 20
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    duplicates = bind.execute(sa.text(
+        "SELECT campaign_id, country, COUNT(*) FROM payouts WHERE campaign_id IS NOT NULL "
+        "GROUP BY campaign_id, country HAVING COUNT(*) > 1 ORDER BY campaign_id, country"
+    )).all()
+    if duplicates and not config('MIGRATE_DEDUPLICATE_PAYOUTS', default=False, cast=bool):
+        listed = ", ".join(
+            f"campaign {campaign_id} {country} ({count} rows)" for campaign_id, country, count in duplicates[:LISTED_DUPLICATES]
+        )
+        more = f" and {len(duplicates) - LISTED_DUPLICATES} more" if len(duplicates) > LISTED_DUPLICATES else ""
+        raise RuntimeError(
+            f"Cannot add the unique (campaign_id, country) index: {len(duplicates)} campaign and country pairs "
+            f"have more than one payout: {listed}{more}. Delete the extra payouts, or set "
+            f"MIGRATE_DEDUPLICATE_PAYOUTS=1 to keep only the newest of each, then upgrade again."
+        )
+    if duplicates:
+        removed = bind.execute(sa.text(
+            "DELETE FROM payouts WHERE campaign_id IS NOT NULL AND id NOT IN ("
+            "SELECT MAX(id) FROM payouts WHERE campaign_id IS NOT NULL GROUP BY campaign_id, country)"
+        )).rowcount
+        logger.warning(
+            f"Deleted {removed} duplicate payouts of {len(duplicates)} campaign and country pairs, keeping the newest of each"
+        )
+    op.create_index(
+        'ux_payouts_campaign_country', 'payouts', ['campaign_id', 'country'],
+        unique=True, if_not_exists=True
+    )
+    op.create_index('ix_payouts_country', 'payouts', ['country'], if_not_exists=True)
+    for name, value in (('ix_campaigns_running', sa.true()), ('ix_campaigns_paused', sa.false())):
+        where = sa.column('is_running') == value
+        op.create_index(
+            name, 'campaigns', ['id'],
+            sqlite_where=where, postgresql_where=where, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_campaigns_paused', table_name='campaigns')
+    op.drop_index('ix_campaigns_running', table_name='campaigns')
+    op.drop_index('ix_payouts_country', table_name='payouts')
+    op.drop_index('ux_payouts_campaign_country', table_name='payouts')
@@ -0,0 +1,55 @@
+"""payout country stats summary table
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 10:30:00.000000
+
+Per-country, per-status payout rollups behind the payout report. The table
+starts empty and is filled by the first report request, see
+service/reporting.py.
+"""
+import json
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _country_codes():
+    path = os.path.join(os.path.dirname(__file__), '..', '..', 'database', 'countries.json')
+    with open(path) as f:
+        return [country["COUNTRY_CODE"] for country in json.load(f)["countries"]]
+
+
+def upgrade() -> None:
+    op.create_table(
+        'payout_country_stats',
+        # Same enum as payouts.country; on Postgres the type already exists
+        sa.Column(
+            'country',
+            sa.Enum(*_country_codes(), name='countryenum').with_variant(
+                postgresql.ENUM(name='countryenum', create_type=False), 'postgresql'
+            ),
+            nullable=False
+        ),
+        sa.Column('is_running', sa.Boolean(), nullable=False),
+        sa.Column('payout_count', sa.Integer(), nullable=False),
+        sa.Column('amount_sum', sa.Float(), nullable=False),
+        sa.Column('amount_min', sa.Float(), nullable=True),
+        sa.Column('amount_max', sa.Float(), nullable=True),
+        sa.Column('stale', sa.Boolean(), nullable=False),
+        sa.PrimaryKeyConstraint('country', 'is_running')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('payout_country_stats')
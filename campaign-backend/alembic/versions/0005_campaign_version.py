@@ -0,0 +1,36 @@
+"""campaign version and updated_at
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 11:00:00.000000
+
+A version counter, bumped by every write to a campaign or its payouts, and
+the time of the last such write. The version backs the campaign ETags and
+the If-Match checks on updates. Existing campaigns start at version 1,
+stamped with the migration time.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('campaigns') as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+    # SQLite cannot add a column defaulting to CURRENT_TIMESTAMP, so backfill instead
+    op.execute("UPDATE campaigns SET updated_at = CURRENT_TIMESTAMP")
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('campaigns') as batch_op:
+        batch_op.drop_column('updated_at')
+        batch_op.drop_column('version')
@@ -0,0 +1,40 @@
+"""campaign change log
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 12:00:00.000000
+
+Append-only log of campaign and payout writes behind the change feed, see
+service/changes.py. It starts empty: consumers do one full read and then
+follow the log from its head.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'campaign_changes',
+        sa.Column('seq', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('campaign_id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('deleted', sa.Boolean(), nullable=False),
+        sa.Column('changed_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('seq'),
+        sqlite_autoincrement=True
+    )
+    op.create_index('ix_campaign_changes_changed_at', 'campaign_changes', ['changed_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_campaign_changes_changed_at', table_name='campaign_changes')
+    op.drop_table('campaign_changes')
@@ -0,0 +1,184 @@
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+from inspect import iscoroutinefunction
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from typing import Callable, Dict, List, Optional, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+class RequestStats:
+    """Timings collected while one request is handled"""
+    __slots__ = ("started", "db_seconds", "queries", "endpoint_done", "serialize_seconds")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_seconds = 0.0
+        self.queries = 0
+        self.endpoint_done: Optional[float] = None
+        self.serialize_seconds = 0.0
+
+    def server_timing(self) -> str:
+        total = (time.perf_counter() - self.started) * 1000
+        return (
+            f'app;dur={total:.2f}, db;dur={self.db_seconds * 1000:.2f};desc="{self.queries} queries", '
+            f'serialize;dur={self.serialize_seconds * 1000:.2f}'
+        )
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, rendered in the Prometheus text format.
+
+    Only the event loop thread observes, so there is no locking.
+    """
+
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...], labels: Tuple[str, ...]):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.labels = labels
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total) in sorted(self._series.items()):
+            labels = ",".join(f'{k}="{v}"' for k, v in zip(self.labels, label_values))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+    def clear(self) -> None:
+        self._series.clear()
+
+REQUEST_LABELS = ("method", "route")
+request_duration = Histogram("http_request_duration_seconds", "Wall time until the response body is sent", LATENCY_BUCKETS, REQUEST_LABELS + ("status",))
+request_db_time = Histogram("http_request_db_seconds", "Time spent executing SQL per request", LATENCY_BUCKETS, REQUEST_LABELS)
+request_queries = Histogram("http_request_db_queries", "SQL statements executed per request", QUERY_BUCKETS, REQUEST_LABELS)
+request_serialize_time = Histogram("http_request_serialize_seconds", "Response model validation and encoding time per request", LATENCY_BUCKETS, REQUEST_LABELS)
+HISTOGRAMS = (request_duration, request_db_time, request_queries, request_serialize_time)
+
+def instrument_queries(engine: Engine) -> None:
+    """Attribute each statement's execution time to the request that issued it.
+
+    Pass ``AsyncEngine.sync_engine`` for async engines; ``run_sync`` greenlets
+    share the request's context, so the current request is visible there too.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = current_request.get()
+        started = getattr(context, "_metrics_started", None)
+        if stats is not None and started is not None:
+            stats.db_seconds += time.perf_counter() - started
+            stats.queries += 1
+
+def _timed_endpoint(endpoint: Callable) -> Callable:
+    """Mark when the endpoint returns; what follows in the route handler is serialization"""
+    if iscoroutinefunction(endpoint):
+        @wraps(endpoint)
+        async def timed(*args, **kwargs):
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                stats = current_request.get()
+                if stats is not None:
+                    stats.endpoint_done = time.perf_counter()
+        return timed
+
+    @wraps(endpoint)
+    def timed_sync(*args, **kwargs):
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            stats = current_request.get()
+            if stats is not None:
+                stats.endpoint_done = time.perf_counter()
+    return timed_sync
+
+class InstrumentedRoute(APIRoute):
+    """APIRoute that records response serialization time in the current RequestStats"""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            response = await handler(request)
+            stats = current_request.get()
+            if stats is not None and stats.endpoint_done is not None:
+                stats.serialize_seconds += time.perf_counter() - stats.endpoint_done
+            return response
+        return timed_handler
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: Server-Timing headers plus the request histograms.
+
+    Routes are labelled by their path template, and unmatched paths share one
+    label, so the number of series stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", stats.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_request.reset(token)
+            route = scope.get("route")
+            labels = (scope["method"], getattr(route, "path", "unmatched"))
+            request_duration.observe(time.perf_counter() - stats.started, *labels, str(status))
+            request_db_time.observe(stats.db_seconds, *labels)
+            request_queries.observe(stats.queries, *labels)
+            request_serialize_time.observe(stats.serialize_seconds, *labels)
+
+def render_metrics(gauges: Optional[Dict[str, Dict[str, float]]] = None) -> str:
+    """Request histograms plus per-engine ``{metric: {engine: value}}`` gauges, in the Prometheus text format"""
+    lines: List[str] = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    for name, values in (gauges or {}).items():
+        lines.append(f"# TYPE {name} gauge")
+        lines.extend(f'{name}{{engine="{label}"}} {value}' for label, value in values.items())
+    return "\n".join(lines) + "\n"
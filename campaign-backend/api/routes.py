@@ -1,106 +1,389 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional, Dict
-from database.database import get_db
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from typing import List, Optional, Dict, Union
+from database.database import CountryEnum, get_async_db, get_async_read_db, get_async_read_session_factory
 from schemas.schema import (
     Campaign,
+    CampaignPage,
+    CampaignIds,
+    CampaignBatch,
     CampaignCreate,
     CampaignUpdate,
     CampaignFilter,
     PayoutResponse,
     PayoutCreate,
-    PayoutUpdate
+    PayoutUpdate,
+    ImportReport,
+    CampaignSelection,
+    BulkStatusUpdate,
+    BulkCampaignUpdate,
+    BulkResult,
+    PayoutReport,
+    PayoutMatrix,
+    PayoutResolution,
+    ResolutionRequest,
+    ResolutionResult,
+    CountryTopCampaigns,
+    ChangePage,
+    ChangeLogHead
 )
-from service.service import campaign_service, payout_service, PayoutError
+from service.service import payout_service, PayoutError
+from service.versioning import VersionConflictError, campaign_etag, etag_matches, rows_etag
+from api.metrics import InstrumentedRoute
+from service.pagination import InvalidCursorError
+from service.export import EXPORT_MEDIA_TYPES, export_service
+from service.cache import campaign_cache
+from service.changes import ChangesExpiredError
+from service.async_service import async_campaign_service, async_payout_service, async_bulk_import_service, async_reporting_service, async_resolution_service, async_change_feed
 
-router = APIRouter(prefix="/api/campaigns", tags=["campaigns"])
+router = APIRouter(prefix="/api/campaigns", tags=["campaigns"], route_class=InstrumentedRoute)
+
+CURSOR_DESCRIPTION = (
+    "Opt into keyset pagination: pass an empty value for the first page, then the "
+    "returned next_cursor. The response becomes {items, next_cursor} and skip is ignored."
+)
+
+def conditional_json(body: Optional[bytes], etag: str) -> Response:
+    """A JSON body with its ETag, or 304 Not Modified when the service skipped it (body None)"""
+    if body is None:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+def conditional_listing(response: Response, if_none_match: Optional[str], rows: list, page: bool, next_cursor: Optional[str] = None):
+    """ETag for a listing answered with ORM objects; same tag as the serializer path"""
+    etag = rows_etag(rows, page, next_cursor)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return {"items": rows, "next_cursor": next_cursor} if page else rows
 
 # Move countries endpoint before dynamic routes
+COUNTRIES_CACHE_CONTROL = "public, max-age=3600"
+
 @router.get("/countries", response_model=List[Dict])
-async def get_countries():
+async def get_countries(request: Request):
     """Get available countries for campaign creation"""
     try:
-        return payout_service.get_available_countries()
+        payload, etag = payout_service.get_countries_payload()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    headers = {"ETag": etag, "Cache-Control": COUNTRIES_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=payload, media_type="application/json", headers=headers)
+
 @router.post("/campaigns/", response_model=Campaign)
-def create_campaign(
+async def create_campaign(
     campaign: CampaignCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Create a new campaign with associated payouts
     """
-    return campaign_service.create_campaign(db, campaign)
+    return await async_campaign_service.create_campaign(db, campaign)
+
+@router.post("/import", response_model=ImportReport)
+async def import_campaigns(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$", description="Defaults from the Content-Type header"),
+    batch_size: int = Query(500, ge=1, le=5000),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Bulk import campaigns with payouts from a streamed NDJSON or CSV body.
+
+    NDJSON rows use the CampaignCreate shape. CSV needs a
+    `title,landing_url,is_running,payouts` header, with payouts written as
+    `USA:10.5;DEU:7`. Invalid rows are reported without stopping the import.
+    """
+    if format is None:
+        format = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+    return await async_bulk_import_service.import_stream(db, request.stream(), format, batch_size)
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_campaigns(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    is_running: Optional[bool] = None,
+    country: Optional[CountryEnum] = Query(None, description="Only campaigns with a payout in this country"),
+    batch_size: int = Query(1000, ge=1, le=10000),
+    session_factory: async_sessionmaker = Depends(get_async_read_session_factory)
+):
+    """
+    Stream every matching campaign with its payouts, in the Campaign response shape
+    """
+    return StreamingResponse(
+        export_service.stream(session_factory, format, is_running, country, batch_size),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="campaigns.{format}"'}
+    )
+
+@router.get("/reports/payouts", response_model=PayoutReport)
+async def get_payout_report(
+    group_by: str = Query("country", pattern="^(country|currency)$"),
+    is_running: Optional[bool] = None,
+    source: str = Query("summary", pattern="^(summary|live)$", description="summary reads the maintained rollup table, live aggregates the payouts table"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Payout count, total, min, max and average per country or currency, split by running and paused campaigns
+    """
+    return await async_reporting_service.payout_report(db, group_by, is_running, source)
 
-@router.get("/", response_model=List[Campaign])
+@router.get("/", response_model=Union[List[Campaign], CampaignPage])
 async def get_campaigns(
     skip: int = 0,
     limit: int = 100,
     title: Optional[str] = None,
     landing_url: Optional[str] = None,
     is_running: Optional[bool] = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    if_none_match: Optional[str] = Header(None),
+    response: Response = None,
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
-    Get all campaigns with optional filtering
+    Get all campaigns with optional filtering; answers If-None-Match with 304
     """
     filters = CampaignFilter(
         title=title,
         landing_url=landing_url,
         is_running=is_running
     )
-    return campaign_service.get_campaigns(db, skip, limit, filters)
+    if async_campaign_service.service.serializer is not None:
+        try:
+            if cursor is None:
+                body, etag = await async_campaign_service.get_campaigns_json(db, skip, limit, filters, if_none_match)
+            else:
+                body, etag = await async_campaign_service.get_campaigns_page_json(db, cursor, limit, filters, if_none_match)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return conditional_json(body, etag)
 
-@router.get("/search", response_model=List[Campaign])
+    if cursor is None:
+        campaigns = await async_campaign_service.get_campaigns(db, skip, limit, filters)
+        return conditional_listing(response, if_none_match, campaigns, page=False)
+    try:
+        items, next_cursor = await async_campaign_service.get_campaigns_page(db, cursor, limit, filters)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return conditional_listing(response, if_none_match, items, page=True, next_cursor=next_cursor)
+
+@router.get("/search", response_model=Union[List[Campaign], CampaignPage])
 async def search_campaigns(
     q: str = Query(..., min_length=1, description="Search term"),
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    if_none_match: Optional[str] = Header(None),
+    response: Response = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Search campaigns by title or landing URL; answers If-None-Match with 304
+    """
+    if async_campaign_service.service.serializer is not None:
+        try:
+            if cursor is None:
+                body, etag = await async_campaign_service.search_campaigns_json(db, q, skip, limit, if_none_match)
+            else:
+                body, etag = await async_campaign_service.search_campaigns_page_json(db, q, cursor, limit, if_none_match)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return conditional_json(body, etag)
+
+    if cursor is None:
+        campaigns = await async_campaign_service.search_campaigns(db, q, skip, limit)
+        return conditional_listing(response, if_none_match, campaigns, page=False)
+    try:
+        items, next_cursor = await async_campaign_service.search_campaigns_page(db, q, cursor, limit)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return conditional_listing(response, if_none_match, items, page=True, next_cursor=next_cursor)
+
+@router.patch("/bulk/status", response_model=BulkResult)
+async def bulk_set_status(
+    bulk: BulkStatusUpdate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Set is_running on many campaigns at once (or flip it when is_running is omitted)
+    """
+    return {"affected": await async_campaign_service.bulk_set_status(db, bulk, bulk.is_running)}
+
+@router.patch("/bulk", response_model=BulkResult)
+async def bulk_update_campaigns(
+    bulk: BulkCampaignUpdate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Apply the same field changes to many campaigns in one UPDATE
+    """
+    return {"affected": await async_campaign_service.bulk_update(db, bulk, bulk.changes)}
+
+@router.post("/bulk/delete", response_model=BulkResult)
+async def bulk_delete_campaigns(
+    selection: CampaignSelection,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Delete many campaigns and their payouts
+    """
+    return {"affected": await async_campaign_service.bulk_delete(db, selection)}
+
+@router.post("/batch", response_model=CampaignBatch)
+async def get_campaigns_batch(
+    request: CampaignIds,
+    if_none_match: Optional[str] = Header(None),
+    response: Response = None,
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
-    Search campaigns by title or landing URL
+    Get up to 5000 campaigns by ID in request order, with the IDs that were not found
     """
-    return campaign_service.search_campaigns(db, q, skip, limit)
+    if async_campaign_service.service.serializer is not None:
+        body, etag = await async_campaign_service.get_campaigns_by_ids_json(db, request.ids, if_none_match)
+        return conditional_json(body, etag)
+    items, missing = await async_campaign_service.get_campaigns_by_ids(db, request.ids)
+    etag = rows_etag(items, missing)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return {"items": items, "missing": missing}
+
+@router.post("/resolve", response_model=ResolutionResult)
+async def resolve_payouts(
+    request: ResolutionRequest,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Amount and running status for a batch of (campaign_id, country) pairs, served from memory
+    """
+    pairs = [(key.campaign_id, key.country) for key in request.pairs]
+    return {"results": await async_resolution_service.resolve_many(db, pairs)}
+
+@router.get("/top", response_model=CountryTopCampaigns)
+async def get_top_campaigns(
+    country: CountryEnum,
+    limit: int = Query(10, ge=1, le=1000),
+    cursor: str = Query("", description="next_cursor of the previous page"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Highest-paying running campaigns for a country, ties by campaign id, served from memory
+    """
+    try:
+        return await async_resolution_service.top_campaigns(db, country, limit, cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/changes", response_model=ChangePage)
+async def get_changes(
+    since: int = Query(0, ge=0, description="seq of the last change applied, or the head read before a full sync"),
+    limit: int = Query(1000, ge=1, le=10000),
+    wait: float = Query(0, ge=0, le=60, description="Seconds to wait for a change when there is none yet (long-poll)"),
+    session_factory: async_sessionmaker = Depends(get_async_read_session_factory)
+):
+    """
+    Campaign and payout writes after ``since``, oldest first; 410 when they were pruned and a full sync is needed
+    """
+    try:
+        changes = await async_change_feed.poll(session_factory, since, limit, wait)
+    except ChangesExpiredError as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    return {"changes": changes, "next_since": changes[-1].seq if changes else since}
+
+@router.get("/changes/head", response_model=ChangeLogHead)
+async def get_changes_head(db: AsyncSession = Depends(get_async_read_db)):
+    """
+    seq of the latest change; read it before a full sync and follow the feed from there
+    """
+    return {"seq": await async_change_feed.head(db)}
+
+@router.get("/changes/stream", response_class=StreamingResponse)
+async def stream_changes(
+    since: int = Query(0, ge=0, description="seq of the last change applied; Last-Event-ID takes precedence"),
+    last_event_id: Optional[str] = Header(None),
+    session_factory: async_sessionmaker = Depends(get_async_read_session_factory)
+):
+    """
+    Server-Sent Events of the changes after ``since``; reconnecting clients resume from Last-Event-ID
+    """
+    if last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+    return StreamingResponse(
+        async_change_feed.stream(session_factory, since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/cache/stats", tags=["health"])
+async def get_cache_stats():
+    """Hit/miss counters of the single-campaign cache"""
+    return campaign_cache.stats()
 
 @router.get("/{campaign_id}", response_model=Campaign)
 async def get_campaign(
     campaign_id: int,
-    db: Session = Depends(get_db)
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
-    Get a specific campaign by ID
+    Get a specific campaign by ID; answers If-None-Match with 304
     """
-    campaign = campaign_service.get_campaign(db, campaign_id)
-    if not campaign:
+    found = await async_campaign_service.get_campaign_json(db, campaign_id)
+    if found is None:
         raise HTTPException(status_code=404, detail="Campaign not found")
-    return campaign
+    body, etag = found
+    return conditional_json(None if etag_matches(if_none_match, etag) else body, etag)
+
+@router.get("/{campaign_id}/resolve", response_model=PayoutResolution)
+async def resolve_payout(
+    campaign_id: int,
+    country: CountryEnum,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    What the campaign pays in a country and whether it is running, served from memory
+    """
+    resolution = await async_resolution_service.resolve(db, campaign_id, country)
+    if resolution is None:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return resolution
 
 @router.patch("/{campaign_id}", response_model=Campaign)
 async def update_campaign(
     campaign_id: int,
     campaign_update: CampaignUpdate,
-    db: Session = Depends(get_db)
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Update a campaign's details
+    Update a campaign's details; with If-Match, only if it still has that ETag (412 otherwise)
     """
-    campaign = campaign_service.update_campaign(db, campaign_id, campaign_update)
+    try:
+        campaign = await async_campaign_service.update_campaign(db, campaign_id, campaign_update, if_match)
+    except VersionConflictError as e:
+        raise HTTPException(status_code=412 if if_match else 409, detail=str(e))
     if not campaign:
         raise HTTPException(status_code=404, detail="Campaign not found")
+    response.headers["ETag"] = campaign_etag(campaign.id, campaign.version)
     return campaign
 
 @router.patch("/{campaign_id}/toggle", response_model=Campaign)
 async def toggle_campaign_status(
     campaign_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Toggle campaign running status
     """
-    campaign = campaign_service.toggle_campaign_status(db, campaign_id)
+    try:
+        campaign = await async_campaign_service.toggle_campaign_status(db, campaign_id)
+    except VersionConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     if not campaign:
         raise HTTPException(status_code=404, detail="Campaign not found")
     return campaign
@@ -110,19 +393,19 @@ async def toggle_campaign_status(
 async def create_payout(
     campaign_id: int,
     payout: PayoutCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new payout for a campaign"""
     try:
         # First verify campaign exists
-        campaign = campaign_service.get_campaign(db, campaign_id)
+        campaign = await async_campaign_service.get_campaign(db, campaign_id)
         if not campaign:
             raise HTTPException(
                 status_code=404,
                 detail=f"Campaign {campaign_id} not found"
             )
 
-        return campaign_service.create_payout(db, campaign_id, payout)
+        return await async_campaign_service.create_payout(db, campaign_id, payout)
     except PayoutError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -131,23 +414,46 @@ async def create_payout(
 @router.get("/{campaign_id}/payouts/", response_model=List[PayoutResponse])
 async def get_campaign_payouts(
     campaign_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get all payouts for a campaign"""
-    return campaign_service.get_campaign_payouts(db, campaign_id)
+    return await async_campaign_service.get_campaign_payouts(db, campaign_id)
+
+@router.put("/{campaign_id}/payouts/", response_model=List[PayoutResponse])
+async def replace_campaign_payouts(
+    campaign_id: int,
+    payouts: PayoutMatrix,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Replace a campaign's whole country/amount matrix in one transaction.
+
+    Countries left out are removed, new ones added and changed amounts updated.
+    Returns the resulting payouts.
+    """
+    try:
+        result = await async_campaign_service.replace_payouts(db, campaign_id, payouts.root)
+    except PayoutError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Campaign {campaign_id} not found")
+    return result
 
 @router.patch("/payouts/{payout_id}", response_model=PayoutResponse)
 async def update_payout(
     payout_id: int,
     payout_update: PayoutUpdate,
-    db: Session = Depends(get_db)
+    if_match: Optional[str] = Header(None, description="ETag of the payout's campaign"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Update a payout"""
+    """Update a payout; with If-Match, only if its campaign still has that ETag (412 otherwise)"""
     try:
-        updated_payout = payout_service.update_payout(db, payout_id, payout_update)
+        updated_payout = await async_payout_service.update_payout(db, payout_id, payout_update, if_match)
         if not updated_payout:
             raise HTTPException(status_code=404, detail=f"Payout {payout_id} not found")
         return updated_payout
+    except VersionConflictError as e:
+        raise HTTPException(status_code=412, detail=str(e))
     except PayoutError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -156,11 +462,11 @@ async def update_payout(
 @router.delete("/payouts/{payout_id}", status_code=204)
 async def delete_payout(
     payout_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a specific payout"""
     try:
-        success = payout_service.delete_payout(db, payout_id)
+        success = await async_payout_service.delete_payout(db, payout_id)
         if not success:
             raise HTTPException(status_code=404, detail=f"Payout {payout_id} not found")
         return {"status": "success"}
@@ -172,11 +478,11 @@ async def delete_payout(
 @router.delete("/{campaign_id}", status_code=204)
 async def delete_campaign(
     campaign_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a campaign and its associated payouts"""
     try:
-        success = campaign_service.delete_campaign(db, campaign_id)
+        success = await async_campaign_service.delete_campaign(db, campaign_id)
         if not success:
             raise HTTPException(
                 status_code=404,
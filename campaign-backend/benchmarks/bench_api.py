@@ -0,0 +1,206 @@
+"""Load test of the campaign API: latency percentiles and throughput per endpoint.
+
+Seeds ``--campaigns`` campaigns, each with payouts in the first ``--payouts``
+countries of countries.json (all but one by default, leaving a country free
+for the payout-create scenario), then drives each scenario in turn at
+``--concurrency``. Read scenarios run before the ones that write.
+
+The report is JSON with a fixed layout (``schema`` is bumped if it ever
+changes), so two runs can be compared with ``python -m benchmarks.compare``.
+
+    python -m benchmarks.bench_api --campaigns 1000 --output before.json
+    python -m benchmarks.bench_api --database-url postgresql://user:pw@localhost/bench
+    python -m benchmarks.bench_api --base-url http://localhost:8000 --database-url ...  # a running server
+
+``--serializer`` overrides RESPONSE_SERIALIZER for in-process runs, so the
+list and search paths can be compared:
+
+    python -m benchmarks.bench_api --serializer orm --scenarios list,list_100,search --output orm.json
+    python -m benchmarks.bench_api --serializer orjson --scenarios list,list_100,search --output orjson.json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+from fastapi import FastAPI
+
+from benchmarks.common import DEFAULT_BENCH_URL, asgi_client, bind_app, drive, make_engines, seed
+from api.routes import router
+from database.database import country_manager
+from service.cache import campaign_cache
+from service.serialization import RESPONSE_SERIALIZERS, build_response_serializer
+from service.service import campaign_service
+
+SCHEMA_VERSION = 1
+PREFIX = "/api/campaigns"
+SEARCH_TERMS = ["summer", "promo", "partner42", "Campaign 1"]
+
+Scenario = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+def build_scenarios(campaigns: int, countries: List[str], spare_country: str, rng: random.Random) -> Dict[str, Scenario]:
+    """Request factories by name, in the order they run"""
+    created_payouts: List[int] = []
+
+    def campaign_id(n: int) -> int:
+        return rng.randrange(campaigns) + 1
+
+    async def create_payout(client, n):
+        response = await client.post(
+            f"{PREFIX}/{n % campaigns + 1}/payouts/", json={"country": spare_country, "amount": 3.5}
+        )
+        if response.status_code == 200:
+            created_payouts.append(response.json()["id"])
+        return response
+
+    async def delete_payout(client, n):
+        return await client.delete(f"{PREFIX}/payouts/{created_payouts[n % len(created_payouts)]}")
+
+    poll_etag: List[str] = []
+
+    async def list_100_unchanged(client, n):
+        # A poller re-reading the first page with the ETag it got last time
+        headers = {"If-None-Match": poll_etag[0]} if poll_etag else {}
+        response = await client.get(f"{PREFIX}/", params={"limit": 100}, headers=headers)
+        if response.status_code == 200:
+            poll_etag[:] = [response.headers["ETag"]]
+        return response
+
+    feed_since: List[int] = []
+
+    async def changes_poll(client, n):
+        # A downstream cache asking for what changed since its last poll
+        if not feed_since:
+            feed_since.append((await client.get(f"{PREFIX}/changes/head")).json()["seq"])
+        response = await client.get(f"{PREFIX}/changes", params={"since": feed_since[0]})
+        if response.status_code == 200:
+            feed_since[0] = response.json()["next_since"]
+        return response
+
+    matrix = [{"country": country, "amount": 2.0 + n % 7} for n, country in enumerate(countries[:20])]
+
+    return {
+        "list": lambda client, n: client.get(f"{PREFIX}/", params={"skip": rng.randrange(campaigns), "limit": 20}),
+        "list_100": lambda client, n: client.get(f"{PREFIX}/", params={"skip": rng.randrange(max(campaigns - 100, 1)), "limit": 100}),
+        "list_100_unchanged": list_100_unchanged,
+        "changes_poll": changes_poll,
+        "list_keyset": lambda client, n: client.get(f"{PREFIX}/", params={"cursor": "", "limit": 20, "is_running": True}),
+        "search": lambda client, n: client.get(f"{PREFIX}/search", params={"q": SEARCH_TERMS[n % len(SEARCH_TERMS)], "limit": 20}),
+        "get": lambda client, n: client.get(f"{PREFIX}/{campaign_id(n)}"),
+        "get_batch_100": lambda client, n: client.post(f"{PREFIX}/batch", json={"ids": [campaign_id(n) for _ in range(100)]}),
+        "get_payouts": lambda client, n: client.get(f"{PREFIX}/{campaign_id(n)}/payouts/"),
+        "resolve": lambda client, n: client.get(f"{PREFIX}/{campaign_id(n)}/resolve", params={"country": rng.choice(countries)}),
+        "resolve_batch": lambda client, n: client.post(f"{PREFIX}/resolve", json={"pairs": [
+            {"campaign_id": campaign_id(n), "country": rng.choice(countries)} for _ in range(100)
+        ]}),
+        "create": lambda client, n: client.post(f"{PREFIX}/campaigns/", json={
+            "title": f"Bench {n}",
+            "landing_url": f"bench{n}.com",
+            "is_running": True,
+            "payouts": [{"country": country, "amount": 1.5} for country in countries[:10]],
+        }),
+        "toggle": lambda client, n: client.patch(f"{PREFIX}/{campaign_id(n)}/toggle"),
+        "payout_update": lambda client, n: client.patch(
+            f"{PREFIX}/payouts/{rng.randrange(campaigns * len(countries)) + 1}", json={"amount": 1 + n % 100}
+        ),
+        "payout_replace": lambda client, n: client.put(f"{PREFIX}/{campaign_id(n)}/payouts/", json=matrix),
+        "payout_create": create_payout,
+        "payout_delete": delete_payout,
+    }
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+async def run(args) -> dict:
+    engine, async_engine = make_engines(args.database_url, pool_size=args.concurrency)
+    all_countries = list(country_manager.countries)
+    payouts = min(args.payouts, len(all_countries) - 1)
+    started = time.perf_counter()
+    seed(engine, args.campaigns, payouts)
+    seed_seconds = time.perf_counter() - started
+    campaign_cache.clear()
+    if args.serializer:
+        campaign_service.serializer = build_response_serializer(args.serializer)
+    serializer = campaign_service.serializer.name if campaign_service.serializer else "orm"
+
+    scenarios = build_scenarios(
+        args.campaigns, all_countries[:payouts], all_countries[payouts], random.Random(args.seed)
+    )
+    selected = args.scenarios.split(",") if args.scenarios else list(scenarios)
+    unknown = set(selected) - set(scenarios)
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    if "payout_delete" in selected and "payout_create" not in selected:
+        raise SystemExit("payout_delete deletes the payouts payout_create made; select both")
+
+    app = FastAPI()
+    app.include_router(router)
+    bind_app(app, engine, async_engine)
+    results = {}
+    async with asgi_client(app, args.base_url) as client:
+        for name in (name for name in scenarios if name in selected):
+            # The write scenarios are bounded by the rows they can touch
+            total = min(args.requests, args.campaigns) if name == "payout_create" else args.requests
+            results[name] = await drive(scenarios[name], client, total, args.concurrency)
+
+    await async_engine.dispose()
+    engine.dispose()
+    return {
+        "schema": SCHEMA_VERSION,
+        "benchmark": "api",
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "target": args.base_url or "in-process",
+            "database": engine.url.get_backend_name(),
+            "cache_backend": campaign_cache.backend.name,
+            "serializer": serializer if not args.base_url else "unknown",
+        },
+        "config": {
+            "campaigns": args.campaigns,
+            "payouts_per_campaign": payouts,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "seed_seconds": round(seed_seconds, 2),
+        },
+        "results": results,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=DEFAULT_BENCH_URL)
+    parser.add_argument("--base-url", help="benchmark a running server instead of the app in-process")
+    parser.add_argument("--campaigns", type=int, default=1000)
+    parser.add_argument("--payouts", type=int, default=len(country_manager.countries) - 1,
+                        help="payouts per campaign, one per country")
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--scenarios", help="comma-separated subset of scenarios to run")
+    parser.add_argument("--serializer", choices=RESPONSE_SERIALIZERS,
+                        help="list and search response path, in-process only (default: RESPONSE_SERIALIZER)")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for the ids each scenario hits")
+    parser.add_argument("--output", help="also write the report to this file")
+    args = parser.parse_args()
+
+    report = json.dumps(asyncio.run(run(args)), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    print(report)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Concurrent-request throughput of the blocking Session routes vs the AsyncSession routes.
+
+The "sync" app reproduces the previous route shape: ``async def`` handlers that
+call the synchronous CampaignService, so every SQL round trip stalls the event
+loop. The "async" app is the real router running on the async engine.
+
+    python -m benchmarks.bench_async_engine --campaigns 2000 --concurrency 32
+    python -m benchmarks.bench_async_engine --database-url postgresql://user:pw@localhost/bench
+"""
+import argparse
+import asyncio
+import json
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, FastAPI
+from sqlalchemy.orm import Session
+
+from benchmarks.common import DEFAULT_BENCH_URL, asgi_client, bind_app, drive, make_engines, seed
+from api.routes import router as async_router
+from database.database import get_db
+from schemas.schema import Campaign
+from service.service import campaign_service
+
+def build_sync_app() -> FastAPI:
+    router = APIRouter(prefix="/api/campaigns")
+
+    @router.get("/", response_model=List[Campaign])
+    async def get_campaigns(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+        return campaign_service.get_campaigns(db, skip, limit)
+
+    @router.get("/search", response_model=List[Campaign])
+    async def search_campaigns(q: str, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+        return campaign_service.search_campaigns(db, q, skip, limit)
+
+    @router.get("/{campaign_id}", response_model=Optional[Campaign])
+    async def get_campaign(campaign_id: int, db: Session = Depends(get_db)):
+        return campaign_service.get_campaign(db, campaign_id)
+
+    app = FastAPI()
+    app.include_router(router)
+    return app
+
+def build_async_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(async_router)
+    return app
+
+SCENARIOS = {
+    "get": lambda campaigns: lambda client, n: client.get(f"/api/campaigns/{n % campaigns + 1}"),
+    "list": lambda campaigns: lambda client, n: client.get("/api/campaigns/", params={"skip": (n * 20) % campaigns, "limit": 20}),
+    "search": lambda campaigns: lambda client, n: client.get("/api/campaigns/search", params={"q": "summer", "limit": 20}),
+}
+
+async def run(args) -> dict:
+    engine, async_engine = make_engines(args.database_url, pool_size=args.concurrency)
+    seed(engine, args.campaigns, args.payouts)
+    results = {}
+    for mode, build in (("sync", build_sync_app), ("async", build_async_app)):
+        app = bind_app(build(), engine, async_engine)
+        results[mode] = {}
+        async with asgi_client(app) as client:
+            for name, scenario in SCENARIOS.items():
+                results[mode][name] = await drive(scenario(args.campaigns), client, args.requests, args.concurrency)
+    await async_engine.dispose()
+    engine.dispose()
+    return {
+        "benchmark": "async_engine",
+        "database": engine.url.get_backend_name(),
+        "campaigns": args.campaigns,
+        "payouts_per_campaign": args.payouts,
+        "concurrency": args.concurrency,
+        "results": results,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=DEFAULT_BENCH_URL)
+    parser.add_argument("--campaigns", type=int, default=2000)
+    parser.add_argument("--payouts", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    print(json.dumps(asyncio.run(run(parser.parse_args())), indent=2))
+
+if __name__ == "__main__":
+    main()
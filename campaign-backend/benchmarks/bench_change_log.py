@@ -0,0 +1,88 @@
+"""Campaign write throughput under the change log lock, by writer concurrency.
+
+Every writer updates its own campaigns, so the only thing they wait on is the
+Postgres advisory lock that keeps change log commits in seq order. "log_last"
+is the current implementation, which takes it right before the INSERT into
+the log and the COMMIT. "lock_first" takes it when the transaction begins, as
+record_changes used to before the writer's own statements. "no_lock" drops
+it, the ceiling the other two are measured against. On SQLite the lock is a
+no-op and writers serialize on the database instead, so the three coincide.
+
+    python -m benchmarks.bench_change_log --database-url postgresql://user:pw@localhost/bench
+"""
+import argparse
+import json
+import threading
+import time
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.common import DEFAULT_BENCH_URL, make_engines, seed, summarize
+from schemas.schema import CampaignUpdate
+from service import changes
+from service.service import campaign_service
+
+MODES = ("log_last", "lock_first", "no_lock")
+
+def run(engine, mode: str, writers: int, writes: int) -> dict:
+    # Same session settings as the API's AsyncSessionLocal
+    Session = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    lock_change_log = changes._lock_change_log
+    postgres = engine.dialect.name == "postgresql"
+
+    def lock_on_begin(session, transaction, connection):
+        if postgres:
+            connection.execute(select(func.pg_advisory_xact_lock(changes.CHANGE_LOG_LOCK)))
+
+    if mode == "lock_first":
+        event.listen(Session, "after_begin", lock_on_begin)
+    if mode != "log_last":
+        changes._lock_change_log = lambda db: None
+    latencies = []
+    errors = 0
+
+    def writer(campaign_id: int):
+        nonlocal errors
+        for n in range(writes):
+            started = time.perf_counter()
+            try:
+                with Session() as db:
+                    campaign_service.update_campaign(db, campaign_id, CampaignUpdate(title=f"Bench {n}"))
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=writer, args=(campaign_id,)) for campaign_id in range(1, writers + 1)]
+    started = time.perf_counter()
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        changes._lock_change_log = lock_change_log
+        if mode == "lock_first":
+            event.remove(Session, "after_begin", lock_on_begin)
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=DEFAULT_BENCH_URL)
+    parser.add_argument("--writes", type=int, default=200, help="updates per writer")
+    parser.add_argument("--writers", default="1,8,32")
+    args = parser.parse_args()
+
+    concurrency = [int(n) for n in args.writers.split(",")]
+    engine, _ = make_engines(args.database_url, pool_size=max(concurrency))
+    results = {}
+    for writers in concurrency:
+        results[writers] = {}
+        for mode in MODES:
+            seed(engine, writers, 1)
+            results[writers][mode] = run(engine, mode, writers, args.writes)
+    engine.dispose()
+    print(json.dumps({"benchmark": "change_log", "database": engine.dialect.name, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
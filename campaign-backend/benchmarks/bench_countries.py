@@ -0,0 +1,66 @@
+"""Country data: load cost per process and lookup / payout validation cost.
+
+Loading is split into reading the rows (countries.json vs the snapshot from
+``python -m database.countries``), building CountryEnum and building the
+indexed registry. "scan" lookups are the linear searches callers had to do
+before the registry had currency and name indexes.
+
+    python -m benchmarks.bench_countries
+"""
+import argparse
+import json
+import shutil
+import tempfile
+import timeit
+from enum import Enum
+
+from database.countries import COUNTRIES_PATH, build_registry, parse_rows, read_rows, write_snapshot
+from database.database import country_manager
+from schemas.schema import CampaignCreate, PayoutCreate
+
+def best(func, number: int, repeat: int = 7) -> float:
+    """Fastest mean time per call in microseconds"""
+    return round(min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1e6, 3)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=100_000, help="calls per timing of the per-call benchmarks")
+    args = parser.parse_args()
+    number = args.number
+
+    # Work on a copy so an existing snapshot next to countries.json is left alone
+    workdir = tempfile.mkdtemp()
+    path = shutil.copy2(COUNTRIES_PATH, workdir)
+    write_snapshot(path)
+    rows = parse_rows(path)
+    countries = list(build_registry(rows).by_code.values())
+    registry = country_manager.registry()
+    payouts = [{"country": code, "amount": 1.5} for code in list(registry.by_code)[:200]]
+
+    results = {
+        "load_us": {
+            "rows_from_json": best(lambda: parse_rows(path), 200),
+            "rows_from_snapshot": best(lambda: read_rows(path), 200),
+            "country_enum": best(lambda: Enum("CountryEnum", {row[0]: row[0] for row in rows}, type=str), 50),
+            "registry": best(lambda: build_registry(rows), 200),
+        },
+        "lookup_us": {
+            "by_code": best(lambda: country_manager.get_country_data("ZWE"), number),
+            "by_currency": best(lambda: country_manager.get_countries_by_currency("USD"), number),
+            "by_currency_scan": best(lambda: [c for c in countries if "USD" in c.currency_code], number // 100),
+            "by_name": best(lambda: country_manager.find_country("Korea, Republic of"), number),
+            "by_name_scan": best(lambda: next(c for c in countries if c.name.lower() == "korea, republic of"), number // 100),
+        },
+        "validation_us": {
+            "payout_dict": best(lambda: PayoutCreate.model_validate({"country": "ZWE", "amount": 1.5}), number),
+            "payout_json": best(lambda: PayoutCreate.model_validate_json(b'{"country":"ZWE","amount":1.5}'), number),
+            "campaign_200_payouts": best(
+                lambda: CampaignCreate.model_validate({"title": "t", "landing_url": "a.com", "payouts": payouts}), 500
+            ),
+        },
+    }
+    shutil.rmtree(workdir)
+    print(json.dumps({"benchmark": "countries", "countries": len(registry), "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
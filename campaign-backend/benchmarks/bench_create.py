@@ -0,0 +1,95 @@
+"""Campaign creation latency by payout count: the old two-commit path vs one transaction.
+
+"legacy" reproduces the previous CampaignService.create_campaign: commit and
+refresh the campaign, add payouts one at a time, commit and refresh again.
+"batched" is the current implementation. Each create runs in a fresh
+session, as it would per request, and the response model is built from the
+result so lazy loads are counted too.
+
+    python -m benchmarks.bench_create --creates 200
+    python -m benchmarks.bench_create --database-url postgresql://user:pw@localhost/bench
+"""
+import argparse
+import json
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, sessionmaker
+
+from benchmarks.common import DEFAULT_BENCH_URL, make_engines, percentile, seed
+from database.database import country_manager
+from models.models import Campaign, Payout
+from schemas.schema import Campaign as CampaignSchema, CampaignCreate
+from service.service import campaign_service
+
+def legacy_create_campaign(db: Session, campaign_data: CampaignCreate) -> Campaign:
+    db_campaign = Campaign(
+        title=campaign_data.title,
+        landing_url=campaign_data.landing_url,
+        is_running=campaign_data.is_running,
+    )
+    db.add(db_campaign)
+    db.commit()
+    db.refresh(db_campaign)
+    for payout_data in campaign_data.payouts:
+        db.add(Payout(country=payout_data.country, amount=payout_data.amount, campaign_id=db_campaign.id))
+    db.commit()
+    db.refresh(db_campaign)
+    return db_campaign
+
+IMPLEMENTATIONS = {
+    "legacy": legacy_create_campaign,
+    "batched": campaign_service.create_campaign,
+}
+
+def run(engine, create, payouts: int, creates: int) -> dict:
+    # Same session settings as the API's AsyncSessionLocal
+    Session = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    countries = list(country_manager.countries)[:payouts]
+    data = CampaignCreate(
+        title="Bench",
+        landing_url="bench.com",
+        is_running=True,
+        payouts=[{"country": country, "amount": 1.5} for country in countries],
+    )
+    statements = 0
+
+    def count(*args):
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    latencies = []
+    try:
+        for _ in range(creates):
+            started = time.perf_counter()
+            with Session() as db:
+                CampaignSchema.model_validate(create(db, data))
+            latencies.append(time.perf_counter() - started)
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return {
+        "statements_per_create": statements / creates,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=DEFAULT_BENCH_URL)
+    parser.add_argument("--creates", type=int, default=200)
+    parser.add_argument("--payouts", default="1,50,200")
+    args = parser.parse_args()
+
+    engine, _ = make_engines(args.database_url)
+    results = {}
+    for payouts in (int(n) for n in args.payouts.split(",")):
+        results[payouts] = {}
+        for name, create in IMPLEMENTATIONS.items():
+            seed(engine, 0, 0)
+            results[payouts][name] = run(engine, create, payouts, args.creates)
+    engine.dispose()
+    print(json.dumps({"benchmark": "create", "database": engine.dialect.name, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
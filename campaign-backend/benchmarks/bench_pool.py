@@ -0,0 +1,73 @@
+"""Request latency and pool checkout wait as concurrency grows past the pool size.
+
+Drives the async router with a deliberately small instrumented pool and, for
+each concurrency level, reports request latencies next to the pool's own
+wait-time and timeout counters, so queueing for a connection can be told
+apart from time spent in the database.
+
+    python -m benchmarks.bench_pool --pool-size 5 --max-overflow 0 --levels 1,5,10,20,40
+    python -m benchmarks.bench_pool --database-url postgresql://user:pw@localhost/bench
+"""
+import argparse
+import asyncio
+import json
+
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from benchmarks.common import DEFAULT_BENCH_URL, asgi_client, bind_app, drive, make_engines, seed
+from api.routes import router
+from database.database import to_async_url
+from database.pool import InstrumentedAsyncQueuePool, instrument_engine
+
+def scenario(campaigns: int):
+    return lambda client, n: client.get("/api/campaigns/", params={"skip": (n * 20) % campaigns, "limit": 20})
+
+async def run(args) -> dict:
+    engine, _ = make_engines(args.database_url)
+    seed(engine, args.campaigns, args.payouts)
+    levels = [int(level) for level in args.levels.split(",")]
+
+    results = {}
+    for concurrency in levels:
+        # A fresh engine per level keeps the pool counters separate
+        async_engine = create_async_engine(
+            to_async_url(args.database_url),
+            poolclass=InstrumentedAsyncQueuePool,
+            pool_size=args.pool_size,
+            max_overflow=args.max_overflow,
+            pool_timeout=args.pool_timeout,
+        )
+        metrics = instrument_engine(async_engine.sync_engine, f"bench-{concurrency}")
+        app = FastAPI()
+        app.include_router(router)
+        bind_app(app, engine, async_engine)
+        async with asgi_client(app) as client:
+            requests = await drive(scenario(args.campaigns), client, args.requests, concurrency)
+        results[concurrency] = {"requests": requests, "pool": metrics.snapshot()}
+        await async_engine.dispose()
+
+    engine.dispose()
+    return {
+        "benchmark": "pool",
+        "database": engine.url.get_backend_name(),
+        "pool_size": args.pool_size,
+        "max_overflow": args.max_overflow,
+        "campaigns": args.campaigns,
+        "results": results,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=DEFAULT_BENCH_URL)
+    parser.add_argument("--campaigns", type=int, default=2000)
+    parser.add_argument("--payouts", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--pool-size", type=int, default=5)
+    parser.add_argument("--max-overflow", type=int, default=0)
+    parser.add_argument("--pool-timeout", type=float, default=30.0)
+    parser.add_argument("--levels", default="1,5,10,20,40")
+    print(json.dumps(asyncio.run(run(parser.parse_args())), indent=2))
+
+if __name__ == "__main__":
+    main()
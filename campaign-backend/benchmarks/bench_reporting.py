@@ -0,0 +1,81 @@
+"""Payout report latency: rows into Python vs SQL GROUP BY vs the maintained summary table.
+
+"python" is the old route to a total: load every payout of a country with
+PayoutService.get_payouts_by_country and add them up. "live" runs the report's
+GROUP BY over all payouts, and "summary" reads payout_country_stats, both
+right after a build and after a write that leaves one country stale.
+
+    python -m benchmarks.bench_reporting --campaigns 200000 --payouts 5
+    python -m benchmarks.bench_reporting --database-url postgresql://user:pw@localhost/bench
+"""
+import argparse
+import json
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.common import DEFAULT_BENCH_URL, make_engines, percentile, seed
+from database.database import country_manager
+from service.reporting import mark_payouts_stale, reporting_service
+from service.service import payout_service
+
+def timed(func, repeat: int) -> dict:
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - started)
+    return {
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "max_ms": round(max(latencies) * 1000, 3),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=DEFAULT_BENCH_URL)
+    parser.add_argument("--campaigns", type=int, default=200_000)
+    parser.add_argument("--payouts", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine, _ = make_engines(args.database_url)
+    seed(engine, args.campaigns, args.payouts)
+    Session = sessionmaker(bind=engine)
+    country = next(iter(country_manager.countries))
+
+    def python_total():
+        with Session() as db:
+            sum(payout.amount for payout in payout_service.get_payouts_by_country(db, country))
+
+    def report(source: str):
+        with Session() as db:
+            reporting_service.payout_report(db, source=source)
+
+    def report_after_write():
+        with Session() as db:
+            mark_payouts_stale(db, [country])
+            db.commit()
+        report("summary")
+
+    def rebuild():
+        with Session() as db:
+            reporting_service.rebuild_summary(db)
+
+    results = {
+        "python_one_country": timed(python_total, args.repeat),
+        "live_group_by": timed(lambda: report("live"), args.repeat),
+        "summary_rebuild": timed(rebuild, args.repeat),
+        "summary_warm": timed(lambda: report("summary"), args.repeat),
+        "summary_one_stale_country": timed(report_after_write, args.repeat),
+    }
+    engine.dispose()
+    print(json.dumps({
+        "benchmark": "reporting",
+        "database": engine.dialect.name,
+        "campaigns": args.campaigns,
+        "payouts": args.campaigns * args.payouts,
+        "results": results,
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
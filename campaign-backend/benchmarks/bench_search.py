@@ -0,0 +1,91 @@
+"""Campaign search latency: ILIKE scans vs the indexed backend on a synthetic dataset.
+
+Seeds campaigns whose titles and landing URLs are drawn from a fixed
+vocabulary, then runs the same search terms through every backend that is
+available on the target database (ILIKE everywhere, FTS5 on SQLite, pg_trgm
+on Postgres).
+
+    python -m benchmarks.bench_search --campaigns 1000000
+    python -m benchmarks.bench_search --database-url postgresql://user:pw@localhost/bench
+"""
+import argparse
+import json
+import random
+import time
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.common import DEFAULT_BENCH_URL, make_engines, percentile, seed
+from models.models import Campaign
+from service.search import DIALECT_BACKENDS, SEARCH_BACKENDS
+from service.service import CampaignService
+
+WORDS = [
+    "summer", "winter", "spring", "autumn", "flash", "mega", "super", "holiday", "black",
+    "friday", "cyber", "monday", "sale", "deal", "promo", "launch", "brand", "mobile",
+    "casino", "travel", "fashion", "crypto", "dating", "finance", "gaming", "fitness",
+    "beauty", "health", "insurance", "loans", "shopping", "streaming", "vpn", "sports",
+]
+
+TERMS = ["summer", "black friday", "vpn", "crypto sale", "partner42", "zzzz-no-match"]
+
+def seed_search_dataset(engine, campaigns: int, batch_size: int = 10000) -> None:
+    seed(engine, 0, 0)
+    rng = random.Random(42)
+    with engine.begin() as conn:
+        for start in range(0, campaigns, batch_size):
+            conn.execute(insert(Campaign.__table__), [
+                {
+                    "title": " ".join(rng.sample(WORDS, 3)).title(),
+                    "landing_url": f"https://www.partner{rng.randrange(5000)}.com/{rng.choice(WORDS)}",
+                    "is_running": rng.random() < 0.7,
+                }
+                for _ in range(start, min(start + batch_size, campaigns))
+            ])
+
+def time_search(session_factory, service: CampaignService, term: str, repeat: int) -> dict:
+    latencies = []
+    with session_factory() as db:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            results = service.search_campaigns(db, term, 0, 20)
+            latencies.append(time.perf_counter() - started)
+    return {
+        "results": len(results),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=DEFAULT_BENCH_URL)
+    parser.add_argument("--campaigns", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine, _ = make_engines(args.database_url)
+    started = time.perf_counter()
+    seed_search_dataset(engine, args.campaigns)
+    seed_seconds = time.perf_counter() - started
+    session_factory = sessionmaker(bind=engine)
+
+    results = {}
+    indexed = DIALECT_BACKENDS.get(engine.dialect.name)
+    for name in ("like", indexed):
+        backend = SEARCH_BACKENDS.get(name)
+        if backend is None or not backend.is_available(engine):
+            continue
+        service = CampaignService(search_backend=backend)
+        results[name] = {term: time_search(session_factory, service, term, args.repeat) for term in TERMS}
+
+    print(json.dumps({
+        "benchmark": "search",
+        "database": engine.dialect.name,
+        "campaigns": args.campaigns,
+        "seed_seconds": round(seed_seconds, 2),
+        "results": results,
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
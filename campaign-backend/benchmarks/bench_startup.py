@@ -0,0 +1,140 @@
+"""Cold start and per-worker memory of the serving modes.
+
+"gunicorn_preload" is the production setup in gunicorn.conf.py, "gunicorn"
+the same without preload_app (each worker imports the app itself) and
+"uvicorn" the old single process. Every start gets a fresh SQLite database in
+a temporary directory, so the first boot includes the migrations, and is
+timed until all workers have finished their startup and the health check
+answers. Memory is read from /proc (Linux only), idle and again after
+``--requests`` warm-up requests: RSS counts shared pages in full for every
+process, PSS splits them between the processes sharing them (so the sum of
+PSS is what the deployment really uses) and USS is what each process alone
+holds.
+
+    python -m benchmarks.bench_startup --workers 4
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.common import percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+READY_LINE = "Application startup complete"
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def command(mode: str, port: int) -> List[str]:
+    if mode == "uvicorn":
+        return [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)]
+    return [sys.executable, "-m", "gunicorn", "-c", os.path.join(BACKEND_DIR, "gunicorn.conf.py"), "main:app"]
+
+def memory_kb(pid: int) -> Dict[str, int]:
+    values = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                values["rss"] = int(line.split()[1])
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        fields = {line.split(":")[0]: int(line.split()[1]) for line in f if line.endswith("kB\n")}
+    values["pss"] = fields["Pss"]
+    values["uss"] = fields["Private_Clean"] + fields["Private_Dirty"]
+    return values
+
+def children(pid: int) -> List[int]:
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(child) for child in f.read().split()]
+
+def memory_report(pid: int, mode: str) -> dict:
+    workers = [pid] if mode == "uvicorn" else children(pid)
+    per_worker = [memory_kb(worker) for worker in workers]
+    report = {
+        "worker_rss_mb": round(statistics.mean(m["rss"] for m in per_worker) / 1024, 1),
+        "worker_pss_mb": round(statistics.mean(m["pss"] for m in per_worker) / 1024, 1),
+        "worker_uss_mb": round(statistics.mean(m["uss"] for m in per_worker) / 1024, 1),
+        "total_pss_mb": round(sum(m["pss"] for m in per_worker) / 1024, 1),
+    }
+    if mode != "uvicorn":
+        master = memory_kb(pid)
+        report["master_rss_mb"] = round(master["rss"] / 1024, 1)
+        report["total_pss_mb"] = round(report["total_pss_mb"] + master["pss"] / 1024, 1)
+    return report
+
+def start(mode: str, workers: int, requests: int) -> dict:
+    port = free_port()
+    env = {**os.environ, "PYTHONPATH": BACKEND_DIR}
+    if mode == "uvicorn":
+        # uvicorn also reads WEB_CONCURRENCY, as its --workers
+        env.pop("WEB_CONCURRENCY", None)
+    else:
+        env.update({
+            "BIND": f"127.0.0.1:{port}",
+            "WEB_CONCURRENCY": str(workers),
+            "GUNICORN_PRELOAD": str(mode == "gunicorn_preload").lower(),
+        })
+    expected = 1 if mode == "uvicorn" else workers
+    ready = threading.Event()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            command(mode, port), cwd=workdir, env=env, stderr=subprocess.PIPE, stdout=subprocess.DEVNULL, text=True
+        )
+
+        def watch():
+            booted = 0
+            for line in process.stderr:
+                booted += READY_LINE in line
+                if booted == expected:
+                    ready.set()
+
+        threading.Thread(target=watch, daemon=True).start()
+        try:
+            if not ready.wait(120):
+                raise SystemExit(f"{mode} did not start within 120s")
+            with httpx.Client(base_url=f"http://127.0.0.1:{port}") as client:
+                while client.get("/").status_code != 200:
+                    time.sleep(0.01)
+                cold_start = time.perf_counter() - started
+                idle = memory_report(process.pid, mode)
+                for n in range(requests):
+                    client.get("/api/campaigns/countries" if n % 2 else "/api/campaigns/")
+                warm = memory_report(process.pid, mode)
+        finally:
+            process.terminate()
+            process.wait(30)
+    return {"cold_start_s": cold_start, "idle": idle, "warm": warm}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--modes", default="gunicorn_preload,gunicorn,uvicorn")
+    parser.add_argument("--repeat", type=int, default=3, help="starts per mode; cold start is the median")
+    parser.add_argument("--requests", type=int, default=200, help="warm-up requests before the second memory reading")
+    args = parser.parse_args()
+
+    results = {}
+    for mode in args.modes.split(","):
+        runs = [start(mode, args.workers, args.requests) for _ in range(args.repeat)]
+        results[mode] = {
+            "cold_start_s": round(percentile([run["cold_start_s"] for run in runs], 50), 3),
+            "idle": runs[-1]["idle"],
+            "warm": runs[-1]["warm"],
+        }
+    print(json.dumps({"benchmark": "startup", "workers": args.workers, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
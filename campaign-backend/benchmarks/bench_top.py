@@ -0,0 +1,108 @@
+"""Top-K running campaigns per country: Python sort vs SQL ORDER BY vs the in-memory ranking.
+
+"python_sort" is the old route: load every payout of the country with
+PayoutService.get_payouts_by_country and sort them in Python (still without
+skipping paused campaigns). "sql_order_by" asks the database for the top K
+running campaigns with the existing indexes. "index_*" use the PayoutIndex
+rankings behind GET /api/campaigns/top: one page, a page deep into the
+ranking and the refresh after a toggle, which re-ranks the campaign in every
+country it pays out in.
+
+    python -m benchmarks.bench_top --campaigns 100000 --payouts 10
+"""
+import argparse
+import json
+import time
+
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.common import DEFAULT_BENCH_URL, make_engines, percentile, seed
+from database.database import CountryEnum, country_manager
+from models.models import Campaign, Payout
+from service.resolution import PayoutIndex
+from service.service import payout_service
+
+def timed(func, repeat: int) -> dict:
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - started)
+    return {
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "max_ms": round(max(latencies) * 1000, 3),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=DEFAULT_BENCH_URL)
+    parser.add_argument("--campaigns", type=int, default=100_000)
+    parser.add_argument("--payouts", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10, help="K, the page size")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    engine, _ = make_engines(args.database_url)
+    seed(engine, args.campaigns, args.payouts)
+    Session = sessionmaker(bind=engine)
+    country = next(iter(country_manager.countries))
+    index = PayoutIndex()
+
+    def python_sort():
+        with Session() as db:
+            payouts = payout_service.get_payouts_by_country(db, CountryEnum(country))
+            sorted(payouts, key=lambda payout: (-payout.amount, payout.campaign_id))[:args.top]
+
+    def sql_order_by():
+        with Session() as db:
+            db.execute(
+                select(Payout.campaign_id, Payout.amount)
+                .join(Campaign, Payout.campaign_id == Campaign.id)
+                .where(Payout.country == country, Campaign.is_running)
+                .order_by(Payout.amount.desc(), Payout.campaign_id)
+                .limit(args.top)
+            ).all()
+
+    def rebuild():
+        with Session() as db:
+            index.rebuild(db)
+
+    def toggle():
+        with Session() as db:
+            campaign = db.get(Campaign, 1)
+            campaign.is_running = not campaign.is_running
+            db.commit()
+            started = time.perf_counter()
+            index.refresh(db, [1])
+            return time.perf_counter() - started
+
+    results = {
+        "python_sort": timed(python_sort, max(args.repeat // 4, 1)),
+        "sql_order_by": timed(sql_order_by, args.repeat),
+        "index_build": timed(rebuild, 3),
+    }
+    deep = index.top(country, 1000)[-1][::-1]
+    results.update({
+        "index_top": timed(lambda: index.top_page(country, args.top), args.repeat * 50),
+        "index_page_after_1000": timed(lambda: index.top(country, args.top, deep), args.repeat * 50),
+    })
+    refreshes = [toggle() for _ in range(args.repeat)]
+    results["index_refresh_after_toggle"] = {
+        "p50_ms": round(percentile(refreshes, 50) * 1000, 3),
+        "max_ms": round(max(refreshes) * 1000, 3),
+    }
+    rankings = index._rankings.values()
+    engine.dispose()
+    print(json.dumps({
+        "benchmark": "top",
+        "database": engine.dialect.name,
+        "campaigns": args.campaigns,
+        "payouts": args.campaigns * args.payouts,
+        "ranked_payouts": sum(len(ranking) for ranking in rankings),
+        "ranking_mb": round(sum(len(r) * 16 for r in rankings) / 2 ** 20, 1),
+        "results": results,
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
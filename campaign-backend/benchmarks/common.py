@@ -0,0 +1,130 @@
+# benchmarks/common.py
+import asyncio
+import os
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine, insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from database.database import (
+    Base, country_manager, get_db, get_async_db, get_async_read_db, get_async_read_session_factory,
+    get_async_session_factory, to_async_url
+)
+from models.models import Campaign, Payout
+
+DEFAULT_BENCH_URL = "sqlite:///./bench.db"
+
+def make_engines(url: str = DEFAULT_BENCH_URL, pool_size: int = 5):
+    """Build a sync and an async engine against the same database.
+
+    Size ``pool_size`` to the benchmark concurrency: blocking handlers hold
+    the event loop while they wait for a connection, so an undersized sync
+    pool deadlocks until the pool timeout instead of measuring anything.
+    """
+    sqlite = url.startswith("sqlite")
+    connect_args = {"check_same_thread": False} if sqlite else {}
+    engine = create_engine(url, connect_args=connect_args, pool_size=pool_size)
+    # aiosqlite opens a connection per checkout (NullPool), so it takes no pool size
+    async_engine = create_async_engine(to_async_url(url), **({} if sqlite else {"pool_size": pool_size}))
+    return engine, async_engine
+
+def seed(engine: Engine, campaigns: int, payouts_per_campaign: int, batch_size: int = 1000) -> None:
+    """Recreate the schema and fill it with synthetic campaigns and payouts"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    countries = list(country_manager.countries)[:payouts_per_campaign]
+
+    with engine.begin() as conn:
+        for start in range(0, campaigns, batch_size):
+            ids = range(start + 1, min(start + batch_size, campaigns) + 1)
+            conn.execute(insert(Campaign.__table__), [
+                {
+                    "id": i,
+                    "title": f"Campaign {i} {'summer' if i % 7 == 0 else 'promo'}",
+                    "landing_url": f"https://www.partner{i % 500}.com",
+                    "is_running": i % 3 != 0,
+                }
+                for i in ids
+            ])
+            if countries:
+                conn.execute(insert(Payout.__table__), [
+                    {"campaign_id": i, "country": code, "amount": float(1 + (i * 7 + n) % 250)}
+                    for i in ids
+                    for n, code in enumerate(countries)
+                ])
+
+def bind_app(app: FastAPI, engine: Engine, async_engine: AsyncEngine) -> FastAPI:
+    """Point an app's database dependencies at the benchmark engines"""
+    SyncSession = sessionmaker(bind=engine, autoflush=False)
+    AsyncSessionFactory = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+    def override_get_db():
+        db = SyncSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def override_get_async_db():
+        async with AsyncSessionFactory() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_async_read_db] = override_get_async_db
+    app.dependency_overrides[get_async_session_factory] = lambda: AsyncSessionFactory
+    app.dependency_overrides[get_async_read_session_factory] = lambda: AsyncSessionFactory
+    return app
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def summarize(latencies: List[float], elapsed: float, errors: int = 0) -> Dict[str, float]:
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+async def drive(
+    make_request: Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]],
+    client: httpx.AsyncClient,
+    total: int,
+    concurrency: int,
+) -> Dict[str, float]:
+    """Issue ``total`` requests from ``concurrency`` workers and summarize latencies"""
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for n in counter:
+            started = time.perf_counter()
+            response = await make_request(client, n)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+def asgi_client(app: FastAPI, base_url: Optional[str] = None) -> httpx.AsyncClient:
+    if base_url:
+        return httpx.AsyncClient(base_url=base_url, timeout=60)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
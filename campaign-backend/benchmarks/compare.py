@@ -0,0 +1,46 @@
+"""Compare two benchmark reports scenario by scenario.
+
+Works on any report whose ``results`` map scenario names to the summaries
+from benchmarks.common.summarize, e.g. bench_api output.
+
+    python -m benchmarks.compare before.json after.json
+"""
+import argparse
+import json
+import sys
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "throughput_rps")
+
+def change(before: float, after: float) -> str:
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+def compare(before: dict, after: dict) -> str:
+    if before.get("schema") != after.get("schema"):
+        print("warning: reports use different schema versions", file=sys.stderr)
+    lines = [f"{'scenario':<16}" + "".join(f"  {metric:>30}" for metric in METRICS)]
+    for name, old in before["results"].items():
+        new = after["results"].get(name)
+        if new is None:
+            continue
+        cells = "".join(
+            f"  {f'{old[m]} -> {new[m]} ({change(old[m], new[m])})':>30}" for m in METRICS
+        )
+        errors = f"  errors {old['errors']} -> {new['errors']}" if old["errors"] or new["errors"] else ""
+        lines.append(f"{name:<16}{cells}{errors}")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    print(compare(before, after))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Read-only country table compiled from countries.json.
+
+``python -m database.countries`` writes countries.snapshot, a marshal dump of
+the parsed rows, which later imports load instead of parsing the JSON. The
+snapshot is only used while it matches countries.json's size and mtime and
+the running Python version, so editing the JSON needs no extra step; the
+Docker image builds it once.
+"""
+import json
+import marshal
+import os
+import re
+import sys
+import unicodedata
+from types import MappingProxyType
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+COUNTRIES_PATH = os.path.join(os.path.dirname(__file__), "countries.json")
+SNAPSHOT_FORMAT = 1
+
+# code, name, currency_code, currency_name
+Row = Tuple[str, str, str, str]
+
+class CountryData(NamedTuple):
+    name: str
+    code: str
+    currency_code: str
+    currency_name: str
+
+    @property
+    def currencies(self) -> Tuple[str, ...]:
+        """Codes listed in currency_code, which holds two for some countries, e.g. "USD / US$" """
+        return tuple(part.strip().upper() for part in self.currency_code.split("/"))
+
+WORD = re.compile(r"\w+")
+
+def normalize_name(name: str) -> str:
+    """Case, accents, punctuation and repeated spaces ignored: "Korea, Republic of" -> "korea republic of" """
+    name = name.casefold()
+    if not name.isascii():
+        name = "".join(c for c in unicodedata.normalize("NFKD", name) if not unicodedata.combining(c))
+    return " ".join(WORD.findall(name))
+
+class CountryRegistry:
+    """Immutable countries with O(1) lookups by code, currency and normalized name"""
+    __slots__ = ("by_code", "by_currency", "by_name")
+
+    def __init__(self, countries: Iterable[CountryData]):
+        by_code, by_currency, by_name = {}, {}, {}
+        for country in countries:
+            by_code[country.code] = country
+            by_name[normalize_name(country.name)] = country
+            for currency in country.currencies:
+                by_currency.setdefault(currency, []).append(country)
+        object.__setattr__(self, "by_code", MappingProxyType(by_code))
+        object.__setattr__(self, "by_currency", MappingProxyType(
+            {currency: tuple(members) for currency, members in by_currency.items()}
+        ))
+        object.__setattr__(self, "by_name", MappingProxyType(by_name))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CountryRegistry is read-only")
+
+    def __len__(self) -> int:
+        return len(self.by_code)
+
+    def get(self, code: str) -> Optional[CountryData]:
+        return self.by_code.get(code)
+
+    def with_currency(self, currency: str) -> Tuple[CountryData, ...]:
+        return self.by_currency.get(currency.strip().upper(), ())
+
+    def find(self, name: str) -> Optional[CountryData]:
+        return self.by_name.get(normalize_name(name))
+
+def _snapshot_path(path: str) -> str:
+    return os.path.splitext(path)[0] + ".snapshot"
+
+def _stamp(path: str) -> tuple:
+    stat = os.stat(path)
+    return (SNAPSHOT_FORMAT, tuple(sys.version_info[:2]), stat.st_size, stat.st_mtime_ns)
+
+def parse_rows(path: str = COUNTRIES_PATH) -> List[Row]:
+    with open(path) as f:
+        data = json.load(f)
+    return [
+        (country["COUNTRY_CODE"], country["COUNTRY"], country["CURRENCY_CODE"], country["NAME_OF_CURRENCY"])
+        for country in data["countries"]
+    ]
+
+def read_rows(path: str = COUNTRIES_PATH) -> List[Row]:
+    """Rows from the snapshot when it is current, otherwise parsed from the JSON"""
+    try:
+        # One read: marshal.load on the file object reads it in small pieces
+        with open(_snapshot_path(path), "rb") as f:
+            stamp, rows = marshal.loads(f.read())
+        if stamp == _stamp(path):
+            return rows
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+    return parse_rows(path)
+
+def write_snapshot(path: str = COUNTRIES_PATH) -> str:
+    snapshot = _snapshot_path(path)
+    with open(snapshot + ".tmp", "wb") as f:
+        marshal.dump((_stamp(path), parse_rows(path)), f)
+    os.replace(snapshot + ".tmp", snapshot)
+    return snapshot
+
+def build_registry(rows: Iterable[Row]) -> CountryRegistry:
+    return CountryRegistry(
+        CountryData(name, code, currency_code, currency_name)
+        for code, name, currency_code, currency_name in rows
+    )
+
+if __name__ == "__main__":
+    print(f"Wrote {write_snapshot()}")
@@ -1,12 +1,28 @@
 import os
-import json
-from decouple import config
-from sqlalchemy import create_engine
+from decouple import Csv, config
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from enum import Enum
-from dataclasses import dataclass
-from typing import Dict, Optional
+from typing import List, Mapping, Optional, Tuple
+from database.countries import CountryData, CountryRegistry, Row, build_registry, read_rows
+from database.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool, instrument_engine
+from database.replicas import ReplicaSet, RoutingSession
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def to_async_url(url: str) -> str:
+    """Swap the driver of a sync database URL for its asyncio counterpart"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend}")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
 
 class DatabaseConfig:
     def __init__(self):
@@ -15,6 +31,17 @@ class DatabaseConfig:
         self.db = config('POSTGRES_DB', default=None)
         self.host = config('POSTGRES_HOST', default='localhost')
         self.port = config('POSTGRES_PORT', default='5432')
+        # Pool sizing is per engine and per worker process: budget
+        # workers * (pool_size + max_overflow) against the server's max_connections
+        self.pool_size = config('DB_POOL_SIZE', default=5, cast=int)
+        self.max_overflow = config('DB_MAX_OVERFLOW', default=10, cast=int)
+        self.pool_timeout = config('DB_POOL_TIMEOUT', default=30.0, cast=float)
+        self.pool_recycle = config('DB_POOL_RECYCLE', default=1800, cast=int)
+        self.pool_pre_ping = config('DB_POOL_PRE_PING', default=True, cast=bool)
+        self.statement_timeout_ms = config('DB_STATEMENT_TIMEOUT_MS', default=0, cast=int)
+        # Read replicas of the primary (same dialect), as sync URLs; GET endpoints read from them
+        self.replica_urls = config('DB_REPLICA_URLS', default='', cast=Csv())
+        self.replica_retry_after = config('DB_REPLICA_RETRY_AFTER', default=30.0, cast=float)
 
     @property
     def is_postgres_configured(self) -> bool:
@@ -25,32 +52,87 @@ class DatabaseConfig:
             return f"postgresql://{self.user}:{self.password}@{self.host}:{self.port}/{self.db}"
         return "sqlite:///./sql_app.db"
 
+    def get_async_database_url(self) -> str:
+        return to_async_url(self.get_database_url())
+
+    def engine_options(self, is_async: bool = False) -> dict:
+        """Keyword arguments for create_engine / create_async_engine"""
+        options = {
+            "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+            "pool_size": self.pool_size,
+            "max_overflow": self.max_overflow,
+            "pool_timeout": self.pool_timeout,
+            "pool_recycle": self.pool_recycle,
+            "pool_pre_ping": self.pool_pre_ping,
+        }
+        if not self.is_postgres_configured:
+            if not is_async:
+                options["connect_args"] = {"check_same_thread": False}
+        elif self.statement_timeout_ms:
+            timeout = str(self.statement_timeout_ms)
+            options["connect_args"] = (
+                {"server_settings": {"statement_timeout": timeout}} if is_async
+                else {"options": f"-c statement_timeout={timeout}"}
+            )
+        return options
+
 db_config = DatabaseConfig()
 SQLALCHEMY_DATABASE_URL = db_config.get_database_url()
+SQLALCHEMY_ASYNC_DATABASE_URL = db_config.get_async_database_url()
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False} if SQLALCHEMY_DATABASE_URL.startswith("sqlite") else {}
-)
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **db_config.engine_options())
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base = declarative_base()
+async_engine = create_async_engine(SQLALCHEMY_ASYNC_DATABASE_URL, **db_config.engine_options(is_async=True))
+
+instrument_engine(engine, "sync")
+instrument_engine(async_engine.sync_engine, "async")
+
+# Objects are handed to the response serializer after commit, where any
+# refresh would need IO outside the session's greenlet, so keep them loaded.
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
 
-@dataclass
-class CountryData:
-    name: str
-    code: str
-    currency_code: str
-    currency_name: str
+replica_engines = [
+    create_async_engine(to_async_url(url), **db_config.engine_options(is_async=True))
+    for url in db_config.replica_urls
+]
+for n, replica in enumerate(replica_engines):
+    instrument_engine(replica.sync_engine, f"replica{n}")
+replica_set = ReplicaSet([replica.sync_engine for replica in replica_engines], db_config.replica_retry_after)
+
+# Sessions for read-only endpoints; the same as AsyncSessionLocal without replicas
+AsyncReadSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    replicas=replica_set,
+    autoflush=False,
+    expire_on_commit=False
+) if replica_set else AsyncSessionLocal
+
+Base = declarative_base()
 
 class CountryEnum(str, Enum):
     """Dynamic Enum class for countries"""
     pass
 
 class CountryManager:
+    """Country codes, names and currencies from countries.json, see database/countries.py.
+
+    CountryEnum is built at import because models and schemas use it; the
+    indexed registry behind the lookups is built on first use.
+    """
     _instance = None
-    countries: Dict[str, CountryData] = {}
+    _rows: List[Row] = []
+    _registry: Optional[CountryRegistry] = None
+    # Bumped on every (re)load so derived data, e.g. the /countries payload, knows to rebuild
+    version: int = 0
 
     def __new__(cls):
         if cls._instance is None:
@@ -60,32 +142,50 @@ class CountryManager:
 
     @classmethod
     def _load_countries(cls):
-        """Load countries from JSON file and create enum members"""
-        with open(os.path.join(os.path.dirname(__file__), 'countries.json')) as f:
-            data = json.load(f)
-
-        # Create enum members dynamically using country codes
-        country_members = {
-            country["COUNTRY_CODE"]: country["COUNTRY_CODE"]
-            for country in data["countries"]
-        }
+        """Load the country rows and create enum members from their codes"""
+        rows = read_rows()
         global CountryEnum
-        CountryEnum = Enum('CountryEnum', country_members, type=str)
-
-        # Store country data
-        cls.countries = {
-            country["COUNTRY_CODE"]: CountryData(
-                name=country["COUNTRY"],
-                code=country["COUNTRY_CODE"],
-                currency_code=country["CURRENCY_CODE"],
-                currency_name=country["NAME_OF_CURRENCY"]
-            )
-            for country in data["countries"]
-        }
+        CountryEnum = Enum('CountryEnum', {row[0]: row[0] for row in rows}, type=str)
+        cls._store_countries(rows)
+
+    @classmethod
+    def _store_countries(cls, rows: List[Row]):
+        cls._rows = rows
+        cls._registry = None
+        cls.version += 1
+
+    @classmethod
+    def reload(cls):
+        """Re-read countries.json after it changes.
+
+        Names and currencies are refreshed in place. New country codes still need
+        a restart, because models and schemas hold the CountryEnum built at import.
+        """
+        cls._store_countries(read_rows())
+
+    @classmethod
+    def registry(cls) -> CountryRegistry:
+        registry = cls._registry
+        if registry is None:
+            registry = cls._registry = build_registry(cls._rows)
+        return registry
+
+    @property
+    def countries(self) -> Mapping[str, CountryData]:
+        return self.registry().by_code
 
     @classmethod
     def get_country_data(cls, country_code: str) -> Optional[CountryData]:
-        return cls.countries.get(country_code)
+        return (cls._registry or cls.registry()).by_code.get(country_code)
+
+    @classmethod
+    def get_countries_by_currency(cls, currency_code: str) -> Tuple[CountryData, ...]:
+        return cls.registry().with_currency(currency_code)
+
+    @classmethod
+    def find_country(cls, name: str) -> Optional[CountryData]:
+        """Look a country up by name, ignoring case, accents and punctuation"""
+        return cls.registry().find(name)
 
 # Initialize CountryManager
 country_manager = CountryManager()
@@ -97,5 +197,43 @@ def get_db():
     finally:
         db.close()
 
-def init_db():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def get_async_session_factory() -> async_sessionmaker:
+    """Session factory for work that outlives the request's dependencies, such as streamed bodies"""
+    return AsyncSessionLocal
+
+async def get_async_read_db():
+    """Session for read-only endpoints: reads go to a replica when DB_REPLICA_URLS is set"""
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+def get_async_read_session_factory() -> async_sessionmaker:
+    return AsyncReadSessionLocal
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def alembic_config(url: str = SQLALCHEMY_DATABASE_URL):
+    from alembic.config import Config
+    cfg = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    cfg.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+    cfg.set_main_option("sqlalchemy.url", url.replace("%", "%%"))
+    return cfg
+
+def init_db(bind=None):
+    """Upgrade the schema to the latest Alembic revision.
+
+    Databases created by the old create_all startup have the tables but no
+    alembic_version, so they are stamped at 0001 before upgrading.
+    """
+    from alembic import command
+    bind = bind if bind is not None else engine
+    cfg = alembic_config(bind.url.render_as_string(hide_password=False))
+    with bind.begin() as connection:
+        cfg.attributes["connection"] = connection
+        tables = inspect(connection).get_table_names()
+        if "campaigns" in tables and "alembic_version" not in tables:
+            command.stamp(cfg, "0001")
+        command.upgrade(cfg, "head")
\ No newline at end of file
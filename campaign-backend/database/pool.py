@@ -0,0 +1,118 @@
+import time
+from collections import deque
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from typing import Deque, Dict, Optional
+
+class PoolMetrics:
+    """Counters and checkout wait times for one engine's connection pool.
+
+    Counts come from SQLAlchemy pool events; wait time is measured around the
+    pool's own checkout so it includes queueing for a free connection and
+    opening overflow connections.
+    """
+
+    def __init__(self, name: str, sample_size: int = 1024):
+        self.name = name
+        self.engine: Optional[Engine] = None
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self._recent_waits: Deque[float] = deque(maxlen=sample_size)
+
+    def observe_wait(self, seconds: float) -> None:
+        self.wait_count += 1
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+        self._recent_waits.append(seconds)
+
+    def _recent_percentile(self, pct: float) -> float:
+        if not self._recent_waits:
+            return 0.0
+        ordered = sorted(self._recent_waits)
+        return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+    def snapshot(self) -> Dict[str, object]:
+        pool = self.engine.pool if self.engine is not None else None
+        gauges = {}
+        if isinstance(pool, QueuePool):
+            gauges = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": pool._max_overflow,
+            }
+        return {
+            **gauges,
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "invalidations": self.invalidations,
+            "timeouts": self.timeouts,
+            "wait_count": self.wait_count,
+            "wait_avg_ms": round(self.wait_total / self.wait_count * 1000, 3) if self.wait_count else 0.0,
+            "wait_p95_ms": round(self._recent_percentile(95) * 1000, 3),
+            "wait_max_ms": round(self.wait_max * 1000, 3),
+        }
+
+class _TimedCheckout:
+    """Times QueuePool._do_get, the blocking part of a checkout"""
+    metrics: Optional[PoolMetrics] = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            if self.metrics is not None:
+                self.metrics.timeouts += 1
+            raise
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe_wait(time.perf_counter() - started)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+class InstrumentedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+class InstrumentedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+pool_metrics: Dict[str, PoolMetrics] = {}
+
+def instrument_engine(engine: Engine, name: str) -> PoolMetrics:
+    """Register pool metrics for a sync engine (pass ``AsyncEngine.sync_engine`` for async ones)"""
+    metrics = PoolMetrics(name)
+    metrics.engine = engine
+    if isinstance(engine.pool, _TimedCheckout):
+        engine.pool.metrics = metrics
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        metrics.connects += 1
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.checkouts += 1
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        metrics.checkins += 1
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.invalidations += 1
+
+    pool_metrics[name] = metrics
+    return metrics
@@ -0,0 +1,97 @@
+import itertools
+import logging
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Delete, Insert, Update
+from sqlalchemy.sql.elements import TextClause
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class ReplicaSet:
+    """Round-robin over read replicas, skipping ones that recently failed.
+
+    A replica whose connection attempt fails, or whose connection drops, is
+    left out for ``retry_after`` seconds; after that the next pick tries it
+    again and it either serves or goes back out. Pass sync engines
+    (``AsyncEngine.sync_engine`` for async ones).
+    """
+
+    def __init__(self, engines: List[Engine], retry_after: float = 30.0):
+        self.engines = engines
+        self.retry_after = retry_after
+        self._down_until: Dict[Engine, float] = {}
+        self._turn = itertools.count()
+        for engine in engines:
+            event.listen(engine, "handle_error", self._on_error)
+
+    def __bool__(self) -> bool:
+        return bool(self.engines)
+
+    def pick(self) -> Optional[Engine]:
+        """The next healthy replica, or None when all are down"""
+        now = time.monotonic()
+        for _ in range(len(self.engines)):
+            engine = self.engines[next(self._turn) % len(self.engines)]
+            if self._down_until.get(engine, 0.0) <= now:
+                return engine
+        return None
+
+    def mark_down(self, engine: Engine) -> None:
+        if self._down_until.get(engine, 0.0) <= time.monotonic():
+            logger.warning(f"Replica {engine.url.render_as_string()} is down, reads go elsewhere for {self.retry_after}s")
+        self._down_until[engine] = time.monotonic() + self.retry_after
+
+    def _on_error(self, context) -> None:
+        # No connection means connecting failed; query errors leave the replica in rotation
+        if context.connection is None or context.is_disconnect:
+            self.mark_down(context.engine)
+
+    def status(self) -> List[dict]:
+        now = time.monotonic()
+        return [
+            {
+                "url": engine.url.render_as_string(),
+                "healthy": self._down_until.get(engine, 0.0) <= now,
+                "retry_in_s": round(max(self._down_until.get(engine, 0.0) - now, 0.0), 1),
+            }
+            for engine in self.engines
+        ]
+
+def _writes(clause) -> bool:
+    if isinstance(clause, (Insert, Update, Delete, TextClause)):
+        return True
+    return getattr(clause, "_for_update_arg", None) is not None
+
+class RoutingSession(Session):
+    """Session that reads from a replica and writes to its own bind, the primary.
+
+    One replica is picked per session. Flushes, INSERT/UPDATE/DELETE, SELECT
+    ... FOR UPDATE and raw text statements go to the primary, and from then
+    on so does everything else in the session, so a request reads its own
+    writes.
+    """
+
+    def __init__(self, *args, replicas: Optional[ReplicaSet] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+        self.use_primary = not replicas
+        self._replica: Optional[Engine] = None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if not self.use_primary:
+            if self._flushing or _writes(clause):
+                self.use_primary = True
+            else:
+                if self._replica is None:
+                    self._replica = self.replicas.pick()
+                    self.use_primary = self._replica is None
+                if self._replica is not None:
+                    return self._replica
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+    def read_from_primary(self) -> None:
+        """Send the rest of this session's reads to the primary"""
+        self.use_primary = True
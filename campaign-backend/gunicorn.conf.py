@@ -0,0 +1,49 @@
+"""Production serving: N uvicorn workers forked from one gunicorn master.
+
+    gunicorn -c gunicorn.conf.py main:app
+
+The master imports the app once (preload_app), migrates the schema once and
+builds the read-only data every worker needs: countries.json, the CountryEnum
+made from it and the serialized /countries response. That heap is frozen out
+of the garbage collector before forking so the workers keep sharing its pages
+instead of copying them. Each worker then opens its own database connections.
+"""
+import gc
+import multiprocessing
+import os
+import decouple
+
+# Every module-level name here is read as a gunicorn setting, and "config" is
+# one of them, so decouple is not imported by name
+bind = decouple.config('BIND', default='0.0.0.0:8000')
+workers = decouple.config('WEB_CONCURRENCY', default=multiprocessing.cpu_count(), cast=int)
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = decouple.config('GUNICORN_PRELOAD', default=True, cast=bool)
+timeout = decouple.config('GUNICORN_TIMEOUT', default=60, cast=int)
+graceful_timeout = 30
+keepalive = 5
+
+def on_starting(server):
+    from database.database import engine, init_db
+
+    init_db()
+    # Drop the master's connection so no worker inherits it
+    engine.dispose()
+    # Read by main.startup_event in the workers
+    os.environ["DB_MIGRATE_ON_STARTUP"] = "false"
+    server.log.info("Database schema is up to date")
+
+def when_ready(server):
+    if preload_app:
+        from service.service import payout_service
+
+        payout_service.get_countries_payload()
+        gc.freeze()
+
+def post_fork(server, worker):
+    from database.database import async_engine, engine, replica_engines
+
+    # Forget pooled connections copied from the master without closing them under it
+    engine.dispose(close=False)
+    for pooled in (async_engine, *replica_engines):
+        pooled.sync_engine.dispose(close=False)
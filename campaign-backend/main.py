@@ -1,7 +1,26 @@
+import asyncio
+import logging
+from datetime import timedelta
+from decouple import config
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from database.database import engine, Base, init_db
+from fastapi.responses import PlainTextResponse
+from database.database import engine, async_engine, replica_engines, replica_set, AsyncSessionLocal, AsyncReadSessionLocal, Base, init_db
+from database.pool import pool_metrics
+from api.metrics import MetricsMiddleware, instrument_queries, render_metrics
 from api.routes import router as campaign_router
+from service.cache import campaign_cache
+from service.service import payout_service
+from service.async_service import async_change_feed, async_resolution_service
+
+logger = logging.getLogger(__name__)
+
+# Seconds between reads of the change log that apply writes served by other
+# workers to this worker's payout index and campaign cache; 0 turns them off
+# (single-process serving)
+CHANGE_LOG_SYNC_INTERVAL = config('CHANGE_LOG_SYNC_INTERVAL', default=1.0, cast=float)
+# Days of changes kept for feed consumers to catch up on; 0 keeps them all
+CHANGE_LOG_RETENTION_DAYS = config('CHANGE_LOG_RETENTION_DAYS', default=7.0, cast=float)
 
 app = FastAPI(
     title="Campaign Management API",
@@ -34,6 +53,11 @@ app = FastAPI(
     }]
 )
 
+instrument_queries(engine)
+instrument_queries(async_engine.sync_engine)
+for replica in replica_engines:
+    instrument_queries(replica.sync_engine)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000,http://localhost:8080"],
@@ -42,9 +66,43 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Added last so it is outermost and its timings cover CORS handling too
+app.add_middleware(MetricsMiddleware)
+
 @app.on_event("startup")
 async def startup_event():
-    init_db()  # Initialize database tables on startup
+    # Single-process serving migrates here; gunicorn.conf.py does it once in the master
+    if config('DB_MIGRATE_ON_STARTUP', default=True, cast=bool):
+        init_db()
+    payout_service.get_countries_payload()  # Serialize the static /countries response once
+    async with AsyncReadSessionLocal() as db:
+        await async_resolution_service.rebuild(db)
+    if CHANGE_LOG_SYNC_INTERVAL > 0:
+        app.state.change_log_task = asyncio.create_task(follow_change_log())
+    if CHANGE_LOG_RETENTION_DAYS > 0:
+        app.state.change_log_prune_task = asyncio.create_task(prune_change_log())
+
+async def follow_change_log():
+    while True:
+        await asyncio.sleep(CHANGE_LOG_SYNC_INTERVAL)
+        try:
+            async with AsyncReadSessionLocal() as db:
+                changed = await async_resolution_service.catch_up(db)
+            if changed is None:
+                campaign_cache.clear()
+            else:
+                campaign_cache.invalidate(*changed)
+        except Exception as e:
+            logger.error(f"Following the change log failed: {str(e)}")
+
+async def prune_change_log():
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                await async_change_feed.prune(db, timedelta(days=CHANGE_LOG_RETENTION_DAYS))
+        except Exception as e:
+            logger.error(f"Pruning the change log failed: {str(e)}")
+        await asyncio.sleep(3600)
 
 app.include_router(campaign_router)
 
@@ -60,4 +118,36 @@ async def root():
         "message": "Campaign Management API",
         "version": "1.0.0",
         "documentation": "/docs"
-    }
\ No newline at end of file
+    }
+
+@app.get("/health/pool",
+    tags=["health"],
+    summary="Connection Pool Health",
+    description="Checked-out connections, overflow, checkout wait times and timeouts for each engine's pool in this worker",
+)
+async def pool_health():
+    return {name: metrics.snapshot() for name, metrics in pool_metrics.items()}
+
+@app.get("/health/replicas",
+    tags=["health"],
+    summary="Read Replica Health",
+    description="Configured read replicas and whether this worker currently routes reads to them",
+)
+async def replica_health():
+    return replica_set.status()
+
+POOL_GAUGES = ("checked_out", "overflow", "wait_count", "timeouts")
+
+@app.get("/metrics",
+    tags=["health"],
+    summary="Prometheus Metrics",
+    description="Request latency, DB time, query count and serialization histograms plus pool gauges for this worker",
+    response_class=PlainTextResponse,
+)
+async def metrics():
+    snapshots = {name: m.snapshot() for name, m in pool_metrics.items()}
+    gauges = {
+        f"db_pool_{gauge}": {name: snapshot.get(gauge, 0) for name, snapshot in snapshots.items()}
+        for gauge in POOL_GAUGES
+    }
+    return PlainTextResponse(render_metrics(gauges), media_type="text/plain; version=0.0.4")
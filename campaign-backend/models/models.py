@@ -1,5 +1,6 @@
 # models/models.py
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Enum, Boolean
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Enum, Boolean, DateTime, DDL, Index, TypeDecorator, event, false, true
 from sqlalchemy.orm import relationship, validates
 from database.database import Base, CountryEnum
 from urllib.parse import urlparse
@@ -12,6 +13,18 @@ def validate_and_transform_url(url: str) -> str:
         url = f'{url}.com'
     return url
 
+class Amount(TypeDecorator):
+    """Float that always loads as float: SQLite's RETURNING hands whole REAL values back as int"""
+    impl = Float
+    cache_ok = True
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else float(value)
+
+def utcnow() -> datetime:
+    """Naive UTC, how DateTime columns store it on every backend"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
 class Campaign(Base):
     __tablename__ = "campaigns"
     
@@ -19,17 +32,117 @@ class Campaign(Base):
     title = Column(String, default="Default Campaign")
     landing_url = Column(String, default="#")
     is_running = Column(Boolean, default=True)
-    payouts = relationship("Payout", back_populates="campaign")
+    # Bumped by every write to the campaign or its payouts; ORM flushes also
+    # check it, so an UPDATE from a stale read fails instead of overwriting
+    version = Column(Integer, nullable=False, server_default="1")
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
+    payouts = relationship("Payout", back_populates="campaign", order_by="Payout.id")
+
+    __mapper_args__ = {"version_id_col": version}
 
     @validates('landing_url')
     def validate_url(self, key, url):
         return validate_and_transform_url(url)
 
+def is_running_clause(is_running: bool):
+    """Filter on is_running with a literal rather than a bound value.
+
+    Partial indexes are only considered when the planner can see the query's
+    predicate implies the index's, which it cannot do for a bound parameter.
+    """
+    return Campaign.is_running == (true() if is_running else false())
+
+# Running and paused campaigns in id order, for filtered listing and export
+Index("ix_campaigns_running", Campaign.id, sqlite_where=is_running_clause(True), postgresql_where=is_running_clause(True))
+Index("ix_campaigns_paused", Campaign.id, sqlite_where=is_running_clause(False), postgresql_where=is_running_clause(False))
+
+# Text search indexes, see service/search.py. Postgres gets trigram GIN indexes
+# that serve ILIKE '%term%'; SQLite gets an FTS5 table kept in sync by triggers.
+event.listen(
+    Campaign.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+Index(
+    "ix_campaigns_title_trgm", Campaign.title,
+    postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}
+).ddl_if(dialect="postgresql")
+Index(
+    "ix_campaigns_landing_url_trgm", Campaign.landing_url,
+    postgresql_using="gin", postgresql_ops={"landing_url": "gin_trgm_ops"}
+).ddl_if(dialect="postgresql")
+
+CAMPAIGN_FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS campaigns_fts USING fts5(
+        title, landing_url, content='campaigns', content_rowid='id', tokenize='trigram'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS campaigns_fts_ai AFTER INSERT ON campaigns BEGIN
+        INSERT INTO campaigns_fts(rowid, title, landing_url) VALUES (new.id, new.title, new.landing_url);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS campaigns_fts_ad AFTER DELETE ON campaigns BEGIN
+        INSERT INTO campaigns_fts(campaigns_fts, rowid, title, landing_url) VALUES ('delete', old.id, old.title, old.landing_url);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS campaigns_fts_au AFTER UPDATE OF title, landing_url ON campaigns BEGIN
+        INSERT INTO campaigns_fts(campaigns_fts, rowid, title, landing_url) VALUES ('delete', old.id, old.title, old.landing_url);
+        INSERT INTO campaigns_fts(rowid, title, landing_url) VALUES (new.id, new.title, new.landing_url);
+    END""",
+]
+for statement in CAMPAIGN_FTS_DDL:
+    event.listen(Campaign.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(
+    Campaign.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS campaigns_fts").execute_if(dialect="sqlite")
+)
+
 class Payout(Base):
     __tablename__ = "payouts"
     
     id = Column(Integer, primary_key=True, index=True)
     country = Column(Enum(CountryEnum), nullable=False)
-    amount = Column(Float, nullable=False)
+    amount = Column(Amount, nullable=False)
     campaign_id = Column(Integer, ForeignKey("campaigns.id"))
-    campaign = relationship("Campaign", back_populates="payouts")
\ No newline at end of file
+    campaign = relationship("Campaign", back_populates="payouts")
+
+    __table_args__ = (
+        # One payout per country per campaign; also serves lookups by campaign_id alone
+        Index("ux_payouts_campaign_country", "campaign_id", "country", unique=True),
+        Index("ix_payouts_country", "country"),
+    )
+class PayoutCountryStats(Base):
+    """Per-country payout rollup, split by campaign status; see service/reporting.py.
+
+    Payout and campaign writes flag the affected countries ``stale`` in the
+    same transaction, and the report recomputes only those countries.
+    """
+    __tablename__ = "payout_country_stats"
+
+    country = Column(Enum(CountryEnum), primary_key=True)
+    is_running = Column(Boolean, primary_key=True)
+    payout_count = Column(Integer, nullable=False, default=0)
+    amount_sum = Column(Float, nullable=False, default=0.0)
+    amount_min = Column(Float)
+    amount_max = Column(Float)
+    stale = Column(Boolean, nullable=False, default=False)
+
+class CampaignChange(Base):
+    """Append-only log of writes to campaigns and their payouts; see service/changes.py.
+
+    Each write adds one row per campaign it touched, in the same transaction,
+    carrying the campaign's version after the write. ``seq`` orders the rows
+    and is never reused (AUTOINCREMENT on SQLite), so consumers resume from
+    the last one they applied.
+    """
+    __tablename__ = "campaign_changes"
+
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    # No foreign key: the rows of deleted campaigns outlive them
+    campaign_id = Column(Integer, nullable=False)
+    version = Column(Integer, nullable=False)
+    deleted = Column(Boolean, nullable=False, default=False)
+    changed_at = Column(DateTime, nullable=False, default=utcnow)
+
+    __table_args__ = (
+        Index("ix_campaign_changes_changed_at", "changed_at"),
+        {"sqlite_autoincrement": True},
+    )
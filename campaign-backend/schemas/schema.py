@@ -1,5 +1,6 @@
 # schemas/schema.py
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, RootModel, field_validator, validator, model_validator
+from datetime import datetime
 from typing import List, Optional
 from decimal import Decimal
 from database.database import CountryEnum
@@ -46,24 +47,156 @@ class CampaignBase(BaseModel):
         except Exception:
             raise ValueError('Invalid URL format')
 
+def _unique_countries(payouts: List[PayoutCreate]) -> List[PayoutCreate]:
+    countries = [payout.country for payout in payouts]
+    if len(countries) != len(set(countries)):
+        raise ValueError('Only one payout per country is allowed')
+    return payouts
+
+class PayoutMatrix(RootModel[List[PayoutCreate]]):
+    """A campaign's complete set of payouts, at most one per country"""
+
+    @field_validator('root')
+    @classmethod
+    def validate_unique_countries(cls, v):
+        return _unique_countries(v)
+
 class CampaignCreate(CampaignBase):
     payouts: List[PayoutCreate]
     # Remove country from here since it's now in CampaignBase
 
+    @field_validator('payouts')
+    @classmethod
+    def validate_unique_countries(cls, v):
+        return _unique_countries(v)
+
 class Campaign(CampaignBase):
     id: int
+    # Bumped by every write to the campaign or its payouts; the ETag carries it
+    version: int
+    updated_at: Optional[datetime] = None
     payouts: List[PayoutResponse]
 
     class Config:
         from_attributes = True
 
+class CampaignPage(BaseModel):
+    items: List[Campaign]
+    next_cursor: Optional[str] = None
+
+class CampaignIds(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=5000)
+
+class CampaignBatch(BaseModel):
+    # Request order, repeated ids once
+    items: List[Campaign]
+    missing: List[int]
+
 
 class CampaignFilter(BaseModel):
-    title: Optional[str]
-    landing_url: Optional[str]
-    is_running: Optional[bool]
+    title: Optional[str] = None
+    landing_url: Optional[str] = None
+    is_running: Optional[bool] = None
 
 class CampaignUpdate(BaseModel):
-    title: Optional[str]
-    landing_url: Optional[str]
-    is_running: Optional[bool]
\ No newline at end of file
+    title: Optional[str] = None
+    landing_url: Optional[str] = None
+    is_running: Optional[bool] = None
+
+class ImportRowError(BaseModel):
+    row: int
+    errors: List[str]
+
+class ImportReport(BaseModel):
+    imported: int
+    failed: int
+    errors: List[ImportRowError]
+
+class CampaignSelection(BaseModel):
+    """Target of a bulk operation: explicit ids or a filter, not both"""
+    ids: Optional[List[int]] = Field(None, min_length=1, max_length=10000)
+    filter: Optional[CampaignFilter] = None
+
+    @model_validator(mode="after")
+    def check_target(self):
+        if (self.ids is None) == (self.filter is None):
+            raise ValueError("Provide either ids or filter")
+        if self.filter is not None and not self.filter.model_dump(exclude_none=True):
+            raise ValueError("filter needs at least one criterion")
+        return self
+
+class BulkStatusUpdate(CampaignSelection):
+    # None flips each campaign's current status
+    is_running: Optional[bool] = None
+
+class BulkCampaignUpdate(CampaignSelection):
+    changes: CampaignUpdate
+
+class BulkResult(BaseModel):
+    affected: int
+
+class PayoutStats(BaseModel):
+    # None when rows are grouped by currency
+    country: Optional[str] = None
+    currency_code: str
+    is_running: bool
+    count: int
+    total: float
+    min: float
+    max: float
+    average: float
+
+class PayoutReport(BaseModel):
+    group_by: str
+    source: str
+    rows: List[PayoutStats]
+
+class PayoutResolution(BaseModel):
+    campaign_id: int
+    country: str
+    is_running: bool
+    # None when the campaign pays nothing in this country
+    amount: Optional[Decimal] = None
+    currency_code: Optional[str] = None
+
+class ResolutionKey(BaseModel):
+    campaign_id: int
+    country: CountryEnum
+
+class ResolutionRequest(BaseModel):
+    pairs: List[ResolutionKey] = Field(..., min_length=1, max_length=10000)
+
+class ResolutionResult(BaseModel):
+    # In request order; None where the campaign does not exist
+    results: List[Optional[PayoutResolution]]
+
+class RankedCampaign(BaseModel):
+    campaign_id: int
+    amount: Decimal
+
+class CountryTopCampaigns(BaseModel):
+    """Running campaigns paying out in a country, highest amount first"""
+    country: str
+    currency_code: Optional[str] = None
+    items: List[RankedCampaign]
+    next_cursor: Optional[str] = None
+
+class CampaignChange(BaseModel):
+    """One write to a campaign or its payouts; fetch the campaign for its new state"""
+    seq: int
+    campaign_id: int
+    # The campaign's version after the write, as in its ETag
+    version: int
+    deleted: bool
+    changed_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class ChangePage(BaseModel):
+    changes: List[CampaignChange]
+    # Pass back as ``since`` to get the changes after these
+    next_since: int
+
+class ChangeLogHead(BaseModel):
+    seq: int
@@ -0,0 +1,277 @@
+import asyncio
+import json
+from datetime import timedelta
+from functools import wraps
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+from models.models import Campaign, CampaignChange, Payout
+from schemas.schema import PayoutCreate, CampaignCreate, CampaignUpdate, CampaignFilter, CampaignSelection, PayoutUpdate, ImportReport, ImportRowError, PayoutReport
+from schemas.schema import CampaignChange as CampaignChangeSchema
+from database.database import CountryEnum
+from service.service import CampaignService, PayoutService, campaign_service, payout_service
+from service.bulk import BulkImportService, bulk_import_service, iter_lines, parse_rows, validate_row
+from service.reporting import ReportingService, reporting_service
+from service.resolution import PayoutIndex, payout_index
+from service.changes import CHANGE_FEED_POLL_INTERVAL, ChangeLogService, ChangeNotifier, ChangesExpiredError, change_log, change_notifier
+
+def _with_payouts(func: Callable) -> Callable:
+    """Load the payouts of returned campaigns while still inside the session's greenlet.
+
+    Once ``run_sync`` hands control back to the event loop a lazy load can no
+    longer be issued, so anything the response model reads has to be loaded here.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        result = func(*args, **kwargs)
+        campaigns = result if isinstance(result, list) else [result]
+        for campaign in campaigns:
+            if isinstance(campaign, Campaign):
+                campaign.payouts
+        return result
+    return wrapper
+
+class AsyncPayoutService:
+    """PayoutService driven through an AsyncSession.
+
+    The queries are the ones in PayoutService; ``AsyncSession.run_sync`` runs
+    them on the async driver so the event loop keeps serving other requests
+    while a statement is in flight.
+    """
+
+    def __init__(self, service: PayoutService = payout_service):
+        self.service = service
+
+    async def update_payout(self, db: AsyncSession, payout_id: int, payout_update: PayoutUpdate, if_match: Optional[str] = None) -> Optional[Payout]:
+        return await db.run_sync(self.service.update_payout, payout_id, payout_update, if_match)
+
+    async def delete_payout(self, db: AsyncSession, payout_id: int) -> bool:
+        return await db.run_sync(self.service.delete_payout, payout_id)
+
+    async def get_payouts_by_country(self, db: AsyncSession, country: CountryEnum) -> List[Payout]:
+        return await db.run_sync(self.service.get_payouts_by_country, country)
+
+    async def get_all_payouts(self, db: AsyncSession, skip: int = 0, limit: int = 100) -> List[Payout]:
+        return await db.run_sync(self.service.get_all_payouts, skip, limit)
+
+async_payout_service = AsyncPayoutService()
+
+class AsyncCampaignService:
+    """CampaignService driven through an AsyncSession"""
+
+    def __init__(self, service: CampaignService = campaign_service):
+        self.service = service
+
+    async def get_campaigns(self, db: AsyncSession, skip: int = 0, limit: int = 100, filters: Optional[CampaignFilter] = None) -> List[Campaign]:
+        return await db.run_sync(_with_payouts(self.service.get_campaigns), skip, limit, filters)
+
+    async def get_campaigns_page(self, db: AsyncSession, cursor: str = "", limit: int = 100, filters: Optional[CampaignFilter] = None) -> Tuple[List[Campaign], Optional[str]]:
+        return await db.run_sync(self.service.get_campaigns_page, cursor, limit, filters)
+
+    async def get_campaigns_json(self, db: AsyncSession, skip: int = 0, limit: int = 100, filters: Optional[CampaignFilter] = None, if_none_match: Optional[str] = None) -> Tuple[Optional[bytes], str]:
+        return await db.run_sync(self.service.get_campaigns_json, skip, limit, filters, if_none_match)
+
+    async def get_campaigns_page_json(self, db: AsyncSession, cursor: str = "", limit: int = 100, filters: Optional[CampaignFilter] = None, if_none_match: Optional[str] = None) -> Tuple[Optional[bytes], str]:
+        return await db.run_sync(self.service.get_campaigns_page_json, cursor, limit, filters, if_none_match)
+
+    async def get_campaign(self, db: AsyncSession, campaign_id: int) -> Optional[Campaign]:
+        return await db.run_sync(_with_payouts(self.service.get_campaign), campaign_id)
+
+    async def get_campaign_json(self, db: AsyncSession, campaign_id: int) -> Optional[Tuple[bytes, str]]:
+        return await db.run_sync(self.service.get_campaign_json, campaign_id)
+
+    async def get_campaigns_by_ids(self, db: AsyncSession, campaign_ids: List[int]) -> Tuple[List[Campaign], List[int]]:
+        return await db.run_sync(self.service.get_campaigns_by_ids, campaign_ids)
+
+    async def get_campaigns_by_ids_json(self, db: AsyncSession, campaign_ids: List[int], if_none_match: Optional[str] = None) -> Tuple[Optional[bytes], str]:
+        return await db.run_sync(self.service.get_campaigns_by_ids_json, campaign_ids, if_none_match)
+
+    async def create_campaign(self, db: AsyncSession, campaign_data: CampaignCreate) -> Campaign:
+        return await db.run_sync(_with_payouts(self.service.create_campaign), campaign_data)
+
+    async def update_campaign(self, db: AsyncSession, campaign_id: int, campaign_update: CampaignUpdate, if_match: Optional[str] = None) -> Optional[Campaign]:
+        return await db.run_sync(_with_payouts(self.service.update_campaign), campaign_id, campaign_update, if_match)
+
+    async def toggle_campaign_status(self, db: AsyncSession, campaign_id: int) -> Optional[Campaign]:
+        return await db.run_sync(_with_payouts(self.service.toggle_campaign_status), campaign_id)
+
+    async def search_campaigns(self, db: AsyncSession, search_term: str, skip: int = 0, limit: int = 100) -> List[Campaign]:
+        return await db.run_sync(_with_payouts(self.service.search_campaigns), search_term, skip, limit)
+
+    async def search_campaigns_page(self, db: AsyncSession, search_term: str, cursor: str = "", limit: int = 100) -> Tuple[List[Campaign], Optional[str]]:
+        return await db.run_sync(self.service.search_campaigns_page, search_term, cursor, limit)
+
+    async def search_campaigns_json(self, db: AsyncSession, search_term: str, skip: int = 0, limit: int = 100, if_none_match: Optional[str] = None) -> Tuple[Optional[bytes], str]:
+        return await db.run_sync(self.service.search_campaigns_json, search_term, skip, limit, if_none_match)
+
+    async def search_campaigns_page_json(self, db: AsyncSession, search_term: str, cursor: str = "", limit: int = 100, if_none_match: Optional[str] = None) -> Tuple[Optional[bytes], str]:
+        return await db.run_sync(self.service.search_campaigns_page_json, search_term, cursor, limit, if_none_match)
+
+    async def bulk_set_status(self, db: AsyncSession, selection: CampaignSelection, is_running: Optional[bool] = None) -> int:
+        return await db.run_sync(self.service.bulk_set_status, selection, is_running)
+
+    async def bulk_update(self, db: AsyncSession, selection: CampaignSelection, campaign_update: CampaignUpdate) -> int:
+        return await db.run_sync(self.service.bulk_update, selection, campaign_update)
+
+    async def bulk_delete(self, db: AsyncSession, selection: CampaignSelection) -> int:
+        return await db.run_sync(self.service.bulk_delete, selection)
+
+    async def get_campaign_payouts(self, db: AsyncSession, campaign_id: int) -> List[Payout]:
+        return await db.run_sync(self.service.get_campaign_payouts, campaign_id)
+
+    async def create_payout(self, db: AsyncSession, campaign_id: int, payout_data: PayoutCreate) -> Payout:
+        return await db.run_sync(self.service.create_payout, campaign_id, payout_data)
+
+    async def replace_payouts(self, db: AsyncSession, campaign_id: int, payouts: List[PayoutCreate]) -> Optional[List[Payout]]:
+        return await db.run_sync(self.service.replace_payouts, campaign_id, payouts)
+
+    async def delete_campaign(self, db: AsyncSession, campaign_id: int) -> bool:
+        return await db.run_sync(self.service.delete_campaign, campaign_id)
+
+async_campaign_service = AsyncCampaignService()
+
+class AsyncBulkImportService:
+    """Streams an import body through validation into batched inserts.
+
+    Rows are parsed as the body arrives and flushed every ``batch_size`` valid
+    rows, so memory stays bounded by one batch whatever the upload size.
+    """
+
+    def __init__(self, service: BulkImportService = bulk_import_service):
+        self.service = service
+
+    async def import_stream(self, db: AsyncSession, chunks: AsyncIterator[bytes], fmt: str, batch_size: int = 500) -> ImportReport:
+        imported = 0
+        errors: List[ImportRowError] = []
+        batch: List[Tuple[int, CampaignCreate]] = []
+
+        async for number, row in parse_rows(iter_lines(chunks), fmt):
+            campaign = validate_row(row)
+            if isinstance(campaign, list):
+                errors.append(ImportRowError(row=number, errors=campaign))
+                continue
+            batch.append((number, campaign))
+            if len(batch) >= batch_size:
+                imported += await self._insert_batch(db, batch, errors)
+                batch = []
+        if batch:
+            imported += await self._insert_batch(db, batch, errors)
+
+        errors.sort(key=lambda error: error.row)
+        return ImportReport(imported=imported, failed=len(errors), errors=errors)
+
+    async def _insert_batch(self, db: AsyncSession, batch: List[Tuple[int, CampaignCreate]], errors: List[ImportRowError]) -> int:
+        count, batch_errors = await db.run_sync(self.service.insert_batch, batch)
+        errors.extend(batch_errors)
+        return count
+
+async_bulk_import_service = AsyncBulkImportService()
+
+class AsyncReportingService:
+    def __init__(self, service: ReportingService = reporting_service):
+        self.service = service
+
+    async def payout_report(self, db: AsyncSession, group_by: str = "country", is_running: Optional[bool] = None, source: str = "summary") -> PayoutReport:
+        return await db.run_sync(self.service.payout_report, group_by, is_running, source)
+
+async_reporting_service = AsyncReportingService()
+
+class AsyncResolutionService:
+    """Lookups against the in-memory PayoutIndex.
+
+    The session is only used for the first build of the index in this process;
+    once it is loaded a lookup never touches the database.
+    """
+
+    def __init__(self, index: PayoutIndex = payout_index):
+        self.index = index
+        self._loading: Optional[asyncio.Future] = None
+
+    async def ensure_loaded(self, db: AsyncSession) -> None:
+        """Build the index once; lookups arriving meanwhile wait for that build"""
+        while not self.index.loaded:
+            if self._loading is not None:
+                await self._loading
+                continue
+            self._loading = asyncio.get_running_loop().create_future()
+            try:
+                await db.run_sync(self.index.ensure_loaded)
+            finally:
+                self._loading.set_result(None)
+                self._loading = None
+
+    async def rebuild(self, db: AsyncSession) -> int:
+        return await db.run_sync(self.index.rebuild)
+
+    async def catch_up(self, db: AsyncSession) -> Optional[List[int]]:
+        return await db.run_sync(self.index.catch_up)
+
+    async def resolve(self, db: AsyncSession, campaign_id: int, country: CountryEnum) -> Optional[dict]:
+        await self.ensure_loaded(db)
+        return self.index.resolve(campaign_id, country.value)
+
+    async def resolve_many(self, db: AsyncSession, pairs: List[Tuple[int, CountryEnum]]) -> List[Optional[dict]]:
+        await self.ensure_loaded(db)
+        return self.index.resolve_many((campaign_id, country.value) for campaign_id, country in pairs)
+
+    async def top_campaigns(self, db: AsyncSession, country: CountryEnum, limit: int = 10, cursor: str = "") -> dict:
+        await self.ensure_loaded(db)
+        return self.index.top_page(country.value, limit, cursor)
+
+async_resolution_service = AsyncResolutionService()
+
+class AsyncChangeFeed:
+    """Long-polls and Server-Sent Events over the change log.
+
+    Every read of the log gets its own short session, so a waiting client
+    holds no connection. Commits in this worker wake the waiters at once;
+    other workers' writes are seen every CHANGE_FEED_POLL_INTERVAL seconds.
+    """
+
+    def __init__(self, service: ChangeLogService = change_log, notifier: ChangeNotifier = change_notifier):
+        self.service = service
+        self.notifier = notifier
+
+    async def head(self, db: AsyncSession) -> int:
+        return await db.run_sync(self.service.head)
+
+    async def prune(self, db: AsyncSession, retention: timedelta) -> int:
+        return await db.run_sync(self.service.prune, retention)
+
+    async def poll(self, session_factory: async_sessionmaker, since: int, limit: int = 1000, wait: float = 0.0) -> List[CampaignChange]:
+        """Changes after ``since``, waiting up to ``wait`` seconds for the first one"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + wait
+        while True:
+            # Subscribed before reading, so a commit landing in between still wakes us
+            waiter = self.notifier.subscribe()
+            try:
+                async with session_factory() as db:
+                    changes = await db.run_sync(self.service.changes_since, since, limit)
+                remaining = deadline - loop.time()
+                if changes or remaining <= 0:
+                    return changes
+                await asyncio.wait({waiter[1]}, timeout=min(remaining, CHANGE_FEED_POLL_INTERVAL))
+            finally:
+                self.notifier.unsubscribe(waiter)
+
+    async def stream(self, session_factory: async_sessionmaker, since: int, heartbeat: float = 15.0, batch_size: int = 1000) -> AsyncIterator[bytes]:
+        """One ``change`` event per change with its seq as the event id, and a comment every ``heartbeat`` idle seconds.
+
+        Ends with an ``expired`` event when ``since`` has been pruned from the log.
+        """
+        while True:
+            try:
+                changes = await self.poll(session_factory, since, batch_size, heartbeat)
+            except ChangesExpiredError as e:
+                yield b"event: expired\ndata: " + json.dumps({"detail": str(e)}).encode() + b"\n\n"
+                return
+            if not changes:
+                yield b": keepalive\n\n"
+                continue
+            yield b"".join(
+                b"id: %d\nevent: change\ndata: %s\n\n" % (change.seq, CampaignChangeSchema.model_validate(change).model_dump_json().encode())
+                for change in changes
+            )
+            since = changes[-1].seq
+
+async_change_feed = AsyncChangeFeed()
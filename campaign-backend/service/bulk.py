@@ -0,0 +1,137 @@
+import csv
+import json
+import logging
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from typing import AsyncIterator, Dict, List, Tuple, Union
+from models.models import Campaign, Payout
+from schemas.schema import CampaignCreate, ImportRowError
+from service.reporting import mark_payouts_stale
+from service.resolution import payout_index
+from service.changes import change_notifier, record_changes
+
+logger = logging.getLogger(__name__)
+
+ParsedRow = Tuple[int, Union[dict, str]]
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Split a streamed request body into raw lines without buffering the whole body"""
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line.rstrip(b"\r")
+    if pending:
+        yield pending.rstrip(b"\r")
+
+def parse_ndjson_line(line: str) -> Union[dict, str]:
+    """One JSON object per line, shaped like CampaignCreate"""
+    try:
+        row = json.loads(line)
+    except ValueError as e:
+        return f"Invalid JSON: {e}"
+    if not isinstance(row, dict):
+        return "Expected a JSON object"
+    return row
+
+def parse_csv_line(line: str, header: List[str]) -> Union[dict, str]:
+    """One campaign per line under a ``title,landing_url,is_running,payouts`` header.
+
+    ``payouts`` holds ``COUNTRY:amount`` pairs separated by semicolons, e.g.
+    ``USA:10.5;DEU:7``. Empty cells fall back to the schema defaults.
+    """
+    values = next(csv.reader([line]))
+    if len(values) != len(header):
+        return f"Expected {len(header)} columns, got {len(values)}"
+    row = {key: value.strip() for key, value in zip(header, values) if value.strip()}
+    payouts = []
+    for pair in filter(None, (p.strip() for p in row.pop("payouts", "").split(";"))):
+        country, _, amount = pair.partition(":")
+        payouts.append({"country": country.strip(), "amount": amount.strip()})
+    row["payouts"] = payouts
+    return row
+
+async def parse_rows(lines: AsyncIterator[bytes], fmt: str) -> AsyncIterator[ParsedRow]:
+    """Yield ``(row_number, row)`` with 1-based data row numbers; ``row`` is an error string when unparseable"""
+    header = None
+    number = 0
+    async for raw in lines:
+        if not raw.strip():
+            continue
+        if fmt == "csv" and header is None:
+            header = [column.strip() for column in next(csv.reader([raw.decode("utf-8", errors="replace")]))]
+            continue
+        number += 1
+        try:
+            line = raw.decode("utf-8")
+        except UnicodeDecodeError as e:
+            yield number, f"Invalid UTF-8: {e}"
+            continue
+        yield number, parse_csv_line(line, header) if fmt == "csv" else parse_ndjson_line(line)
+
+def validate_row(row: Union[dict, str]) -> Union[CampaignCreate, List[str]]:
+    if isinstance(row, str):
+        return [row]
+    try:
+        return CampaignCreate.model_validate(row)
+    except ValidationError as e:
+        return [
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+            for error in e.errors()
+        ]
+
+class BulkImportService:
+    def insert_batch(self, db: Session, batch: List[Tuple[int, CampaignCreate]]) -> Tuple[int, List[ImportRowError]]:
+        """Insert a batch of validated campaigns in one transaction.
+
+        Campaigns go in with a single multi-row INSERT ... RETURNING and their
+        payouts with one executemany. If the database rejects the batch, the
+        rows are retried one by one so only the offending rows are reported.
+        """
+        try:
+            campaigns = [campaign for _, campaign in batch]
+            campaign_ids = self._insert_campaigns(db, campaigns)
+            record_changes(db, campaign_ids)
+            db.commit()
+            for campaign_id, campaign in zip(campaign_ids, campaigns):
+                payout_index.put(
+                    campaign_id, campaign.is_running,
+                    {payout.country.value: float(payout.amount) for payout in campaign.payouts}
+                )
+            change_notifier.notify()
+            return len(batch), []
+        except SQLAlchemyError as e:
+            db.rollback()
+            if len(batch) == 1:
+                logger.error(f"Import of row {batch[0][0]} failed: {str(e)}")
+                return 0, [ImportRowError(row=batch[0][0], errors=[str(getattr(e, "orig", e))])]
+
+        imported, errors = 0, []
+        for row in batch:
+            count, row_errors = self.insert_batch(db, [row])
+            imported += count
+            errors.extend(row_errors)
+        return imported, errors
+
+    def _insert_campaigns(self, db: Session, campaigns: List[CampaignCreate]) -> List[int]:
+        campaign_ids = db.scalars(
+            insert(Campaign).returning(Campaign.id, sort_by_parameter_order=True),
+            [
+                {"title": c.title, "landing_url": c.landing_url, "is_running": c.is_running}
+                for c in campaigns
+            ]
+        ).all()
+        payouts: List[Dict] = [
+            {"campaign_id": campaign_id, "country": payout.country, "amount": float(payout.amount)}
+            for campaign_id, campaign in zip(campaign_ids, campaigns)
+            for payout in campaign.payouts
+        ]
+        if payouts:
+            db.execute(insert(Payout), payouts)
+            mark_payouts_stale(db, {payout["country"] for payout in payouts})
+        return campaign_ids
+
+bulk_import_service = BulkImportService()
@@ -0,0 +1,173 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from decouple import config
+from typing import Dict, Optional, Tuple
+from models.models import Campaign
+from schemas.schema import Campaign as CampaignSchema
+
+logger = logging.getLogger(__name__)
+
+class CacheBackend:
+    """Byte-string store behind CampaignCache"""
+    name = "none"
+
+    def get(self, key: str) -> Optional[bytes]:
+        return None
+
+    def set(self, key: str, value: bytes) -> None:
+        pass
+
+    def delete(self, *keys: str) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+    def __len__(self) -> int:
+        return 0
+
+class LRUCache(CacheBackend):
+    """In-process LRU with a per-entry TTL; private to each worker process"""
+    name = "memory"
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class RedisCache(CacheBackend):
+    """Shared cache on any client with redis-py's get/set(ex=)/delete/scan_iter API.
+
+    Calls are synchronous, like the services that invalidate it, so keep Redis
+    close to the API workers.
+    """
+    name = "redis"
+
+    def __init__(self, client, ttl: float = 30.0, prefix: str = "campaign-api:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes) -> None:
+        self.client.set(self.prefix + key, value, ex=max(1, int(self.ttl)))
+
+    def delete(self, *keys: str) -> None:
+        if keys:
+            self.client.delete(*(self.prefix + key for key in keys))
+
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.client.scan_iter(match=self.prefix + "*"))
+
+class CampaignCache:
+    """Read-through cache of serialized single-campaign responses.
+
+    Entries hold the version and JSON body of ``schemas.Campaign``, so a hit
+    is served, ETag included, without touching the database or re-serializing.
+    Services invalidate entries after every committed write to a campaign or
+    its payouts; TTL only bounds staleness from writes made by other processes
+    sharing the database.
+    """
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _key(self, campaign_id: int) -> str:
+        return f"campaign:{campaign_id}"
+
+    def get(self, campaign_id: int) -> Optional[Tuple[int, bytes]]:
+        """The campaign's version and JSON body"""
+        value = self.backend.get(self._key(campaign_id))
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        version, _, body = value.partition(b"\n")
+        return int(version), body
+
+    def set(self, campaign: Campaign) -> Tuple[int, bytes]:
+        """Serialize and store a loaded campaign, returning its version and the JSON body"""
+        body = CampaignSchema.model_validate(campaign).model_dump_json().encode()
+        # Stored ahead of the body so a hit can answer with the ETag too
+        self.backend.set(self._key(campaign.id), b"%d\n%s" % (campaign.version, body))
+        return campaign.version, body
+
+    def invalidate(self, *campaign_ids: int) -> None:
+        if campaign_ids:
+            self.invalidations += len(campaign_ids)
+            self.backend.delete(*(self._key(campaign_id) for campaign_id in campaign_ids))
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, object]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "size": len(self.backend),
+        }
+
+def build_cache_backend() -> CacheBackend:
+    """CAMPAIGN_CACHE_BACKEND selects memory (default), redis or none"""
+    backend = config('CAMPAIGN_CACHE_BACKEND', default='memory')
+    ttl = config('CAMPAIGN_CACHE_TTL', default=30.0, cast=float)
+    if backend == "redis":
+        try:
+            import redis
+        except ImportError:
+            logger.error("CAMPAIGN_CACHE_BACKEND=redis but the redis package is not installed, using memory")
+        else:
+            return RedisCache(redis.Redis.from_url(config('REDIS_URL', default='redis://localhost:6379/0')), ttl)
+    if backend == "none":
+        return CacheBackend()
+    return LRUCache(config('CAMPAIGN_CACHE_SIZE', default=10000, cast=int), ttl)
+
+campaign_cache = CampaignCache(build_cache_backend())
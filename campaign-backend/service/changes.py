@@ -0,0 +1,139 @@
+import asyncio
+import logging
+from datetime import timedelta
+from decouple import config
+from sqlalchemy import delete, func, insert, literal, select
+from sqlalchemy.orm import Session
+from typing import List, Set, Tuple
+from models.models import Campaign, CampaignChange, utcnow
+
+logger = logging.getLogger(__name__)
+
+# Campaign ids per IN (...) when logging a list of them
+RECORD_CHUNK = 500
+# Postgres advisory lock taken by every transaction that writes to the log
+CHANGE_LOG_LOCK = 7240310
+# Seconds between reads of the log while a long-poll or stream waits; commits
+# in this worker wake them straight away, this bounds the delay for the rest
+CHANGE_FEED_POLL_INTERVAL = config('CHANGE_FEED_POLL_INTERVAL', default=1.0, cast=float)
+
+class ChangesExpiredError(Exception):
+    """Changes after the requested sequence were pruned; the consumer has to read everything again"""
+    pass
+
+def record_changes(db: Session, campaign_ids) -> None:
+    """Log a write to these campaigns as the last statement before commit.
+
+    ``campaign_ids`` is a list or a select of ids. Pending ORM changes are
+    flushed first, then the rows are copied from the campaigns table with
+    INSERT ... SELECT, so the versions have to be bumped by then.
+    """
+    chunks = _chunks(campaign_ids)
+    if not chunks:
+        return
+    db.flush()
+    _lock_change_log(db)
+    changed_at = utcnow()
+    for chunk in chunks:
+        db.execute(insert(CampaignChange).from_select(
+            ["campaign_id", "version", "deleted", "changed_at"],
+            select(Campaign.id, Campaign.version, literal(False), literal(changed_at))
+            .where(Campaign.id.in_(chunk))
+            .order_by(Campaign.id)
+        ))
+
+def record_deletes(db: Session, deleted: List[Tuple[int, int]]) -> None:
+    """Log deleted campaigns as the last statement before commit; ``deleted`` holds ``(id, version)`` pairs"""
+    if not deleted:
+        return
+    db.flush()
+    _lock_change_log(db)
+    changed_at = utcnow()
+    db.execute(insert(CampaignChange), [
+        {"campaign_id": campaign_id, "version": version, "deleted": True, "changed_at": changed_at}
+        for campaign_id, version in sorted(deleted)
+    ])
+
+def _chunks(campaign_ids) -> list:
+    if isinstance(campaign_ids, (list, tuple)):
+        return [campaign_ids[start:start + RECORD_CHUNK] for start in range(0, len(campaign_ids), RECORD_CHUNK)]
+    return [campaign_ids]
+
+def _lock_change_log(db: Session) -> None:
+    """Make writers commit their changes in ``seq`` order on Postgres.
+
+    A consumer must never see a seq before a lower one that is still in
+    flight, so the log is written under an advisory lock held until commit.
+    Callers log last, which keeps the serialized section to the INSERT and
+    the COMMIT; SQLite serializes writers anyway.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(select(func.pg_advisory_xact_lock(CHANGE_LOG_LOCK)))
+
+class ChangeLogService:
+    def head(self, db: Session) -> int:
+        """Sequence of the latest change, 0 for an empty log"""
+        return db.scalar(select(func.max(CampaignChange.seq))) or 0
+
+    def changes_since(self, db: Session, since: int, limit: int = 1000) -> List[CampaignChange]:
+        """Up to ``limit`` changes after ``since``, oldest first.
+
+        Raises ChangesExpiredError when changes right after ``since`` are
+        gone from the log; gaps left by rolled-back transactions are fine.
+        """
+        changes = db.scalars(
+            select(CampaignChange).where(CampaignChange.seq > since).order_by(CampaignChange.seq).limit(limit)
+        ).all()
+        if changes and changes[0].seq != since + 1:
+            oldest = db.scalar(select(func.min(CampaignChange.seq)))
+            if oldest > since + 1:
+                raise ChangesExpiredError(f"Changes after {since} are no longer in the log, which starts at {oldest}")
+        return changes
+
+    def prune(self, db: Session, retention: timedelta) -> int:
+        """Drop changes older than ``retention``; the latest one always stays to mark the head"""
+        deleted = db.execute(
+            delete(CampaignChange)
+            .where(
+                CampaignChange.changed_at < utcnow() - retention,
+                CampaignChange.seq < select(func.max(CampaignChange.seq)).scalar_subquery(),
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        logger.info(f"Pruned {deleted} changes older than {retention}")
+        return deleted
+
+class ChangeNotifier:
+    """Wakes this worker's long-polls and streams after it commits a change.
+
+    Writes served by other workers are only seen when the waiters poll the
+    log again, see CHANGE_FEED_POLL_INTERVAL.
+    """
+
+    def __init__(self):
+        self._waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = set()
+
+    def subscribe(self) -> Tuple[asyncio.AbstractEventLoop, asyncio.Future]:
+        loop = asyncio.get_running_loop()
+        waiter = (loop, loop.create_future())
+        self._waiters.add(waiter)
+        return waiter
+
+    def unsubscribe(self, waiter: Tuple[asyncio.AbstractEventLoop, asyncio.Future]) -> None:
+        self._waiters.discard(waiter)
+
+    def notify(self) -> None:
+        waiters, self._waiters = self._waiters, set()
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError:  # its loop is closed
+                pass
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+change_log = ChangeLogService()
+change_notifier = ChangeNotifier()
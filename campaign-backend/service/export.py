@@ -0,0 +1,97 @@
+import csv
+import io
+import logging
+from collections import defaultdict
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from typing import AsyncIterator, Dict, List, Optional, Sequence
+from models.models import Campaign, Payout, is_running_clause
+from schemas.schema import Campaign as CampaignSchema
+from database.database import CountryEnum
+
+logger = logging.getLogger(__name__)
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# Same layout the CSV import reads, plus the id
+CSV_COLUMNS = ["id", "title", "landing_url", "is_running", "payouts"]
+
+class ExportService:
+    def campaigns_statement(self, is_running: Optional[bool] = None, country: Optional[CountryEnum] = None):
+        """Campaign rows in id order, optionally only those paying out in ``country``"""
+        statement = select(
+            Campaign.id, Campaign.title, Campaign.landing_url, Campaign.is_running, Campaign.version, Campaign.updated_at
+        ).order_by(Campaign.id)
+        if is_running is not None:
+            statement = statement.where(is_running_clause(is_running))
+        if country is not None:
+            statement = statement.where(
+                Campaign.id.in_(select(Payout.campaign_id).where(Payout.country == country))
+            )
+        return statement
+
+    def payouts_statement(self, campaign_ids: Sequence[int]):
+        return select(
+            Payout.id, Payout.country, Payout.amount, Payout.campaign_id
+        ).where(Payout.campaign_id.in_(campaign_ids)).order_by(Payout.id)
+
+    def build_campaigns(self, campaign_rows, payout_rows) -> List[CampaignSchema]:
+        payouts: Dict[int, List[dict]] = defaultdict(list)
+        for payout in payout_rows:
+            payouts[payout.campaign_id].append(payout._asdict())
+        return [
+            CampaignSchema.model_validate({**row._asdict(), "payouts": payouts[row.id]})
+            for row in campaign_rows
+        ]
+
+    def render(self, campaigns: List[CampaignSchema], fmt: str) -> bytes:
+        if fmt == "ndjson":
+            return b"".join(campaign.model_dump_json().encode() + b"\n" for campaign in campaigns)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        for campaign in campaigns:
+            writer.writerow([
+                campaign.id,
+                campaign.title,
+                campaign.landing_url,
+                str(campaign.is_running).lower(),
+                ";".join(f"{p.country.value}:{p.amount}" for p in campaign.payouts),
+            ])
+        return buffer.getvalue().encode()
+
+    async def stream(
+        self,
+        session_factory: async_sessionmaker,
+        fmt: str = "ndjson",
+        is_running: Optional[bool] = None,
+        country: Optional[CountryEnum] = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[bytes]:
+        """Yield the export body one batch of campaigns at a time.
+
+        Campaigns come off a server-side cursor ``batch_size`` rows at a time and
+        each batch's payouts are fetched with one IN query. Rows are read as
+        plain tuples rather than ORM objects, so nothing accumulates in the
+        identity map and memory stays flat whatever the table size.
+        """
+        if fmt == "csv":
+            yield (",".join(CSV_COLUMNS) + "\n").encode()
+
+        exported = 0
+        async with session_factory() as db:
+            result = await db.stream(
+                self.campaigns_statement(is_running, country).execution_options(yield_per=batch_size)
+            )
+            async for campaign_rows in result.partitions():
+                payout_rows = (await db.execute(
+                    self.payouts_statement([row.id for row in campaign_rows])
+                )).all()
+                yield self.render(self.build_campaigns(campaign_rows, payout_rows), fmt)
+                exported += len(campaign_rows)
+
+        logger.info(f"Exported {exported} campaigns as {fmt}")
+
+export_service = ExportService()
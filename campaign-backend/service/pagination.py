@@ -0,0 +1,31 @@
+import base64
+import binascii
+import json
+from typing import Any, List, Tuple
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+    pass
+
+def encode_cursor(position: List[Any]) -> str:
+    """Encode the sort key values of the last row on a page as an opaque cursor"""
+    raw = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, kinds: Tuple[type, ...]) -> List[Any]:
+    """Decode a cursor back into the sort key values it was built from.
+
+    ``kinds`` gives the type of each value: ``int`` for ids, ``float`` for
+    ranks and amounts, which may also come back as ints. Booleans are neither.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursorError("Malformed cursor")
+    if not isinstance(position, list) or len(position) != len(kinds) or not all(
+        isinstance(value, (int, float) if kind is float else kind) and not isinstance(value, bool)
+        for value, kind in zip(position, kinds)
+    ):
+        raise InvalidCursorError("Cursor does not match this listing")
+    return position
@@ -0,0 +1,166 @@
+import logging
+from collections import defaultdict
+from sqlalchemy import delete, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List, Optional, Tuple
+from models.models import Campaign, Payout, PayoutCountryStats
+from schemas.schema import PayoutReport, PayoutStats
+from database.database import country_manager
+
+logger = logging.getLogger(__name__)
+
+REPORT_GROUPS = ("country", "currency")
+REPORT_SOURCES = ("summary", "live")
+
+def mark_payouts_stale(db: Session, countries: Iterable = (), campaign_ids=None) -> None:
+    """Flag the summary rows a payout write touches; call inside the writing transaction.
+
+    ``campaign_ids`` (a list or a select of ids) covers writes that move or
+    remove all of a campaign's payouts, such as status changes and deletes,
+    and has to run while those payouts still exist.
+    """
+    conditions = []
+    countries = list(countries)
+    if countries:
+        conditions.append(PayoutCountryStats.country.in_(countries))
+    if campaign_ids is not None:
+        conditions.append(PayoutCountryStats.country.in_(
+            select(Payout.country).where(Payout.campaign_id.in_(campaign_ids))
+        ))
+    if conditions:
+        db.execute(
+            update(PayoutCountryStats)
+            .where(or_(*conditions))
+            .values(stale=True)
+            .execution_options(synchronize_session=False)
+        )
+
+class ReportingService:
+    def aggregate_statement(self, countries: Optional[List] = None, is_running: Optional[bool] = None):
+        """Count, sum, min and max of payout amounts per country and campaign status"""
+        statement = select(
+            Payout.country,
+            Campaign.is_running,
+            func.count(Payout.id).label("payout_count"),
+            func.sum(Payout.amount).label("amount_sum"),
+            func.min(Payout.amount).label("amount_min"),
+            func.max(Payout.amount).label("amount_max"),
+        ).join(Campaign, Payout.campaign_id == Campaign.id).group_by(Payout.country, Campaign.is_running)
+        if countries is not None:
+            statement = statement.where(Payout.country.in_(countries))
+        if is_running is not None:
+            statement = statement.where(Campaign.is_running == is_running)
+        return statement
+
+    def _summary_values(self, db: Session, countries: List[str]) -> List[dict]:
+        """Fresh summary rows for ``countries``, including empty ones"""
+        aggregates = {
+            (row.country.value, row.is_running): row
+            for row in db.execute(self.aggregate_statement(countries))
+        }
+        values = []
+        for country in countries:
+            for is_running in (True, False):
+                row = aggregates.get((country, is_running))
+                values.append({
+                    "country": country,
+                    "is_running": is_running,
+                    "payout_count": row.payout_count if row else 0,
+                    "amount_sum": row.amount_sum if row else 0.0,
+                    "amount_min": row.amount_min if row else None,
+                    "amount_max": row.amount_max if row else None,
+                    "stale": False,
+                })
+        return values
+
+    def rebuild_summary(self, db: Session) -> int:
+        countries = list(country_manager.countries)
+        db.execute(delete(PayoutCountryStats))
+        db.execute(insert(PayoutCountryStats), self._summary_values(db, countries))
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another worker rebuilt it concurrently
+            db.rollback()
+            return 0
+        logger.info(f"Rebuilt payout summary for {len(countries)} countries")
+        return len(countries)
+
+    def refresh_summary(self, db: Session) -> int:
+        """Recompute stale countries, or everything when the table is new; returns countries refreshed"""
+        existing = db.scalar(select(func.count()).select_from(PayoutCountryStats))
+        if existing < 2 * len(country_manager.countries):
+            return self.rebuild_summary(db)
+
+        # Lock the stale rows so a write landing mid-refresh waits and re-marks them
+        stale = sorted({
+            country.value for country in db.scalars(
+                select(PayoutCountryStats.country).where(PayoutCountryStats.stale).with_for_update()
+            )
+        })
+        if not stale:
+            db.commit()
+            return 0
+        db.execute(update(PayoutCountryStats), self._summary_values(db, stale))
+        db.commit()
+        logger.info(f"Refreshed payout summary for {len(stale)} countries")
+        return len(stale)
+
+    def payout_report(
+        self,
+        db: Session,
+        group_by: str = "country",
+        is_running: Optional[bool] = None,
+        source: str = "summary",
+    ) -> PayoutReport:
+        """Payout rollups per country or currency, split by campaign status.
+
+        ``summary`` reads the incrementally maintained payout_country_stats
+        table; ``live`` runs the GROUP BY over payouts directly.
+        """
+        if source == "summary":
+            self.refresh_summary(db)
+            statement = select(
+                PayoutCountryStats.country,
+                PayoutCountryStats.is_running,
+                PayoutCountryStats.payout_count,
+                PayoutCountryStats.amount_sum,
+                PayoutCountryStats.amount_min,
+                PayoutCountryStats.amount_max,
+            ).where(PayoutCountryStats.payout_count > 0)
+            if is_running is not None:
+                statement = statement.where(PayoutCountryStats.is_running == is_running)
+            rows = db.execute(statement).all()
+        else:
+            rows = db.execute(self.aggregate_statement(is_running=is_running)).all()
+        return PayoutReport(group_by=group_by, source=source, rows=self._group(rows, group_by))
+
+    def _group(self, rows, group_by: str) -> List[PayoutStats]:
+        """Roll country rows up to ``group_by``; count/sum/min/max combine exactly"""
+        groups: Dict[Tuple[str, str, bool], dict] = defaultdict(
+            lambda: {"count": 0, "total": 0.0, "min": None, "max": None}
+        )
+        for row in rows:
+            country = row.country.value
+            currency = country_manager.get_country_data(country).currency_code
+            group = groups[(country if group_by == "country" else None, currency, row.is_running)]
+            group["count"] += row.payout_count
+            group["total"] += row.amount_sum
+            group["min"] = row.amount_min if group["min"] is None else min(group["min"], row.amount_min)
+            group["max"] = row.amount_max if group["max"] is None else max(group["max"], row.amount_max)
+
+        return [
+            PayoutStats(
+                country=country,
+                currency_code=currency,
+                is_running=is_running,
+                average=group["total"] / group["count"],
+                **group,
+            )
+            for (country, currency, is_running), group in sorted(
+                groups.items(), key=lambda item: (item[0][0] or item[0][1], not item[0][2])
+            )
+        ]
+
+reporting_service = ReportingService()
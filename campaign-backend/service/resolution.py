@@ -0,0 +1,254 @@
+import logging
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from sqlalchemy import Float, String, select, type_coerce
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List, Optional, Tuple
+from models.models import Campaign, Payout
+from database.database import country_manager
+from service.pagination import decode_cursor, encode_cursor
+from service.changes import ChangesExpiredError, change_log
+
+logger = logging.getLogger(__name__)
+
+# Campaign ids per IN (...) when refreshing after a write
+REFRESH_CHUNK = 500
+# Payout rows fetched at a time while building
+READ_CHUNK = 10000
+# Change log rows read at a time while catching up
+CATCH_UP_CHUNK = 5000
+
+class CountryRanking:
+    """Running campaigns paying out in one country, highest amount first, ties by id.
+
+    Two parallel arrays (negated amounts ascending, campaign ids) take 16
+    bytes per payout; positions are found by bisecting the amounts and then
+    the ids among equal amounts.
+    """
+    __slots__ = ("amounts", "campaign_ids")
+
+    def __init__(self, entries: Iterable[Tuple[float, int]] = ()):
+        ordered = sorted([(-amount, campaign_id) for amount, campaign_id in entries])
+        self.amounts = array("d", [key for key, _ in ordered])
+        self.campaign_ids = array("q", [campaign_id for _, campaign_id in ordered])
+
+    def __len__(self) -> int:
+        return len(self.campaign_ids)
+
+    def _position(self, amount: float, campaign_id: int) -> int:
+        lo = bisect_left(self.amounts, -amount)
+        hi = bisect_right(self.amounts, -amount, lo)
+        return bisect_left(self.campaign_ids, campaign_id, lo, hi)
+
+    def add(self, amount: float, campaign_id: int) -> None:
+        position = self._position(amount, campaign_id)
+        self.amounts.insert(position, -amount)
+        self.campaign_ids.insert(position, campaign_id)
+
+    def remove(self, amount: float, campaign_id: int) -> None:
+        position = self._position(amount, campaign_id)
+        if position < len(self.campaign_ids) and self.campaign_ids[position] == campaign_id:
+            del self.amounts[position]
+            del self.campaign_ids[position]
+
+    def page(self, limit: int, after: Optional[Tuple[float, int]] = None) -> List[Tuple[int, float]]:
+        """(campaign_id, amount) of up to ``limit`` entries ranked after ``after``"""
+        start = 0
+        if after is not None:
+            # The entry itself may be gone; the position it would have still marks the spot
+            amount, campaign_id = after
+            start = self._position(amount, campaign_id)
+            if start < len(self.campaign_ids) and self.campaign_ids[start] == campaign_id and self.amounts[start] == -amount:
+                start += 1
+        end = start + limit
+        return list(zip(self.campaign_ids[start:end], (-key for key in self.amounts[start:end])))
+
+class PayoutIndex:
+    """In-memory answer to "what does campaign X pay in country Y, and is it running?".
+
+    Holds each campaign's running flag and a country code -> amount dict of
+    its payouts, built from the campaigns and payouts tables with two plain
+    column queries, plus a CountryRanking per country for top-K lookups. The
+    services refresh the campaigns they wrote after committing, so lookups
+    never query the database. The index is private to each worker process:
+    writes served by another worker show up when ``catch_up`` reads them
+    from the change log (see ``main.follow_change_log``).
+    """
+
+    def __init__(self):
+        self._running: Dict[int, bool] = {}
+        self._payouts: Dict[int, Dict[str, float]] = {}
+        self._rankings: Dict[str, CountryRanking] = {}
+        self.loaded_at: Optional[float] = None
+        # Last change log entry applied
+        self.last_seq = 0
+        # Campaigns written while each running rebuild was reading, re-read once it swaps in
+        self._rebuilds: List[set] = []
+
+    @property
+    def loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    def __len__(self) -> int:
+        return len(self._running)
+
+    def clear(self) -> None:
+        self._running, self._payouts, self._rankings, self.loaded_at = {}, {}, {}, None
+        self.last_seq = 0
+
+    def _read(self, db: Session, campaign_ids: Optional[List[int]] = None) -> Tuple[Dict[int, bool], Dict[int, Dict[str, float]]]:
+        # Core rows on the session's connection, country as its stored code: the ORM
+        # loading and Enum conversion would cost more than building the index
+        campaigns = select(Campaign.id, Campaign.is_running)
+        payouts = select(Payout.campaign_id, type_coerce(Payout.country, String), type_coerce(Payout.amount, Float))
+        if campaign_ids is not None:
+            campaigns = campaigns.where(Campaign.id.in_(campaign_ids))
+            payouts = payouts.where(Payout.campaign_id.in_(campaign_ids))
+        connection = db.connection()
+        running = {campaign_id: bool(is_running) for campaign_id, is_running in connection.execute(campaigns)}
+        amounts: Dict[int, Dict[str, float]] = {}
+        for rows in connection.execute(payouts).partitions(READ_CHUNK):
+            for campaign_id, country, amount in rows:
+                countries = amounts.get(campaign_id)
+                if countries is None:
+                    countries = amounts[campaign_id] = {}
+                countries[country] = float(amount)
+        return running, amounts
+
+    @staticmethod
+    def _rank(running: Dict[int, bool], amounts: Dict[int, Dict[str, float]]) -> Dict[str, CountryRanking]:
+        entries: Dict[str, List[Tuple[float, int]]] = {}
+        for campaign_id, countries in amounts.items():
+            if running.get(campaign_id):
+                for country, amount in countries.items():
+                    country_entries = entries.get(country)
+                    if country_entries is None:
+                        country_entries = entries[country] = []
+                    country_entries.append((amount, campaign_id))
+        return {country: CountryRanking(country_entries) for country, country_entries in entries.items()}
+
+    def rebuild(self, db: Session) -> int:
+        """Load every campaign; the new maps replace the old ones in one step"""
+        started = time.perf_counter()
+        written = set()
+        self._rebuilds.append(written)
+        try:
+            # Read first: changes logged while the tables are read are applied again on catch-up
+            head = change_log.head(db)
+            running, amounts = self._read(db)
+            rankings = self._rank(running, amounts)
+            self._running, self._payouts, self._rankings, self.loaded_at = running, amounts, rankings, time.monotonic()
+            self.last_seq = head
+        finally:
+            self._rebuilds.remove(written)
+        self.refresh(db, written)
+        logger.info(f"Built payout index of {len(running)} campaigns in {time.perf_counter() - started:.3f}s")
+        return len(running)
+
+    def ensure_loaded(self, db: Session) -> None:
+        if not self.loaded:
+            self.rebuild(db)
+
+    def _unrank(self, campaign_id: int) -> None:
+        if self._running.get(campaign_id):
+            for country, amount in self._payouts[campaign_id].items():
+                self._rankings[country].remove(amount, campaign_id)
+
+    def _set(self, campaign_id: int, is_running: bool, amounts: Dict[str, float]) -> None:
+        self._unrank(campaign_id)
+        self._running[campaign_id] = is_running
+        self._payouts[campaign_id] = amounts
+        if is_running:
+            for country, amount in amounts.items():
+                self._rankings.setdefault(country, CountryRanking()).add(amount, campaign_id)
+
+    def _drop(self, campaign_id: int) -> None:
+        self._unrank(campaign_id)
+        self._running.pop(campaign_id, None)
+        self._payouts.pop(campaign_id, None)
+
+    def put(self, campaign_id: int, is_running: bool, amounts: Dict[str, float]) -> None:
+        """Record a campaign the caller just committed, without reading it back"""
+        for written in self._rebuilds:
+            written.add(campaign_id)
+        if self.loaded:
+            self._set(campaign_id, bool(is_running), amounts)
+
+    def refresh(self, db: Session, campaign_ids: Iterable[int]) -> None:
+        """Re-read these campaigns after a committed write; deleted ones drop out"""
+        campaign_ids = list(campaign_ids)
+        for written in self._rebuilds:
+            written.update(campaign_ids)
+        if not self.loaded:
+            return
+        for start in range(0, len(campaign_ids), REFRESH_CHUNK):
+            chunk = campaign_ids[start:start + REFRESH_CHUNK]
+            running, amounts = self._read(db, chunk)
+            for campaign_id in chunk:
+                if campaign_id in running:
+                    self._set(campaign_id, running[campaign_id], amounts.get(campaign_id, {}))
+                else:
+                    self._drop(campaign_id)
+
+    def catch_up(self, db: Session) -> Optional[List[int]]:
+        """Refresh the campaigns changed since the last build or catch-up, whichever worker wrote them.
+
+        Returns their ids, or None after falling back to a full rebuild
+        because the log no longer reaches back to ``last_seq``.
+        """
+        if not self.loaded:
+            return []
+        changed: Dict[int, None] = {}
+        try:
+            while True:
+                changes = change_log.changes_since(db, self.last_seq, CATCH_UP_CHUNK)
+                if not changes:
+                    return list(changed)
+                campaign_ids = list(dict.fromkeys(change.campaign_id for change in changes))
+                self.refresh(db, campaign_ids)
+                changed.update(dict.fromkeys(campaign_ids))
+                self.last_seq = changes[-1].seq
+        except ChangesExpiredError as e:
+            logger.warning(f"Rebuilding payout index: {str(e)}")
+            self.rebuild(db)
+            return None
+
+    def resolve(self, campaign_id: int, country: str) -> Optional[dict]:
+        """None for an unknown campaign; amount is None where it pays nothing in ``country``"""
+        is_running = self._running.get(campaign_id)
+        if is_running is None:
+            return None
+        country_data = country_manager.get_country_data(country)
+        return {
+            "campaign_id": campaign_id,
+            "country": country,
+            "is_running": is_running,
+            "amount": self._payouts[campaign_id].get(country),
+            "currency_code": country_data.currency_code if country_data else None,
+        }
+
+    def resolve_many(self, pairs: Iterable[Tuple[int, str]]) -> List[Optional[dict]]:
+        return [self.resolve(campaign_id, country) for campaign_id, country in pairs]
+
+    def top(self, country: str, limit: int, after: Optional[Tuple[float, int]] = None) -> List[Tuple[int, float]]:
+        """Highest-paying running campaigns in ``country`` as (campaign_id, amount)"""
+        ranking = self._rankings.get(country)
+        return ranking.page(limit, after) if ranking is not None else []
+
+    def top_page(self, country: str, limit: int, cursor: str = "") -> dict:
+        """One page of ``top``; the cursor carries the last (amount, campaign_id) served"""
+        after = None
+        if cursor:
+            amount, campaign_id = decode_cursor(cursor, (float, int))
+            after = (float(amount), campaign_id)
+        items = self.top(country, limit, after)
+        country_data = country_manager.get_country_data(country)
+        return {
+            "country": country,
+            "currency_code": country_data.currency_code if country_data else None,
+            "items": [{"campaign_id": campaign_id, "amount": amount} for campaign_id, amount in items],
+            "next_cursor": encode_cursor([items[-1][1], items[-1][0]]) if len(items) == limit else None,
+        }
+
+payout_index = PayoutIndex()
@@ -0,0 +1,115 @@
+import logging
+from decouple import config
+from sqlalchemy import func, inspect, literal_column, or_, select, table, column, text
+from sqlalchemy.orm import Query, Session
+from typing import Dict, Optional, Sequence, Tuple
+from models.models import Campaign
+
+logger = logging.getLogger(__name__)
+
+SEARCH_BACKEND = config('SEARCH_BACKEND', default='auto')
+
+SEARCH_COLUMNS = ("title", "landing_url")
+
+campaigns_fts = table("campaigns_fts", column("rowid"))
+
+class SearchBackend:
+    """Substring matching with ILIKE; works everywhere but cannot use an index.
+
+    ``search`` narrows a campaign query to rows containing the term and returns
+    a relevance expression (higher is better), or None when it does not rank.
+    ``filter`` narrows on a single column for the list endpoint filters.
+    """
+    name = "like"
+
+    def is_available(self, bind) -> bool:
+        return True
+
+    def search(self, query: Query, term: str) -> Tuple[Query, Optional[object]]:
+        return query.filter(self._ilike(term, SEARCH_COLUMNS)), None
+
+    def filter(self, query: Query, field: str, term: str) -> Query:
+        return query.filter(self._ilike(term, (field,)))
+
+    def _ilike(self, term: str, fields: Sequence[str]):
+        return or_(*(getattr(Campaign, field).ilike(f"%{term}%") for field in fields))
+
+class TrigramSearchBackend(SearchBackend):
+    """Postgres pg_trgm: the GIN trigram indexes serve ILIKE '%term%' directly,
+    and ``similarity`` ranks the matches."""
+    name = "trigram"
+
+    def is_available(self, bind) -> bool:
+        with bind.connect() as conn:
+            return conn.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first() is not None
+
+    def search(self, query: Query, term: str) -> Tuple[Query, Optional[object]]:
+        rank = func.greatest(
+            func.similarity(Campaign.title, term),
+            func.similarity(Campaign.landing_url, term)
+        )
+        return query.filter(self._ilike(term, SEARCH_COLUMNS)), rank
+
+class Fts5SearchBackend(SearchBackend):
+    """SQLite FTS5 with the trigram tokenizer, ranked by bm25.
+
+    The trigram tokenizer matches arbitrary substrings case-insensitively, so
+    results are the same rows ILIKE would return. Terms shorter than a trigram
+    cannot be looked up in the index and fall back to ILIKE.
+    """
+    name = "fts5"
+    MIN_TERM_LENGTH = 3
+
+    def is_available(self, bind) -> bool:
+        return inspect(bind).has_table("campaigns_fts")
+
+    def search(self, query: Query, term: str) -> Tuple[Query, Optional[object]]:
+        if len(term) < self.MIN_TERM_LENGTH:
+            return super().search(query, term)
+        hits = select(
+            campaigns_fts.c.rowid.label("id"),
+            (-func.bm25(literal_column("campaigns_fts"))).label("rank")
+        ).where(self._match(term, SEARCH_COLUMNS)).subquery()
+        return query.join(hits, Campaign.id == hits.c.id), hits.c.rank
+
+    def filter(self, query: Query, field: str, term: str) -> Query:
+        if len(term) < self.MIN_TERM_LENGTH:
+            return super().filter(query, field, term)
+        hits = select(campaigns_fts.c.rowid).where(self._match(term, (field,)))
+        return query.filter(Campaign.id.in_(hits))
+
+    def _match(self, term: str, fields: Sequence[str]):
+        phrase = '"' + term.replace('"', '""') + '"'
+        return literal_column("campaigns_fts").op("MATCH")(f"{{{' '.join(fields)}}}: {phrase}")
+
+SEARCH_BACKENDS = {
+    backend.name: backend
+    for backend in (SearchBackend(), TrigramSearchBackend(), Fts5SearchBackend())
+}
+
+DIALECT_BACKENDS = {
+    "postgresql": "trigram",
+    "sqlite": "fts5",
+}
+
+_resolved: Dict[str, SearchBackend] = {}
+
+def get_search_backend(db: Session) -> SearchBackend:
+    """Pick the search backend for the session's database.
+
+    SEARCH_BACKEND selects one explicitly; ``auto`` uses the dialect's indexed
+    backend when its migration has been applied and ILIKE otherwise. The
+    choice is made once per database URL.
+    """
+    bind = db.get_bind()
+    key = str(bind.url)
+    if key not in _resolved:
+        name = SEARCH_BACKEND
+        if name == "auto":
+            name = DIALECT_BACKENDS.get(bind.dialect.name, "like")
+        backend = SEARCH_BACKENDS[name]
+        if not backend.is_available(bind):
+            logger.warning(f"Search backend {name} is not set up on this database, falling back to ILIKE")
+            backend = SEARCH_BACKENDS["like"]
+        _resolved[key] = backend
+    return _resolved[key]
@@ -0,0 +1,106 @@
+import logging
+from collections import defaultdict
+from decimal import Decimal
+from decouple import config
+from pydantic import TypeAdapter
+from typing import Dict, List, Optional
+from schemas.schema import Campaign as CampaignSchema, CampaignBatch, CampaignPage
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_SERIALIZERS = ("orm", "typeadapter", "orjson")
+
+class ResponseSerializer:
+    """Writes list, page and batch bodies in the ``schemas.Campaign`` shape from plain rows.
+
+    Campaign rows carry id, title, landing_url, is_running, version and
+    updated_at; payout rows carry id, country, amount and campaign_id. No ORM
+    objects are built, and the bytes match what the response models produce.
+    """
+    name = "typeadapter"
+
+    def __init__(self):
+        self.campaigns_adapter = TypeAdapter(List[CampaignSchema])
+        self.page_adapter = TypeAdapter(CampaignPage)
+        self.batch_adapter = TypeAdapter(CampaignBatch)
+
+    def campaigns(self, campaign_rows, payout_rows) -> bytes:
+        return self.campaigns_adapter.dump_json(
+            self.campaigns_adapter.validate_python(self._campaign_dicts(campaign_rows, payout_rows))
+        )
+
+    def page(self, campaign_rows, payout_rows, next_cursor: Optional[str]) -> bytes:
+        return self.page_adapter.dump_json(self.page_adapter.validate_python({
+            "items": self._campaign_dicts(campaign_rows, payout_rows),
+            "next_cursor": next_cursor,
+        }))
+
+    def batch(self, campaign_rows, payout_rows, missing: List[int]) -> bytes:
+        return self.batch_adapter.dump_json(self.batch_adapter.validate_python({
+            "items": self._campaign_dicts(campaign_rows, payout_rows),
+            "missing": missing,
+        }))
+
+    def _payout(self, row) -> dict:
+        return {"amount": row.amount, "country": row.country, "id": row.id, "campaign_id": row.campaign_id}
+
+    def _campaign_dicts(self, campaign_rows, payout_rows) -> List[dict]:
+        payouts: Dict[int, List[dict]] = defaultdict(list)
+        for row in payout_rows:
+            payouts[row.campaign_id].append(self._payout(row))
+        # Keys in field order, so the orjson output matches pydantic's
+        return [
+            {
+                "title": row.title,
+                "landing_url": row.landing_url,
+                "is_running": row.is_running,
+                "id": row.id,
+                "version": row.version,
+                "updated_at": row.updated_at,
+                "payouts": payouts[row.id],
+            }
+            for row in campaign_rows
+        ]
+
+class OrjsonSerializer(ResponseSerializer):
+    """Skips validation: the rows come from our own tables, so they already fit the schema"""
+    name = "orjson"
+
+    def __init__(self, orjson):
+        super().__init__()
+        self.orjson = orjson
+
+    def campaigns(self, campaign_rows, payout_rows) -> bytes:
+        return self.orjson.dumps(self._campaign_dicts(campaign_rows, payout_rows))
+
+    def page(self, campaign_rows, payout_rows, next_cursor: Optional[str]) -> bytes:
+        return self.orjson.dumps({"items": self._campaign_dicts(campaign_rows, payout_rows), "next_cursor": next_cursor})
+
+    def batch(self, campaign_rows, payout_rows, missing: List[int]) -> bytes:
+        return self.orjson.dumps({"items": self._campaign_dicts(campaign_rows, payout_rows), "missing": missing})
+
+    def _payout(self, row) -> dict:
+        # Decimal fields serialize as strings; str(Decimal(repr)) gives pydantic's spelling
+        return {
+            "amount": str(Decimal(repr(row.amount))),
+            "country": row.country.value,
+            "id": row.id,
+            "campaign_id": row.campaign_id,
+        }
+
+def build_response_serializer(name: Optional[str] = None) -> Optional[ResponseSerializer]:
+    """RESPONSE_SERIALIZER selects orjson (default), typeadapter or orm; None means orm,
+    the original path of ORM objects through the route's response_model"""
+    name = name or config('RESPONSE_SERIALIZER', default='orjson')
+    if name not in RESPONSE_SERIALIZERS:
+        raise ValueError(f"Unknown response serializer {name!r}, expected one of {', '.join(RESPONSE_SERIALIZERS)}")
+    if name == "orm":
+        return None
+    if name == "orjson":
+        try:
+            import orjson
+        except ImportError:
+            logger.error("RESPONSE_SERIALIZER=orjson but the orjson package is not installed, using typeadapter")
+        else:
+            return OrjsonSerializer(orjson)
+    return ResponseSerializer()
@@ -1,10 +1,43 @@
+import hashlib
+import json
 import logging
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, delete, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.orm import Bundle, Session, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from decimal import Decimal
-from typing import List, Optional
-from models.models import Campaign, Payout
-from schemas.schema import PayoutCreate, CampaignCreate, CampaignUpdate, CampaignFilter, PayoutUpdate
+from typing import List, Optional, Tuple
+from models.models import Campaign, Payout, is_running_clause, validate_and_transform_url
+from schemas.schema import PayoutCreate, CampaignCreate, CampaignUpdate, CampaignFilter, CampaignSelection, PayoutUpdate
 from database.database import CountryEnum, country_manager
+from database.replicas import RoutingSession
+from service.pagination import decode_cursor, encode_cursor
+from service.search import SearchBackend, get_search_backend
+from service.cache import campaign_cache
+from service.reporting import mark_payouts_stale
+from service.export import export_service
+from service.resolution import payout_index
+from service.changes import change_notifier, record_changes, record_deletes
+from service.versioning import VersionConflictError, etag_matches, campaign_etag, if_match_versions, lock_campaigns, rows_etag, touch_campaigns
+from service.serialization import ResponseSerializer, build_response_serializer
+
+# Dialects whose INSERT supports ON CONFLICT (campaign_id, country) DO UPDATE
+UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+# Plain column rows for the serializer path; single_entity makes it stand in
+# for Campaign in queries built by _filtered_query, _keyset_page and search
+CAMPAIGN_ROW = Bundle(
+    "campaign", Campaign.id, Campaign.title, Campaign.landing_url, Campaign.is_running,
+    Campaign.version, Campaign.updated_at, single_entity=True
+)
+
+# Ids per IN (...) list when fetching campaigns by id
+MULTI_GET_CHUNK = 500
+
+# Tries a toggle gets when other writes keep changing the campaign under it
+TOGGLE_ATTEMPTS = 3
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -14,7 +47,33 @@ class PayoutError(Exception):
     """Base exception for payout operations"""
     pass
 
+# Every writer takes its locks in one order, so concurrent writes cannot deadlock:
+# the campaign rows (touch_campaigns, lock_campaigns or the ORM flush), then the
+# payout summary rows (mark_payouts_stale), then the change log (record_changes or
+# record_deletes), which is always the last statement before the commit.
+
+def _campaigns_changed(db: Session, *campaign_ids: int) -> None:
+    """Called after a commit that changed these campaigns or their payouts"""
+    campaign_cache.invalidate(*campaign_ids)
+    payout_index.refresh(db, campaign_ids)
+    change_notifier.notify()
+
 class PayoutService:
+    def __init__(self):
+        self._countries_payload: Optional[Tuple[int, bytes, str]] = None
+
+    def get_countries_payload(self) -> Tuple[bytes, str]:
+        """Serialized get_available_countries() and its strong ETag.
+
+        Built once per country data version instead of on every request.
+        """
+        cached = self._countries_payload
+        if cached is None or cached[0] != country_manager.version:
+            payload = json.dumps(self.get_available_countries(), separators=(",", ":")).encode()
+            etag = f'"{hashlib.sha256(payload).hexdigest()[:32]}"'
+            cached = self._countries_payload = (country_manager.version, payload, etag)
+        return cached[1], cached[2]
+
     def get_available_countries(self) -> List[dict]:
         """Get countries with currency info for campaign creation form"""
         try:
@@ -58,9 +117,13 @@ class PayoutService:
                 campaign_id=campaign_id,
                 currency_code=country_data.currency_code
             )
+            touch_campaigns(db, [campaign_id])
+            mark_payouts_stale(db, [payout.country])
             db.add(db_payout)
+            record_changes(db, [campaign_id])
             db.commit()
             db.refresh(db_payout)
+            _campaigns_changed(db, campaign_id)
             
             logger.info(f"Created payout: {payout.amount} {country_data.currency_code}")
             return db_payout
@@ -70,20 +133,36 @@ class PayoutService:
             logger.error(f"Payout creation failed: {str(e)}")
             raise PayoutError(str(e))
 
-    def update_payout(self, db: Session, payout_id: int, payout_update: PayoutUpdate) -> Optional[Payout]:
+    def update_payout(self, db: Session, payout_id: int, payout_update: PayoutUpdate, if_match: Optional[str] = None) -> Optional[Payout]:
+            """Update a payout; ``if_match`` is checked against the ETag of its campaign"""
+            country = payout_update.country
             try:
                 payout = db.query(Payout).filter(Payout.id == payout_id).first()
                 if not payout:
                     return None
 
+                versions = if_match_versions(if_match, payout.campaign_id)
+                if touch_campaigns(db, [payout.campaign_id], versions) != 1 and versions is not None:
+                    raise VersionConflictError(f"Campaign {payout.campaign_id} changed since it was read")
                 update_data = payout_update.model_dump(exclude_unset=True)
+                # Read now: the rollback below expires the payout
+                country = update_data.get("country") or payout.country
+                mark_payouts_stale(db, {payout.country, country})
                 for field, value in update_data.items():
                     setattr(payout, field, value)
+                record_changes(db, [payout.campaign_id])
 
                 db.commit()
                 db.refresh(payout)
+                _campaigns_changed(db, payout.campaign_id)
                 return payout
 
+            except VersionConflictError:
+                db.rollback()
+                raise
+            except IntegrityError:
+                db.rollback()
+                raise PayoutError(f"Payout for {getattr(country, 'value', country)} already exists")
             except Exception as e:
                 db.rollback()
                 logger.error(f"Error updating payout: {str(e)}")
@@ -95,8 +174,13 @@ class PayoutService:
             if not payout:
                 raise PayoutError(f"Payout {payout_id} not found")
 
+            campaign_id = payout.campaign_id
+            touch_campaigns(db, [campaign_id])
+            mark_payouts_stale(db, [payout.country])
             db.delete(payout)
+            record_changes(db, [campaign_id])
             db.commit()
+            _campaigns_changed(db, campaign_id)
             
             logger.info(f"Deleted payout {payout_id}")
             return True
@@ -121,80 +205,333 @@ class PayoutService:
 payout_service = PayoutService()
 
 class CampaignService:
-    def get_campaigns(self, db: Session, skip: int = 0, limit: int = 100, filters: Optional[CampaignFilter] = None) -> List[Campaign]:
-        query = db.query(Campaign)
-        
+    def __init__(self, search_backend: Optional[SearchBackend] = None, serializer: Optional[ResponseSerializer] = None):
+        # None picks the backend for the session's database, see service/search.py
+        self.search_backend = search_backend
+        # None keeps lists on ORM objects and the routes' response_model, see service/serialization.py
+        self.serializer = serializer
+
+    def get_campaigns(self, db: Session, skip: int = 0, limit: int = 100, filters: Optional[CampaignFilter] = None, query=None) -> List[Campaign]:
+        query = self._filtered_query(db, filters, query)
+        return query.order_by(Campaign.id).offset(skip).limit(limit).all()
+
+    def get_campaigns_page(self, db: Session, cursor: str = "", limit: int = 100, filters: Optional[CampaignFilter] = None, query=None) -> Tuple[List[Campaign], Optional[str]]:
+        """Keyset page of campaigns ordered by id; an empty cursor starts from the beginning"""
+        return self._keyset_page(self._filtered_query(db, filters, query), cursor, limit)
+
+    def get_campaigns_json(self, db: Session, skip: int = 0, limit: int = 100, filters: Optional[CampaignFilter] = None,
+                           if_none_match: Optional[str] = None) -> Tuple[Optional[bytes], str]:
+        """get_campaigns() serialized from plain rows, with its ETag"""
+        return self._serialize(db, self.get_campaigns(db, skip, limit, filters, db.query(CAMPAIGN_ROW)), if_none_match=if_none_match)
+
+    def get_campaigns_page_json(self, db: Session, cursor: str = "", limit: int = 100, filters: Optional[CampaignFilter] = None,
+                                if_none_match: Optional[str] = None) -> Tuple[Optional[bytes], str]:
+        rows, next_cursor = self.get_campaigns_page(db, cursor, limit, filters, db.query(CAMPAIGN_ROW))
+        return self._serialize(db, rows, next_cursor, page=True, if_none_match=if_none_match)
+
+    def _serialize(self, db: Session, campaign_rows, next_cursor: Optional[str] = None, page: bool = False,
+                   if_none_match: Optional[str] = None) -> Tuple[Optional[bytes], str]:
+        """ETag of the rows and the response body, None when If-None-Match already matches.
+
+        The payouts are fetched with one IN query, and only when the body is needed.
+        """
+        etag = rows_etag(campaign_rows, page, next_cursor)
+        if etag_matches(if_none_match, etag):
+            return None, etag
+        payout_rows = db.execute(
+            export_service.payouts_statement([row.id for row in campaign_rows])
+        ).all() if campaign_rows else []
+        if page:
+            return self.serializer.page(campaign_rows, payout_rows, next_cursor), etag
+        return self.serializer.campaigns(campaign_rows, payout_rows), etag
+
+    def _filtered_query(self, db: Session, filters: Optional[CampaignFilter] = None, query=None):
+        if query is None:
+            query = db.query(Campaign).options(selectinload(Campaign.payouts))
+
         if filters:
             if filters.title:
-                query = query.filter(Campaign.title.ilike(f"%{filters.title}%"))
+                query = self._search_backend(db).filter(query, "title", filters.title)
             if filters.landing_url:
-                query = query.filter(Campaign.landing_url.ilike(f"%{filters.landing_url}%"))
+                query = self._search_backend(db).filter(query, "landing_url", filters.landing_url)
             if filters.is_running is not None:
-                query = query.filter(Campaign.is_running == filters.is_running)
-                
-        return query.offset(skip).limit(limit).all()
+                query = query.filter(is_running_clause(filters.is_running))
+
+        return query
+
+    def _keyset_page(self, query, cursor: str, limit: int, rank=None) -> Tuple[List[Campaign], Optional[str]]:
+        """Seek past the cursor instead of OFFSET-scanning skipped rows.
+
+        Pages are ordered by id, or by (rank DESC, id) for ranked search results,
+        and the cursor carries the sort key values of the last row.
+        """
+        limit = max(limit, 1)
+        if cursor:
+            position = decode_cursor(cursor, (int,) if rank is None else (float, int))
+            if rank is None:
+                query = query.filter(Campaign.id > position[0])
+            else:
+                last_rank, last_id = position
+                query = query.filter(or_(rank < last_rank, and_(rank == last_rank, Campaign.id > last_id)))
+
+        # Fetch one extra row to learn whether another page exists
+        if rank is None:
+            rows = query.order_by(Campaign.id).limit(limit + 1).all()
+            campaigns = rows
+        else:
+            rows = query.add_columns(rank).order_by(rank.desc(), Campaign.id).limit(limit + 1).all()
+            campaigns = [row[0] for row in rows]
+        if len(rows) <= limit:
+            return campaigns, None
+        last = rows[limit - 1]
+        position = [campaigns[limit - 1].id] if rank is None else [last[1], last[0].id]
+        return campaigns[:limit], encode_cursor(position)
+
+    def _search_backend(self, db: Session) -> SearchBackend:
+        return self.search_backend or get_search_backend(db)
     
     def get_campaign(self, db: Session, campaign_id: int) -> Optional[Campaign]:
         """Get campaign by ID with verification"""
-        campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
+        campaign = db.query(Campaign).options(
+            selectinload(Campaign.payouts)
+        ).filter(Campaign.id == campaign_id).first()
         if not campaign:
             logger.error(f"Campaign {campaign_id} not found")
             return None
         return campaign
     
+    def get_campaign_json(self, db: Session, campaign_id: int) -> Optional[Tuple[bytes, str]]:
+        """Serialized campaign response and its ETag, read through campaign_cache.
+
+        Misses are read from the primary: a lagging replica could put back a
+        version that a write has just invalidated.
+        """
+        cached = campaign_cache.get(campaign_id)
+        if cached is None:
+            if isinstance(db, RoutingSession):
+                db.read_from_primary()
+            campaign = self.get_campaign(db, campaign_id)
+            if not campaign:
+                return None
+            cached = campaign_cache.set(campaign)
+        version, body = cached
+        return body, campaign_etag(campaign_id, version)
+
+    def get_campaigns_by_ids(self, db: Session, campaign_ids: List[int], query=None) -> Tuple[list, List[int]]:
+        """Campaigns in the order asked for and the ids that do not exist.
+
+        Repeated ids are answered once. Campaigns are read in IN lists of
+        MULTI_GET_CHUNK ids and their payouts with one IN query per list.
+        """
+        campaign_ids = list(dict.fromkeys(campaign_ids))
+        if query is None:
+            query = db.query(Campaign).options(selectinload(Campaign.payouts))
+        found = {}
+        for start in range(0, len(campaign_ids), MULTI_GET_CHUNK):
+            chunk = campaign_ids[start:start + MULTI_GET_CHUNK]
+            for campaign in query.filter(Campaign.id.in_(chunk)):
+                found[campaign.id] = campaign
+        return (
+            [found[campaign_id] for campaign_id in campaign_ids if campaign_id in found],
+            [campaign_id for campaign_id in campaign_ids if campaign_id not in found],
+        )
+
+    def get_campaigns_by_ids_json(self, db: Session, campaign_ids: List[int], if_none_match: Optional[str] = None) -> Tuple[Optional[bytes], str]:
+        """get_campaigns_by_ids() serialized from plain rows, with its ETag"""
+        campaign_rows, missing = self.get_campaigns_by_ids(db, campaign_ids, db.query(CAMPAIGN_ROW))
+        etag = rows_etag(campaign_rows, missing)
+        if etag_matches(if_none_match, etag):
+            return None, etag
+        payout_rows = []
+        for start in range(0, len(campaign_rows), MULTI_GET_CHUNK):
+            chunk = campaign_rows[start:start + MULTI_GET_CHUNK]
+            payout_rows.extend(db.execute(export_service.payouts_statement([row.id for row in chunk])))
+        return self.serializer.batch(campaign_rows, payout_rows, missing), etag
+
     def create_campaign(self, db: Session, campaign_data: CampaignCreate) -> Campaign:
-        # Create campaign
+        """Insert a campaign and its payouts in one transaction.
+
+        A flush assigns the campaign id and the payouts go in as one batched
+        INSERT ... RETURNING (insertmanyvalues). The returned rows become the
+        campaign's payout collection, so building the response needs no refresh.
+        """
         db_campaign = Campaign(
             title=campaign_data.title,
             landing_url=campaign_data.landing_url,
             is_running=campaign_data.is_running,
-            
         )
-        
-        db.add(db_campaign)
-        db.commit()
-        db.refresh(db_campaign)
-
-        # Create associated payouts
-        for payout_data in campaign_data.payouts:
-            payout = Payout(
-                country=payout_data.country,
-                amount=payout_data.amount,
-                campaign_id=db_campaign.id
-            )
-            db.add(payout)
-        
-        db.commit()
-        db.refresh(db_campaign)
+        try:
+            db.add(db_campaign)
+            db.flush()
+
+            payouts = []
+            if campaign_data.payouts:
+                # The flush would insert ORM objects one by one where the dialect has
+                # no insert sentinel (SQLite); a bulk insert batches everywhere
+                payouts = sorted(db.scalars(
+                    insert(Payout).returning(Payout),
+                    [
+                        {"campaign_id": db_campaign.id, "country": payout.country, "amount": float(payout.amount)}
+                        for payout in campaign_data.payouts
+                    ]
+                ).all(), key=lambda payout: payout.id)
+                mark_payouts_stale(db, [payout.country for payout in campaign_data.payouts])
+            set_committed_value(db_campaign, "payouts", payouts)
+            record_changes(db, [db_campaign.id])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        payout_index.put(
+            db_campaign.id, db_campaign.is_running, {payout.country.value: payout.amount for payout in payouts}
+        )
+        change_notifier.notify()
         return db_campaign
 
-    def update_campaign(self, db: Session, campaign_id: int, campaign_update: CampaignUpdate) -> Optional[Campaign]:
+    def update_campaign(self, db: Session, campaign_id: int, campaign_update: CampaignUpdate, if_match: Optional[str] = None) -> Optional[Campaign]:
         campaign = self.get_campaign(db, campaign_id)
         if not campaign:
             return None
-            
-        for field, value in campaign_update.model_dump(exclude_unset=True).items():
+
+        versions = if_match_versions(if_match, campaign_id)
+        if versions is not None and campaign.version not in versions:
+            raise VersionConflictError(f"Campaign {campaign_id} is at version {campaign.version}")
+        values = campaign_update.model_dump(exclude_unset=True)
+        status_changed = values.get("is_running", campaign.is_running) != campaign.is_running
+        for field, value in values.items():
             setattr(campaign, field, value)
             
-        db.commit()
+        self._commit_versioned(db, campaign, status_changed)
         db.refresh(campaign)
+        _campaigns_changed(db, campaign_id)
         return campaign
 
     def toggle_campaign_status(self, db: Session, campaign_id: int) -> Optional[Campaign]:
-        campaign = self.get_campaign(db, campaign_id)
-        if not campaign:
-            return None
-            
-        campaign.is_running = not campaign.is_running
-        db.commit()
+        """Flip is_running; a flip that loses a race with another write is redone on the fresh row"""
+        for attempt in range(TOGGLE_ATTEMPTS):
+            campaign = self.get_campaign(db, campaign_id)
+            if not campaign:
+                return None
+
+            campaign.is_running = not campaign.is_running
+            try:
+                self._commit_versioned(db, campaign, status_changed=True)
+                break
+            except VersionConflictError:
+                if attempt == TOGGLE_ATTEMPTS - 1:
+                    raise
         db.refresh(campaign)
+        _campaigns_changed(db, campaign_id)
         return campaign
 
-    def search_campaigns(self, db: Session, search_term: str, skip: int = 0, limit: int = 100) -> List[Campaign]:
-        return db.query(Campaign).filter(
-        Campaign.title.ilike(f"%{search_term}%") |
-        Campaign.landing_url.ilike(f"%{search_term}%")
-    ).offset(skip).limit(limit).all()
+    def _commit_versioned(self, db: Session, campaign: Campaign, status_changed: bool = False) -> None:
+        """Commit an ORM change to a campaign; its UPDATE only applies to the version read.
+
+        The campaign is flushed first so its row lock comes before the summary rows'.
+        """
+        campaign_id = campaign.id
+        try:
+            if db.is_modified(campaign):
+                db.flush()
+                if status_changed:
+                    mark_payouts_stale(db, campaign_ids=[campaign_id])
+                record_changes(db, [campaign_id])
+            db.commit()
+        except StaleDataError:
+            db.rollback()
+            raise VersionConflictError(f"Campaign {campaign_id} changed while it was being updated")
+
+    def _selection_criteria(self, db: Session, selection: CampaignSelection):
+        """WHERE clause for a bulk operation's list of ids or filter"""
+        if selection.ids is not None:
+            return Campaign.id.in_(selection.ids)
+        matching = self._filtered_query(db, selection.filter, db.query(Campaign.id))
+        return Campaign.id.in_(matching.subquery().select())
+
+    def _bulk_update(self, db: Session, selection: CampaignSelection, values: dict) -> List[int]:
+        """One UPDATE ... RETURNING id over the selection; rows never enter the session"""
+        criteria = self._selection_criteria(db, selection)
+        if "is_running" in values:
+            # Flagged before the UPDATE, which may take the campaigns out of the selection
+            lock_campaigns(db, select(Campaign.id).where(criteria))
+            mark_payouts_stale(db, campaign_ids=select(Campaign.id).where(criteria))
+        campaign_ids = db.scalars(
+            update(Campaign)
+            .where(criteria)
+            .values(**values, version=Campaign.version + 1)
+            .returning(Campaign.id)
+            .execution_options(synchronize_session=False)
+        ).all()
+        record_changes(db, campaign_ids)
+        db.commit()
+        _campaigns_changed(db, *campaign_ids)
+        logger.info(f"Bulk updated {len(campaign_ids)} campaigns: {sorted(values)}")
+        return campaign_ids
+
+    def bulk_set_status(self, db: Session, selection: CampaignSelection, is_running: Optional[bool] = None) -> int:
+        """Set is_running on every selected campaign, or flip it when is_running is None"""
+        value = ~Campaign.is_running if is_running is None else is_running
+        return len(self._bulk_update(db, selection, {"is_running": value}))
+
+    def bulk_update(self, db: Session, selection: CampaignSelection, campaign_update: CampaignUpdate) -> int:
+        values = campaign_update.model_dump(exclude_unset=True)
+        if not values:
+            return 0
+        if values.get("landing_url"):
+            # Bulk UPDATE bypasses the model's @validates hook, so apply it here
+            values["landing_url"] = validate_and_transform_url(values["landing_url"])
+        return len(self._bulk_update(db, selection, values))
+
+    def bulk_delete(self, db: Session, selection: CampaignSelection) -> int:
+        """Delete the selected campaigns and their payouts with two set-based DELETEs"""
+        criteria = self._selection_criteria(db, selection)
+        lock_campaigns(db, select(Campaign.id).where(criteria))
+        mark_payouts_stale(db, campaign_ids=select(Campaign.id).where(criteria))
+        db.execute(
+            delete(Payout)
+            .where(Payout.campaign_id.in_(select(Campaign.id).where(criteria)))
+            .execution_options(synchronize_session=False)
+        )
+        deleted = db.execute(
+            delete(Campaign)
+            .where(criteria)
+            .returning(Campaign.id, Campaign.version)
+            .execution_options(synchronize_session=False)
+        ).all()
+        record_deletes(db, deleted)
+        db.commit()
+        campaign_ids = [campaign_id for campaign_id, _ in deleted]
+        _campaigns_changed(db, *campaign_ids)
+        logger.info(f"Bulk deleted {len(campaign_ids)} campaigns")
+        return len(campaign_ids)
+
+    def search_campaigns(self, db: Session, search_term: str, skip: int = 0, limit: int = 100, query=None) -> List[Campaign]:
+        """Search titles and landing URLs, most relevant first when the backend ranks"""
+        query, rank = self._search_query(db, search_term, query)
+        if rank is None:
+            return query.order_by(Campaign.id).offset(skip).limit(limit).all()
+        rows = query.add_columns(rank).order_by(rank.desc(), Campaign.id).offset(skip).limit(limit).all()
+        return [row[0] for row in rows]
+
+    def search_campaigns_page(self, db: Session, search_term: str, cursor: str = "", limit: int = 100, query=None) -> Tuple[List[Campaign], Optional[str]]:
+        """Keyset page of search results in relevance order"""
+        query, rank = self._search_query(db, search_term, query)
+        return self._keyset_page(query, cursor, limit, rank)
+
+    def search_campaigns_json(self, db: Session, search_term: str, skip: int = 0, limit: int = 100,
+                              if_none_match: Optional[str] = None) -> Tuple[Optional[bytes], str]:
+        rows = self.search_campaigns(db, search_term, skip, limit, db.query(CAMPAIGN_ROW))
+        return self._serialize(db, rows, if_none_match=if_none_match)
+
+    def search_campaigns_page_json(self, db: Session, search_term: str, cursor: str = "", limit: int = 100,
+                                   if_none_match: Optional[str] = None) -> Tuple[Optional[bytes], str]:
+        rows, next_cursor = self.search_campaigns_page(db, search_term, cursor, limit, db.query(CAMPAIGN_ROW))
+        return self._serialize(db, rows, next_cursor, page=True, if_none_match=if_none_match)
+
+    def _search_query(self, db: Session, search_term: str, query=None):
+        if query is None:
+            query = db.query(Campaign).options(selectinload(Campaign.payouts))
+        return self._search_backend(db).search(query, search_term)
 
 
     def delete_payout(self, db: Session, payout_id: int) -> bool:
@@ -234,27 +571,115 @@ class CampaignService:
                 campaign_id=campaign_id
             )
             
+            touch_campaigns(db, [campaign_id])
+            mark_payouts_stale(db, [payout_data.country])
             db.add(db_payout)
+            record_changes(db, [campaign_id])
             db.commit()
             db.refresh(db_payout)
+            _campaigns_changed(db, campaign_id)
             
             logger.info(f"Created payout for campaign {campaign_id}")
             return db_payout
 
+        except IntegrityError:
+            db.rollback()
+            raise PayoutError(f"Payout for {payout_data.country.value} already exists")
         except Exception as e:
             db.rollback()
             logger.error(f"Error creating payout: {str(e)}")
             raise PayoutError(str(e))
 
+    def replace_payouts(self, db: Session, campaign_id: int, payouts: List[PayoutCreate]) -> Optional[List[Payout]]:
+        """Make ``payouts`` the campaign's complete payout set in one transaction.
+
+        Countries missing from the set are deleted with one DELETE, the rest
+        are written with one multi-row upsert that leaves unchanged amounts
+        alone. Returns None when the campaign does not exist.
+        """
+        if db.scalar(select(Campaign.id).where(Campaign.id == campaign_id)) is None:
+            return None
+        countries = [payout.country for payout in payouts]
+        rows = [
+            {"campaign_id": campaign_id, "country": payout.country, "amount": float(payout.amount)}
+            for payout in payouts
+        ]
+        try:
+            touch_campaigns(db, [campaign_id])
+            mark_payouts_stale(db, countries, campaign_ids=[campaign_id])
+            db.execute(
+                delete(Payout)
+                .where(Payout.campaign_id == campaign_id, Payout.country.notin_(countries))
+                .execution_options(synchronize_session=False)
+            )
+            if rows:
+                self._upsert_payouts(db, campaign_id, rows)
+            record_changes(db, [campaign_id])
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error replacing payouts of campaign {campaign_id}: {str(e)}")
+            raise PayoutError(str(e))
+        _campaigns_changed(db, campaign_id)
+        logger.info(f"Replaced payouts of campaign {campaign_id} with {len(rows)} countries")
+        return db.scalars(
+            select(Payout).where(Payout.campaign_id == campaign_id).order_by(Payout.id)
+        ).all()
+
+    def _upsert_payouts(self, db: Session, campaign_id: int, rows: List[dict]) -> None:
+        dialect_insert = UPSERT_INSERTS.get(db.get_bind().dialect.name)
+        if dialect_insert is not None:
+            statement = dialect_insert(Payout).values(rows)
+            db.execute(statement.on_conflict_do_update(
+                index_elements=[Payout.campaign_id, Payout.country],
+                set_={"amount": statement.excluded.amount},
+                where=Payout.amount != statement.excluded.amount,
+            ))
+            return
+
+        # No upsert in this dialect: diff against the stored amounts instead
+        stored = dict(db.execute(
+            select(Payout.country, Payout.amount).where(Payout.campaign_id == campaign_id)
+        ).all())
+        inserts = [row for row in rows if row["country"] not in stored]
+        for row in rows:
+            if row["country"] in stored and stored[row["country"]] != row["amount"]:
+                db.execute(
+                    update(Payout)
+                    .where(Payout.campaign_id == campaign_id, Payout.country == row["country"])
+                    .values(amount=row["amount"])
+                    .execution_options(synchronize_session=False)
+                )
+        if inserts:
+            db.execute(insert(Payout), inserts)
+
     def delete_campaign(self, db: Session, campaign_id: int) -> bool:
-        """Delete a campaign and its associated payouts"""
+        """Delete a campaign and its associated payouts.
+
+        Deleted by id rather than through the ORM, so a write that bumps the
+        version in the meantime cannot make the delete miss its row.
+        """
         try:
-            campaign = self.get_campaign(db, campaign_id)
-            if not campaign:
+            lock_campaigns(db, [campaign_id])
+            mark_payouts_stale(db, campaign_ids=[campaign_id])
+            db.execute(
+                delete(Payout)
+                .where(Payout.campaign_id == campaign_id)
+                .execution_options(synchronize_session=False)
+            )
+            deleted = db.execute(
+                delete(Campaign)
+                .where(Campaign.id == campaign_id)
+                .returning(Campaign.id, Campaign.version)
+                .execution_options(synchronize_session=False)
+            ).all()
+            if not deleted:
+                db.rollback()
+                logger.error(f"Campaign {campaign_id} not found")
                 return False
-                
-            db.delete(campaign)
+            record_deletes(db, deleted)
             db.commit()
+            _campaigns_changed(db, campaign_id)
             logger.info(f"Deleted campaign {campaign_id}")
             return True
                 
@@ -264,4 +689,4 @@ class CampaignService:
             raise PayoutError(str(e))
 
 # Create an instance to be imported by other modules
-campaign_service = CampaignService()
\ No newline at end of file
+campaign_service = CampaignService(serializer=build_response_serializer())
\ No newline at end of file
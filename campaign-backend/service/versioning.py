@@ -0,0 +1,75 @@
+import hashlib
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from typing import Iterable, List, Optional
+from models.models import Campaign, utcnow
+
+class VersionConflictError(Exception):
+    """The campaign changed since the client (or this transaction) read it"""
+    pass
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches ``etag`` (weak comparison, RFC 9110 13.1.2)"""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+def campaign_etag(campaign_id: int, version: int) -> str:
+    return f'"{campaign_id}.{version}"'
+
+def rows_etag(rows: Iterable, *extra) -> str:
+    """ETag of a listing from the id and version of each campaign row on it.
+
+    Every write bumps the version of the campaigns it touches, so the tag
+    changes whenever the listing's body would, and it is known before the
+    payouts are read or anything is serialized.
+    """
+    digest = hashlib.sha256()
+    for row in rows:
+        digest.update(f"{row.id}.{row.version},".encode())
+    digest.update(repr(extra).encode())
+    return f'"{digest.hexdigest()[:32]}"'
+
+def if_match_versions(header: Optional[str], campaign_id: int) -> Optional[List[int]]:
+    """Versions of this campaign an If-Match header accepts; None when it accepts any.
+
+    If-Match uses strong comparison, so weak tags and other campaigns' tags
+    never match and an empty list means the precondition fails.
+    """
+    if header is None or header.strip() == "*":
+        return None
+    prefix = f'"{campaign_id}.'
+    versions = []
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith(prefix) and tag.endswith('"') and tag[len(prefix):-1].isdigit():
+            versions.append(int(tag[len(prefix):-1]))
+    return versions
+
+def lock_campaigns(db: Session, campaign_ids) -> None:
+    """Row-lock campaigns a write deletes or updates in bulk, in id order, before it touches anything else.
+
+    A no-op outside Postgres: SQLite locks the whole database on the first write.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(select(Campaign.id).where(Campaign.id.in_(campaign_ids)).order_by(Campaign.id).with_for_update())
+
+def touch_campaigns(db: Session, campaign_ids, versions: Optional[List[int]] = None) -> int:
+    """Bump version and updated_at of campaigns whose payouts a write changes.
+
+    Call inside the writing transaction. ``campaign_ids`` is a list or a
+    select of ids. With ``versions`` only campaigns still at one of them are
+    bumped, so comparing the returned row count with the expected one is an
+    atomic If-Match check.
+    """
+    statement = update(Campaign).where(Campaign.id.in_(campaign_ids))
+    if versions is not None:
+        statement = statement.where(Campaign.version.in_(versions))
+    return db.execute(
+        statement
+        .values(version=Campaign.version + 1, updated_at=utcnow())
+        .execution_options(synchronize_session=False)
+    ).rowcount
@@ -2,22 +2,38 @@ import pytest
 import sys, os
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import NullPool
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from baeekend.api.routes import router
-from baeekend.database.database import Base, get_db, SQLALCHEMY_DATABASE_URL
+from api.routes import router
+from api.metrics import MetricsMiddleware, instrument_queries
+from service.cache import campaign_cache
+from service.resolution import payout_index
+from database.database import (
+    Base, get_db, get_async_db, get_async_read_db, get_async_read_session_factory, get_async_session_factory,
+    to_async_url, SQLALCHEMY_DATABASE_URL
+)
 
 app = FastAPI()
 app.include_router(router)
+app.add_middleware(MetricsMiddleware)
 
 @pytest.fixture(scope="function")
 def test_db():
     engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+    # TestClient runs each request on its own event loop, so don't pool async connections
+    async_engine = create_async_engine(to_async_url(SQLALCHEMY_DATABASE_URL), poolclass=NullPool)
+    instrument_queries(async_engine.sync_engine)
     TestingSessionLocal = sessionmaker(bind=engine)
+    AsyncTestingSessionLocal = async_sessionmaker(bind=async_engine, expire_on_commit=False)
     Base.metadata.create_all(bind=engine)
+    # Ids restart with every fresh schema, so entries from earlier tests would be stale
+    campaign_cache.clear()
+    payout_index.clear()
 
     def override_get_db():
         db = TestingSessionLocal()
@@ -26,10 +42,31 @@ def test_db():
         finally:
             db.close()
 
+    async def override_get_async_db():
+        async with AsyncTestingSessionLocal() as db:
+            yield db
+
     app.dependency_overrides[get_db] = override_get_db
-    yield
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_async_read_db] = override_get_async_db
+    app.dependency_overrides[get_async_session_factory] = lambda: AsyncTestingSessionLocal
+    app.dependency_overrides[get_async_read_session_factory] = lambda: AsyncTestingSessionLocal
+    yield async_engine
     Base.metadata.drop_all(bind=engine)
+    engine.dispose()
 
 @pytest.fixture(scope="function")
 def client(test_db):
-    return TestClient(app)
\ No newline at end of file
+    return TestClient(app)
+
+@pytest.fixture(scope="function")
+def executed_statements(test_db):
+    """SQL statements the API runs on the async engine, in order"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(test_db.sync_engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(test_db.sync_engine, "before_cursor_execute", record)
@@ -1,5 +1,7 @@
+import json
 import pytest
-from fastapi.testclient import TestClient
+from service.cache import campaign_cache
+
 
 def test_create_campaign(client):
     response = client.post("/api/campaigns/campaigns/", json={
@@ -18,16 +20,35 @@ def test_create_campaign(client):
     assert data["title"] == "Test Campaign"
     assert len(data["payouts"]) == 1
 
+
 def test_get_countries(client):
     response = client.get("/api/campaigns/countries")
     assert response.status_code == 200
     assert len(response.json()) > 0
 
+
+def test_get_countries_conditional(client):
+    from database.database import country_manager
+
+    response = client.get("/api/campaigns/countries")
+    etag = response.headers["etag"]
+    assert "max-age" in response.headers["cache-control"]
+
+    not_modified = client.get("/api/campaigns/countries", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+    # Reloading rebuilds the payload; unchanged data keeps the same ETag
+    country_manager.reload()
+    assert client.get("/api/campaigns/countries").headers["etag"] == etag
+
+
 def test_get_campaigns(client):
     response = client.get("/api/campaigns/")
     assert response.status_code == 200
     assert isinstance(response.json(), list)
 
+
 def test_create_and_delete_payout(client):
     # First create a campaign
     campaign_response = client.post("/api/campaigns/campaigns/", json={
@@ -48,4 +69,951 @@ def test_create_and_delete_payout(client):
     
     # Delete the payout
     delete_response = client.delete(f"/api/campaigns/payouts/{payout_id}")
-    assert delete_response.status_code == 204
\ No newline at end of file
+    assert delete_response.status_code == 204
+
+
+def test_get_campaign_with_payouts(client):
+    campaign_response = client.post("/api/campaigns/campaigns/", json={
+        "title": "Async Campaign",
+        "landing_url": "http://async.com",
+        "is_running": True,
+        "payouts": [
+            {"country": "USA", "amount": 10.00},
+            {"country": "DEU", "amount": 7.50}
+        ]
+    })
+    campaign_id = campaign_response.json()["id"]
+
+    response = client.get(f"/api/campaigns/{campaign_id}")
+    assert response.status_code == 200
+    assert sorted(p["country"] for p in response.json()["payouts"]) == ["DEU", "USA"]
+
+    toggle_response = client.patch(f"/api/campaigns/{campaign_id}/toggle")
+    assert toggle_response.status_code == 200
+    assert toggle_response.json()["is_running"] is False
+    assert len(toggle_response.json()["payouts"]) == 2
+
+
+def test_get_missing_campaign(client):
+    response = client.get("/api/campaigns/999999")
+    assert response.status_code == 404
+
+
+def test_campaign_reads_use_fixed_query_count(client, executed_statements):
+    for n in range(5):
+        client.post("/api/campaigns/campaigns/", json={
+            "title": f"Batch Campaign {n}",
+            "landing_url": f"http://batch{n}.com",
+            "is_running": True,
+            "payouts": [
+                {"country": "USA", "amount": 10.00},
+                {"country": "FRA", "amount": 5.00}
+            ]
+        })
+
+    # One statement for the campaigns and one batched SELECT ... IN for their payouts
+    for path in ("/api/campaigns/", "/api/campaigns/search?q=Batch", "/api/campaigns/1"):
+        client.get(path)  # warm up one-off work such as search backend detection
+        campaign_cache.clear()
+        executed_statements.clear()
+        response = client.get(path)
+        assert response.status_code == 200
+        assert len(executed_statements) == 2, path
+
+
+def test_cursor_pagination(client):
+    for n in range(5):
+        client.post("/api/campaigns/campaigns/", json={
+            "title": f"Paged Campaign {n}",
+            "landing_url": f"http://paged{n}.com",
+            "payouts": []
+        })
+
+    seen = []
+    cursor = ""
+    while cursor is not None:
+        response = client.get("/api/campaigns/", params={"cursor": cursor, "limit": 2})
+        assert response.status_code == 200
+        page = response.json()
+        seen.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+
+    assert len(seen) == 5
+    assert seen == sorted(seen)
+
+    search = client.get("/api/campaigns/search", params={"q": "Paged", "cursor": "", "limit": 3}).json()
+    assert len(search["items"]) == 3
+    assert search["next_cursor"] is not None
+
+    # Offset paging keeps its plain list shape for existing clients
+    assert isinstance(client.get("/api/campaigns/", params={"skip": 2, "limit": 2}).json(), list)
+    assert client.get("/api/campaigns/", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+@pytest.mark.parametrize("path, position", [
+    ("/api/campaigns/", [True]),
+    ("/api/campaigns/", [1.5]),
+    ("/api/campaigns/", ["1"]),
+    ("/api/campaigns/search", ["x", 5]),
+    ("/api/campaigns/search", [0.5, True]),
+    ("/api/campaigns/search", [False, 5]),
+    ("/api/campaigns/search", [None, 5]),
+    ("/api/campaigns/top", [True, 5]),
+    ("/api/campaigns/top", [2.5, 5.0]),
+])
+
+
+def test_cursor_values_are_checked(client, path, position):
+    from service.pagination import encode_cursor
+
+    response = client.get(path, params={"q": "Paged", "country": "DEU", "cursor": encode_cursor(position)})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Cursor does not match this listing"
+
+
+def test_search_ranks_and_matches_substrings(client):
+    for title, url in (
+        ("Winter sale", "http://shop.com"),
+        ("Summer", "http://summer.com"),
+        ("Big summer promotion for everyone", "http://promo.com"),
+    ):
+        client.post("/api/campaigns/campaigns/", json={"title": title, "landing_url": url, "payouts": []})
+
+    response = client.get("/api/campaigns/search", params={"q": "SUMMER"})
+    assert response.status_code == 200
+    titles = [c["title"] for c in response.json()]
+    # The campaign matching in both title and URL ranks first
+    assert titles == ["Summer", "Big summer promotion for everyone"]
+
+    assert [c["title"] for c in client.get("/api/campaigns/search", params={"q": "mmer pro"}).json()] == [
+        "Big summer promotion for everyone"
+    ]
+    # Terms shorter than a trigram still match
+    assert len(client.get("/api/campaigns/search", params={"q": "le"}).json()) == 1
+
+    first = client.get("/api/campaigns/search", params={"q": "summer", "cursor": "", "limit": 1}).json()
+    second = client.get("/api/campaigns/search", params={"q": "summer", "cursor": first["next_cursor"], "limit": 1}).json()
+    assert [c["title"] for c in first["items"] + second["items"]] == titles
+    assert second["next_cursor"] is None
+
+    filtered = client.get("/api/campaigns/", params={"title": "winter"}).json()
+    assert [c["title"] for c in filtered] == ["Winter sale"]
+
+
+def test_bulk_import_ndjson_reports_bad_rows(client):
+    rows = [
+        '{"title": "Imported 1", "landing_url": "http://one.com", "is_running": true, "payouts": [{"country": "USA", "amount": 3}]}',
+        '{"title": "Imported 2", "landing_url": "http://two.com", "payouts": [{"country": "XXX", "amount": 3}]}',
+        'not json',
+        '{"title": "Imported 3", "landing_url": "http://three.com", "payouts": []}',
+    ]
+    response = client.post(
+        "/api/campaigns/import?batch_size=2",
+        # A line that is not UTF-8 is a bad row too, not a failed request
+        content="\n".join(rows).encode() + b'\n{"title": "Latin-1 \xe9t\xe9"}',
+        headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 200
+    report = response.json()
+    assert report["imported"] == 2
+    assert [error["row"] for error in report["errors"]] == [2, 3, 5]
+    assert report["errors"][2]["errors"][0].startswith("Invalid UTF-8")
+
+    campaigns = client.get("/api/campaigns/", params={"title": "Imported"}).json()
+    assert [c["title"] for c in campaigns] == ["Imported 1", "Imported 3"]
+    assert campaigns[0]["payouts"][0]["country"] == "USA"
+
+
+def test_bulk_import_csv(client):
+    body = (
+        "title,landing_url,is_running,payouts\n"
+        "CSV One,http://csv1.com,true,USA:10;DEU:2.5\n"
+        "CSV Two,http://csv2.com,,\n"
+        "CSV Three,http://csv3.com,false,USA:-1\n"
+    )
+    response = client.post("/api/campaigns/import", content=body, headers={"Content-Type": "text/csv"})
+    report = response.json()
+    assert report["imported"] == 2
+    assert report["errors"][0]["row"] == 3
+
+    campaigns = client.get("/api/campaigns/", params={"title": "CSV"}).json()
+    assert len(campaigns[0]["payouts"]) == 2
+    assert campaigns[1]["is_running"] is False
+
+
+def test_export_streams_filtered_campaigns(client):
+    for n, countries in enumerate((["USA", "DEU"], ["FRA"], ["USA"])):
+        client.post("/api/campaigns/campaigns/", json={
+            "title": f"Export {n}",
+            "landing_url": f"http://export{n}.com",
+            "is_running": n != 2,
+            "payouts": [{"country": c, "amount": 1.5} for c in countries]
+        })
+
+    response = client.get("/api/campaigns/export", params={"batch_size": 2})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [c["title"] for c in lines] == ["Export 0", "Export 1", "Export 2"]
+    assert lines == client.get("/api/campaigns/").json()
+
+    usa_running = client.get("/api/campaigns/export", params={"country": "USA", "is_running": True})
+    assert [json.loads(line)["title"] for line in usa_running.text.splitlines()] == ["Export 0"]
+
+    csv_lines = client.get("/api/campaigns/export", params={"format": "csv"}).text.splitlines()
+    assert csv_lines[0] == "id,title,landing_url,is_running,payouts"
+    assert csv_lines[1].endswith("true,USA:1.5;DEU:1.5")
+
+
+class FakeRedis:
+    """Just enough of redis-py for RedisCache"""
+
+    def __init__(self):
+        self.store = {}
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def set(self, key, value, ex=None):
+        self.store[key] = value
+
+    def delete(self, *keys):
+        for key in keys:
+            self.store.pop(key, None)
+
+    def scan_iter(self, match="*"):
+        return [key for key in list(self.store) if key.startswith(match.rstrip("*"))]
+
+
+@pytest.mark.parametrize("backend", ["memory", "redis"])
+def test_campaign_cache_read_through_and_invalidation(client, executed_statements, backend):
+    from service.cache import LRUCache, RedisCache
+
+    original = campaign_cache.backend
+    campaign_cache.backend = LRUCache() if backend == "memory" else RedisCache(FakeRedis())
+    try:
+        campaign_id = client.post("/api/campaigns/campaigns/", json={
+            "title": "Cached",
+            "landing_url": "http://cached.com",
+            "payouts": [{"country": "USA", "amount": 2}]
+        }).json()["id"]
+        before = campaign_cache.stats()
+
+        first = client.get(f"/api/campaigns/{campaign_id}").json()
+        executed_statements.clear()
+        assert client.get(f"/api/campaigns/{campaign_id}").json() == first
+        assert executed_statements == []
+
+        stats = client.get("/api/campaigns/cache/stats").json()
+        assert stats["backend"] == backend
+        assert stats["hits"] - before["hits"] == 1
+        assert stats["misses"] - before["misses"] == 1
+
+        client.patch(f"/api/campaigns/{campaign_id}", json={"title": "Renamed"})
+        assert client.get(f"/api/campaigns/{campaign_id}").json()["title"] == "Renamed"
+
+        payout_id = first["payouts"][0]["id"]
+        client.patch(f"/api/campaigns/payouts/{payout_id}", json={"amount": 9})
+        assert client.get(f"/api/campaigns/{campaign_id}").json()["payouts"][0]["amount"] == "9.0"
+
+        client.delete(f"/api/campaigns/{campaign_id}")
+        assert client.get(f"/api/campaigns/{campaign_id}").status_code == 404
+    finally:
+        campaign_cache.backend = original
+
+
+def test_bulk_status_update_and_delete(client, test_db, executed_statements):
+    from sqlalchemy import create_engine, func, select
+    from database.database import SQLALCHEMY_DATABASE_URL
+    from models.models import Payout
+
+    ids = [
+        client.post("/api/campaigns/campaigns/", json={
+            "title": f"{'Partner' if n < 3 else 'Other'} {n}",
+            "landing_url": f"http://bulk{n}.com",
+            "is_running": True,
+            "payouts": [{"country": "USA", "amount": 1}]
+        }).json()["id"]
+        for n in range(5)
+    ]
+    client.get(f"/api/campaigns/{ids[0]}")  # cached entries must be invalidated
+
+    executed_statements.clear()
+    response = client.patch("/api/campaigns/bulk/status", json={"filter": {"title": "Partner"}, "is_running": False})
+    assert response.json() == {"affected": 3}
+    # A single UPDATE ... RETURNING, plus flagging the affected payout summary rows and logging the change
+    assert len(executed_statements) == 3
+    assert client.get(f"/api/campaigns/{ids[0]}").json()["is_running"] is False
+    assert [c["id"] for c in client.get("/api/campaigns/", params={"is_running": True}).json()] == ids[3:]
+
+    # Omitting is_running flips each selected campaign
+    client.patch("/api/campaigns/bulk/status", json={"ids": [ids[0], ids[4]]})
+    running = [c["id"] for c in client.get("/api/campaigns/", params={"is_running": True}).json()]
+    assert running == [ids[0], ids[3]]
+
+    response = client.patch("/api/campaigns/bulk", json={"ids": ids[:2], "changes": {"landing_url": "renamed"}})
+    assert response.json() == {"affected": 2}
+    assert client.get(f"/api/campaigns/{ids[1]}").json()["landing_url"] == "https://www.renamed.com"
+
+    assert client.post("/api/campaigns/bulk/delete", json={"ids": ids[3:]}).json() == {"affected": 2}
+    assert len(client.get("/api/campaigns/").json()) == 3
+    # A single delete takes the payouts with it, like the bulk one
+    assert client.delete(f"/api/campaigns/{ids[2]}").status_code == 204
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    try:
+        with engine.connect() as conn:
+            assert conn.scalars(select(Payout.campaign_id).order_by(Payout.campaign_id)).all() == ids[:2]
+            assert conn.scalar(select(func.count(Payout.id)).where(Payout.campaign_id.is_(None))) == 0
+    finally:
+        engine.dispose()
+
+    assert client.post("/api/campaigns/bulk/delete", json={"filter": {}}).status_code == 422
+    assert client.post("/api/campaigns/bulk/delete", json={"ids": ids, "filter": {"title": "x"}}).status_code == 422
+
+
+def test_pool_metrics_track_checkouts_and_timeouts(test_db):
+    from sqlalchemy import create_engine, exc
+    from database.database import SQLALCHEMY_DATABASE_URL
+    from database.pool import InstrumentedQueuePool, instrument_engine, pool_metrics
+
+    engine = create_engine(
+        SQLALCHEMY_DATABASE_URL, poolclass=InstrumentedQueuePool,
+        pool_size=1, max_overflow=0, pool_timeout=0.05,
+    )
+    metrics = instrument_engine(engine, "test")
+    try:
+        held = engine.connect()
+        assert metrics.snapshot()["checked_out"] == 1
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+        held.close()
+
+        snapshot = metrics.snapshot()
+        assert snapshot["timeouts"] == 1
+        assert snapshot["checkouts"] == snapshot["checkins"] == 1
+        assert snapshot["wait_count"] == 2
+        assert snapshot["wait_max_ms"] >= 50
+
+        engine.dispose()  # the recreated pool keeps reporting to the same metrics
+        engine.connect().close()
+        assert metrics.snapshot()["wait_count"] == 3
+    finally:
+        pool_metrics.pop("test", None)
+        engine.dispose()
+
+
+def test_migrations_match_models(tmp_path):
+    from alembic import command
+    from sqlalchemy import create_engine
+    from database.database import alembic_config, init_db
+
+    url = f"sqlite:///{tmp_path / 'migrated.db'}"
+    engine = create_engine(url)
+    init_db(engine)
+    init_db(engine)  # already at head: a no-op
+    command.check(alembic_config(url))  # raises if the models drifted from the migrations
+    engine.dispose()
+
+
+def test_unique_payout_migration_stops_on_duplicates(tmp_path, monkeypatch):
+    from alembic import command
+    from sqlalchemy import create_engine, text
+    from database.database import alembic_config
+
+    url = f"sqlite:///{tmp_path / 'duplicated.db'}"
+    command.upgrade(alembic_config(url), "0002")
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO campaigns (id, title, landing_url, is_running) VALUES (1, 'Dup', 'http://dup.com', 1)"))
+        conn.execute(text(
+            "INSERT INTO payouts (id, campaign_id, country, amount) VALUES (1, 1, 'USA', 1), (2, 1, 'USA', 2), (3, 1, 'DEU', 3)"
+        ))
+
+    with pytest.raises(RuntimeError, match=r"campaign 1 USA \(2 rows\)"):
+        command.upgrade(alembic_config(url), "0003")
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM payouts")).scalar() == 3
+
+    # Collapsing them has to be asked for
+    monkeypatch.setenv("MIGRATE_DEDUPLICATE_PAYOUTS", "1")
+    command.upgrade(alembic_config(url), "0003")
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT id, amount FROM payouts ORDER BY id")).all() == [(2, 2.0), (3, 3.0)]
+    engine.dispose()
+
+
+def test_payout_and_status_queries_use_indexes(client, test_db):
+    from sqlalchemy import create_engine, select
+    from database.database import SQLALCHEMY_DATABASE_URL
+    from models.models import Campaign, Payout, is_running_clause
+
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+
+    def plan(statement):
+        sql = str(statement.compile(engine, compile_kwargs={"literal_binds": True}))
+        with engine.connect() as conn:
+            return " ".join(row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+
+    try:
+        assert "ux_payouts_campaign_country" in plan(select(Payout).where(Payout.campaign_id == 1))
+        assert "ux_payouts_campaign_country" in plan(
+            select(Payout).where(Payout.campaign_id == 1, Payout.country == "USA")
+        )
+        assert "ix_payouts_country" in plan(select(Payout).where(Payout.country == "USA"))
+        assert "ix_campaigns_running" in plan(
+            select(Campaign).where(is_running_clause(True)).order_by(Campaign.id).limit(20)
+        )
+        assert "ix_campaigns_paused" in plan(
+            select(Campaign).where(is_running_clause(False)).order_by(Campaign.id).limit(20)
+        )
+    finally:
+        engine.dispose()
+
+
+def test_one_payout_per_country(client, monkeypatch):
+    campaign = {"title": "Dup", "landing_url": "http://dup.com", "is_running": True}
+    response = client.post("/api/campaigns/campaigns/", json={
+        **campaign, "payouts": [{"country": "USA", "amount": 1}, {"country": "USA", "amount": 2}]
+    })
+    assert response.status_code == 422
+
+    campaign_id = client.post("/api/campaigns/campaigns/", json={
+        **campaign, "payouts": [{"country": "USA", "amount": 1}]
+    }).json()["id"]
+    response = client.post(f"/api/campaigns/{campaign_id}/payouts", json={"country": "USA", "amount": 5})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Payout for USA already exists"
+
+    # A constraint failure on an amount-only update names the payout's own country
+    from sqlalchemy.exc import IntegrityError
+    from service import service
+
+    def violate(db, campaign_ids):
+        raise IntegrityError("INSERT", {}, Exception("constraint failed"))
+
+    monkeypatch.setattr(service, "record_changes", violate)
+    payout_id = client.get(f"/api/campaigns/{campaign_id}").json()["payouts"][0]["id"]
+    response = client.patch(f"/api/campaigns/payouts/{payout_id}", json={"amount": 3})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Payout for USA already exists"
+
+
+def test_payout_report_summary_tracks_writes(client):
+    def report(**params):
+        return client.get("/api/campaigns/reports/payouts", params=params).json()["rows"]
+
+    ids = [
+        client.post("/api/campaigns/campaigns/", json={
+            "title": f"Report {n}",
+            "landing_url": f"http://report{n}.com",
+            "is_running": True,
+            "payouts": [{"country": country, "amount": amount * (n + 1)} for country, amount in payouts]
+        }).json()["id"]
+        for n, payouts in enumerate(([("USA", 10), ("GUF", 4)], [("USA", 5), ("FRA", 2)]))
+    ]
+
+    rows = report()
+    assert rows == report(source="live")
+    assert rows[-1] == {
+        "country": "USA", "currency_code": "USD / US$", "is_running": True,
+        "count": 2, "total": 20.0, "min": 10.0, "max": 10.0, "average": 10.0,
+    }
+
+    # Writes after the first build are folded in by refreshing only the stale countries
+    client.patch(f"/api/campaigns/{ids[1]}/toggle")
+    client.post(f"/api/campaigns/{ids[0]}/payouts", json={"country": "FRA", "amount": 1})
+    rows = report()
+    assert rows == report(source="live")
+    assert [(r["country"], r["is_running"], r["count"]) for r in rows] == [
+        ("FRA", True, 1), ("FRA", False, 1), ("GUF", True, 1), ("USA", True, 1), ("USA", False, 1)
+    ]
+
+    # France and French Guiana both pay out in francs
+    francs = [r for r in report(group_by="currency", is_running=True) if r["currency_code"] == "FRF"]
+    assert francs == [{
+        "country": None, "currency_code": "FRF", "is_running": True,
+        "count": 2, "total": 5.0, "min": 1.0, "max": 4.0, "average": 2.5,
+    }]
+
+    client.post("/api/campaigns/bulk/delete", json={"ids": ids})
+    assert report() == report(source="live") == []
+
+
+@pytest.mark.parametrize("upsert", [True, False])
+def test_replace_payout_matrix(client, executed_statements, monkeypatch, upsert):
+    if not upsert:
+        from service import service
+        monkeypatch.delitem(service.UPSERT_INSERTS, "sqlite")  # exercise the diff fallback
+
+    campaign = client.post("/api/campaigns/campaigns/", json={
+        "title": "Matrix",
+        "landing_url": "http://matrix.com",
+        "is_running": True,
+        "payouts": [{"country": "USA", "amount": 10}, {"country": "DEU", "amount": 4}, {"country": "FRA", "amount": 2}]
+    }).json()
+    before = {p["country"]: p["id"] for p in campaign["payouts"]}
+    client.get(f"/api/campaigns/{campaign['id']}")  # cached, must be invalidated
+
+    executed_statements.clear()
+    response = client.put(f"/api/campaigns/{campaign['id']}/payouts/", json=[
+        {"country": "USA", "amount": 10}, {"country": "DEU", "amount": 6}, {"country": "GBR", "amount": 3}
+    ])
+    assert response.status_code == 200
+    payouts = {p["country"]: p for p in response.json()}
+    assert {country: p["amount"] for country, p in payouts.items()} == {"USA": "10.0", "DEU": "6.0", "GBR": "3.0"}
+    assert payouts["USA"]["id"] == before["USA"] and payouts["DEU"]["id"] == before["DEU"]
+    if upsert:
+        # exists check, version bump, summary flag, DELETE, one upsert, change log, final SELECT
+        assert len(executed_statements) == 7
+    assert client.get(f"/api/campaigns/{campaign['id']}").json()["payouts"] == response.json()
+
+    assert client.put(f"/api/campaigns/{campaign['id']}/payouts/", json=[]).json() == []
+    assert client.put("/api/campaigns/999999/payouts/", json=[]).status_code == 404
+    assert client.put(f"/api/campaigns/{campaign['id']}/payouts/", json=[
+        {"country": "USA", "amount": 1}, {"country": "USA", "amount": 2}
+    ]).status_code == 422
+
+
+def test_create_campaign_is_one_transaction(client, executed_statements):
+    countries = ["USA", "DEU", "FRA", "GBR", "ITA"]
+    response = client.post("/api/campaigns/campaigns/", json={
+        "title": "Batch",
+        "landing_url": "http://batch.com",
+        "is_running": True,
+        "payouts": [{"country": c, "amount": n + 1} for n, c in enumerate(countries)]
+    })
+    assert [p["country"] for p in response.json()["payouts"]] == countries
+    # campaign INSERT, one batched payout INSERT ... RETURNING, summary flag, change log; no refreshes
+    assert len(executed_statements) == 4
+    assert client.get(f"/api/campaigns/{response.json()['id']}").json() == response.json()
+
+
+def test_server_timing_and_metrics(client):
+    import re
+    from fastapi.testclient import TestClient as MainClient
+    from api.metrics import HISTOGRAMS
+    from main import app as main_app
+
+    for histogram in HISTOGRAMS:
+        histogram.clear()
+    campaign_id = client.post("/api/campaigns/campaigns/", json={
+        "title": "Timed", "landing_url": "http://timed.com", "is_running": True,
+        "payouts": [{"country": "USA", "amount": 1}]
+    }).json()["id"]
+    campaign_cache.clear()
+
+    timing = client.get(f"/api/campaigns/{campaign_id}").headers["server-timing"]
+    assert re.fullmatch(r'app;dur=[\d.]+, db;dur=[\d.]+;desc="2 queries", serialize;dur=[\d.]+', timing)
+
+    body = MainClient(main_app).get("/metrics").text
+    route = 'method="GET",route="/api/campaigns/{campaign_id}"'
+    assert f'http_request_duration_seconds_count{{{route},status="200"}} 1' in body
+    assert f'http_request_db_queries_bucket{{{route},le="2"}} 1' in body
+    assert f'http_request_db_queries_bucket{{{route},le="1"}} 0' in body
+    assert 'db_pool_checked_out{engine="async"}' in body
+
+
+def test_row_serializers_match_orm_responses(client, monkeypatch):
+    from service.serialization import build_response_serializer
+    from service.service import campaign_service
+
+    for n, amounts in enumerate([(0.1, 2.5), (1234567.89, 1e-05), (100, 3.3333333333333335)]):
+        client.post("/api/campaigns/campaigns/", json={
+            "title": f"Sérialisé {n} \"quoted\"",
+            "landing_url": f"http://serial{n}.com",
+            "is_running": n % 2 == 0,
+            "payouts": [{"country": "USA", "amount": amounts[0]}, {"country": "FRA", "amount": amounts[1]}]
+        })
+    requests = [
+        ("/api/campaigns/", {}),
+        ("/api/campaigns/", {"is_running": True, "limit": 1, "cursor": ""}),
+        ("/api/campaigns/search", {"q": "serial"}),
+        ("/api/campaigns/search", {"q": "serial", "limit": 2, "cursor": ""}),
+        ("/api/campaigns/", {"title": "nothing matches"}),
+    ]
+
+    bodies = {}
+    for name in ("orm", "typeadapter", "orjson"):
+        monkeypatch.setattr(campaign_service, "serializer", build_response_serializer(name))
+        bodies[name] = [client.get(path, params=params).content for path, params in requests]
+        bodies[name].append(client.post("/api/campaigns/batch", json={"ids": [3, 9, 1]}).content)
+    assert bodies["typeadapter"] == bodies["orm"]
+    assert bodies["orjson"] == bodies["orm"]
+    assert json.loads(bodies["orm"][0])[1]["payouts"][1]["amount"] == "0.00001"
+
+
+def test_reads_route_to_healthy_replicas(client, tmp_path, monkeypatch):
+    from sqlalchemy import create_engine, func, select
+    from sqlalchemy.exc import OperationalError
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.orm import Session, sessionmaker
+    from sqlalchemy.pool import NullPool
+    from database.database import Base, get_async_read_db
+    from database.replicas import ReplicaSet, RoutingSession
+    from models.models import Campaign
+
+    # Two databases standing in for a primary and a replica that has not caught up
+    urls = {name: f"sqlite:///{tmp_path / name}.db" for name in ("primary", "replica")}
+    for name, url in urls.items():
+        engine = create_engine(url)
+        Base.metadata.create_all(engine)
+        with Session(engine) as db:
+            db.add(Campaign(title=name, landing_url="http://replica.com", is_running=True))
+            db.commit()
+        engine.dispose()
+
+    primary, replica = create_engine(urls["primary"]), create_engine(urls["replica"])
+    replicas = ReplicaSet([create_engine(f"sqlite:///{tmp_path}/missing/replica.db"), replica])
+    ReadSession = sessionmaker(bind=primary, class_=RoutingSession, replicas=replicas)
+
+    with ReadSession() as db, pytest.raises(OperationalError):
+        db.scalar(select(Campaign.title))  # the unreachable replica's turn
+    assert [r["healthy"] for r in replicas.status()] == [False, True]
+
+    with ReadSession() as db:
+        assert db.scalar(select(Campaign.title)) == "replica"
+        db.add(Campaign(title="written", landing_url="http://replica.com", is_running=True))
+        db.flush()
+        # Once the session has written, it reads from the primary and sees its own write
+        assert db.scalars(select(Campaign.title).order_by(Campaign.id)).all() == ["primary", "written"]
+        db.commit()
+    with ReadSession() as db:
+        assert db.scalar(select(func.count(Campaign.id))) == 1
+
+    # GET endpoints take the read session
+    async_primary, async_replica = (
+        create_async_engine(url.replace("sqlite", "sqlite+aiosqlite"), poolclass=NullPool)
+        for url in (urls["primary"], urls["replica"])
+    )
+    AsyncReadSession = async_sessionmaker(
+        bind=async_primary, sync_session_class=RoutingSession,
+        replicas=ReplicaSet([async_replica.sync_engine]), expire_on_commit=False
+    )
+
+    async def read_db():
+        async with AsyncReadSession() as db:
+            yield db
+
+    monkeypatch.setitem(client.app.dependency_overrides, get_async_read_db, read_db)
+    assert [c["title"] for c in client.get("/api/campaigns/").json()] == ["replica"]
+    # except the reads that fill the campaign cache, which must not go back in time
+    assert client.get("/api/campaigns/1").json()["title"] == "primary"
+    assert client.get("/api/campaigns/1").json()["title"] == "primary"
+
+
+def test_country_registry_lookups_and_snapshot(tmp_path):
+    import shutil
+    from database.countries import COUNTRIES_PATH, read_rows, write_snapshot
+    from database.database import country_manager
+
+    assert country_manager.get_country_data("KOR").name == "KOREA, REPUBLIC OF"
+    assert country_manager.find_country("  korea,  Republic of ").code == "KOR"
+    assert country_manager.find_country("Atlantis") is None
+    # Every code listed in a combined currency_code is indexed
+    assert {c.code for c in country_manager.get_countries_by_currency("usd")} >= {"USA", "ASM", "GUM"}
+    with pytest.raises(AttributeError):
+        country_manager.registry().by_code = {}
+
+    path = shutil.copy2(COUNTRIES_PATH, tmp_path)
+    rows = read_rows(path)
+    write_snapshot(path)
+    assert read_rows(path) == rows
+    # Editing the JSON makes the snapshot stale
+    with open(path) as f:
+        data = json.load(f)
+    data["countries"][0]["COUNTRY"] = "RENAMED"
+    with open(path, "w") as f:
+        json.dump(data, f)
+    assert read_rows(path)[0][1] == "RENAMED"
+
+
+def test_payout_resolution_follows_writes_without_queries(client, executed_statements):
+    def create(n, payouts):
+        return client.post("/api/campaigns/campaigns/", json={
+            "title": f"Resolve {n}",
+            "landing_url": f"http://resolve{n}.com",
+            "is_running": True,
+            "payouts": [{"country": country, "amount": amount} for country, amount in payouts]
+        }).json()["id"]
+
+    first = create(1, [("USA", 2.5), ("FRA", 1)])
+    assert client.get(f"/api/campaigns/{first}/resolve", params={"country": "USA"}).json() == {
+        "campaign_id": first, "country": "USA", "is_running": True, "amount": "2.5", "currency_code": "USD / US$",
+    }
+
+    # Loaded by the first lookup; campaigns created afterwards go in without a read
+    second = create(2, [("USA", 4)])
+    executed_statements.clear()
+    response = client.post("/api/campaigns/resolve", json={"pairs": [
+        {"campaign_id": second, "country": "USA"},
+        {"campaign_id": first, "country": "DEU"},
+        {"campaign_id": 999, "country": "USA"},
+    ]})
+    assert executed_statements == []
+    assert [r and (r["amount"], r["is_running"]) for r in response.json()["results"]] == [("4.0", True), (None, True), None]
+
+    client.patch(f"/api/campaigns/{first}/toggle")
+    client.put(f"/api/campaigns/{first}/payouts/", json=[{"country": "DEU", "amount": 3}])
+    client.delete(f"/api/campaigns/{second}")
+    assert client.get(f"/api/campaigns/{second}/resolve", params={"country": "USA"}).status_code == 404
+    client.post("/api/campaigns/import", content=json.dumps(
+        {"title": "Imported", "landing_url": "imported.com", "payouts": [{"country": "USA", "amount": 6}]}
+    ), headers={"Content-Type": "application/x-ndjson"})
+    imported = client.get("/api/campaigns/", params={"title": "Imported"}).json()[0]["id"]
+
+    executed_statements.clear()
+    results = client.post("/api/campaigns/resolve", json={"pairs": [
+        {"campaign_id": first, "country": "DEU"},
+        {"campaign_id": first, "country": "USA"},
+        {"campaign_id": imported, "country": "USA"},
+    ]}).json()["results"]
+    assert executed_statements == []
+    assert [(r["amount"], r["is_running"]) for r in results] == [("3.0", False), (None, False), ("6.0", False)]
+    assert client.post("/api/campaigns/resolve", json={"pairs": []}).status_code == 422
+
+
+def test_top_campaigns_per_country(client):
+    def create(n, amount, is_running=True):
+        return client.post("/api/campaigns/campaigns/", json={
+            "title": f"Top {n}",
+            "landing_url": f"http://top{n}.com",
+            "is_running": is_running,
+            "payouts": [{"country": "DEU", "amount": amount}, {"country": "FRA", "amount": 1}]
+        }).json()["id"]
+
+    ids = [create(n, amount) for n, amount in enumerate([5, 9, 5, 7])]
+    paused = create(4, 100, is_running=False)
+
+    def ranking(limit=10, cursor=""):
+        return client.get("/api/campaigns/top", params={"country": "DEU", "limit": limit, "cursor": cursor}).json()
+
+    # Highest amount first, equal amounts by id; paused campaigns are left out
+    first = ranking(limit=2)
+    assert first["currency_code"] == "DEM"
+    assert first["items"] == [{"campaign_id": ids[1], "amount": "9.0"}, {"campaign_id": ids[3], "amount": "7.0"}]
+    second = ranking(limit=2, cursor=first["next_cursor"])
+    assert [item["campaign_id"] for item in second["items"]] == [ids[0], ids[2]]
+    assert ranking(limit=2, cursor=second["next_cursor"]) == {"country": "DEU", "currency_code": "DEM", "items": [], "next_cursor": None}
+
+    # Toggles, payout writes and deletes move campaigns in and out of the ranking
+    client.patch(f"/api/campaigns/{paused}/toggle")
+    client.patch(f"/api/campaigns/{ids[1]}/toggle")
+    deu = next(p for p in client.get(f"/api/campaigns/{ids[0]}/payouts/").json() if p["country"] == "DEU")
+    client.patch(f"/api/campaigns/payouts/{deu['id']}", json={"amount": 8})
+    client.delete(f"/api/campaigns/{ids[3]}")
+    assert [(item["campaign_id"], item["amount"]) for item in ranking()["items"]] == [
+        (paused, "100.0"), (ids[0], "8.0"), (ids[2], "5.0")
+    ]
+    # A cursor still places correctly after its last entry has moved
+    assert [item["campaign_id"] for item in ranking(cursor=second["next_cursor"])["items"]] == []
+    assert client.get("/api/campaigns/top", params={"country": "DEU", "cursor": "bogus"}).status_code == 400
+
+
+@pytest.mark.parametrize("serializer", ["orm", "orjson"])
+def test_campaigns_batch_keeps_order_and_reports_missing(client, executed_statements, monkeypatch, serializer):
+    from service import service
+    from service.serialization import build_response_serializer
+
+    monkeypatch.setattr(service.campaign_service, "serializer", build_response_serializer(serializer))
+    ids = [
+        client.post("/api/campaigns/campaigns/", json={
+            "title": f"Batch {n}",
+            "landing_url": f"http://batch{n}.com",
+            "payouts": [{"country": "USA", "amount": n + 1}]
+        }).json()["id"]
+        for n in range(5)
+    ]
+
+    executed_statements.clear()
+    response = client.post("/api/campaigns/batch", json={"ids": [ids[3], 404, ids[0], ids[3], ids[4]]})
+    body = response.json()
+    assert [item["id"] for item in body["items"]] == [ids[3], ids[0], ids[4]]
+    assert body["items"][0]["payouts"][0]["amount"] == "4.0"
+    assert body["missing"] == [404]
+    # One query for the campaigns, one for their payouts
+    assert len(executed_statements) == 2
+
+    # Longer lists are read in chunks, still two queries per chunk
+    monkeypatch.setattr(service, "MULTI_GET_CHUNK", 2)
+    executed_statements.clear()
+    body = client.post("/api/campaigns/batch", json={"ids": ids[::-1]}).json()
+    assert [item["id"] for item in body["items"]] == ids[::-1]
+    assert len(executed_statements) == 6
+
+    assert client.post("/api/campaigns/batch", json={"ids": []}).status_code == 422
+
+
+@pytest.mark.parametrize("serializer", ["orm", "orjson"])
+def test_etags_and_version_preconditions(client, monkeypatch, serializer):
+    from service import service
+    from service.serialization import build_response_serializer
+
+    monkeypatch.setattr(service.campaign_service, "serializer", build_response_serializer(serializer))
+    campaign = client.post("/api/campaigns/campaigns/", json={
+        "title": "Tagged",
+        "landing_url": "http://tagged.com",
+        "payouts": [{"country": "USA", "amount": 5}]
+    }).json()
+    url = f"/api/campaigns/{campaign['id']}"
+    assert campaign["version"] == 1 and campaign["updated_at"]
+
+    single = client.get(url)
+    listing = client.get("/api/campaigns/", params={"limit": 50})
+    page = client.get("/api/campaigns/", params={"limit": 50, "cursor": ""})
+    assert single.headers["ETag"] == f'"{campaign["id"]}.1"'
+    for response in (single, listing, page):
+        assert client.get(response.url, headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+    # Payout writes bump the campaign's version, so every tag above goes stale
+    payout_id = campaign["payouts"][0]["id"]
+    assert client.patch(f"/api/campaigns/payouts/{payout_id}", json={"amount": 7}).status_code == 200
+    assert client.get(url).json()["version"] == 2
+    for response in (single, listing, page):
+        assert client.get(response.url, headers={"If-None-Match": response.headers["ETag"]}).status_code == 200
+
+    # If-Match turns updates into compare-and-set
+    stale = single.headers["ETag"]
+    assert client.patch(url, json={"title": "Lost"}, headers={"If-Match": stale}).status_code == 412
+    assert client.patch(f"/api/campaigns/payouts/{payout_id}", json={"amount": 1}, headers={"If-Match": stale}).status_code == 412
+    updated = client.patch(url, json={"title": "Won"}, headers={"If-Match": f'"{campaign["id"]}.2"'})
+    assert updated.status_code == 200
+    assert updated.headers["ETag"] == f'"{campaign["id"]}.3"'
+    body = client.get(url).json()
+    assert (body["title"], body["version"], body["payouts"][0]["amount"]) == ("Won", 3, "7.0")
+
+
+def test_change_feed_follows_writes(client, test_db, monkeypatch):
+    import asyncio
+    import threading
+    import time
+    from datetime import timedelta
+    from sqlalchemy import update
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    from models.models import Campaign
+    from service import async_service
+    from service.changes import record_changes
+    from service.resolution import payout_index
+
+    campaign = client.post("/api/campaigns/campaigns/", json={
+        "title": "Fed",
+        "landing_url": "http://fed.com",
+        "is_running": True,
+        "payouts": [{"country": "USA", "amount": 5}]
+    }).json()
+    url = f"/api/campaigns/{campaign['id']}"
+    client.patch(url, json={"title": "Fed twice"})
+    client.patch(url, json={"title": "Fed twice"})  # no change, nothing logged
+    client.patch(f"/api/campaigns/payouts/{campaign['payouts'][0]['id']}", json={"amount": 6})
+    client.delete(url)
+
+    feed = client.get("/api/campaigns/changes").json()
+    assert [(c["campaign_id"], c["version"], c["deleted"]) for c in feed["changes"]] == [
+        (campaign["id"], 1, False), (campaign["id"], 2, False), (campaign["id"], 3, False), (campaign["id"], 3, True)
+    ]
+    assert feed["next_since"] == feed["changes"][-1]["seq"] == client.get("/api/campaigns/changes/head").json()["seq"]
+    first = client.get("/api/campaigns/changes", params={"limit": 1}).json()
+    assert [c["seq"] for c in client.get("/api/campaigns/changes", params={"since": first["next_since"]}).json()["changes"]] == [
+        c["seq"] for c in feed["changes"][1:]
+    ]
+
+    # A long-poll is woken by the commit, not by re-reading the log
+    monkeypatch.setattr(async_service, "CHANGE_FEED_POLL_INTERVAL", 30)
+    polled = {}
+
+    def long_poll():
+        started = time.perf_counter()
+        polled["body"] = client.get("/api/campaigns/changes", params={"since": feed["next_since"], "wait": 20}).json()
+        polled["seconds"] = time.perf_counter() - started
+
+    poller = threading.Thread(target=long_poll)
+    poller.start()
+    time.sleep(0.3)
+    other = client.post("/api/campaigns/campaigns/", json={
+        "title": "Other", "landing_url": "http://other.com", "is_running": True, "payouts": [{"country": "DEU", "amount": 2}]
+    }).json()
+    poller.join(10)
+    assert [c["campaign_id"] for c in polled["body"]["changes"]] == [other["id"]]
+    assert polled["seconds"] < 5
+
+    # Server-Sent Events carry the seq as the event id
+    async def first_event():
+        stream = async_service.async_change_feed.stream(async_sessionmaker(test_db), feed["next_since"])
+        try:
+            return await stream.__anext__()
+        finally:
+            await stream.aclose()
+    event = asyncio.run(first_event())
+    seq = polled["body"]["next_since"]
+    assert event.startswith(f"id: {seq}\nevent: change\ndata: ".encode())
+    assert json.loads(event.split(b"data: ")[1])["campaign_id"] == other["id"]
+
+    # The payout index picks up writes logged by another worker
+    assert client.get(f"/api/campaigns/{other['id']}/resolve", params={"country": "DEU"}).json()["is_running"] is True
+
+    async def write_elsewhere():
+        async with async_sessionmaker(test_db)() as db:
+            def pause(session):
+                session.execute(update(Campaign).where(Campaign.id == other["id"]).values(is_running=False, version=Campaign.version + 1))
+                record_changes(session, [other["id"]])
+                session.commit()
+            await db.run_sync(pause)
+            return await db.run_sync(payout_index.catch_up)
+    assert asyncio.run(write_elsewhere()) == [other["id"]]
+    assert client.get(f"/api/campaigns/{other['id']}/resolve", params={"country": "DEU"}).json()["is_running"] is False
+
+    # Consumers behind the pruned part of the log have to resync
+    async def prune():
+        async with async_sessionmaker(test_db)() as db:
+            return await async_service.async_change_feed.prune(db, timedelta(0))
+    assert asyncio.run(prune()) == seq
+    assert client.get("/api/campaigns/changes", params={"since": feed["next_since"]}).status_code == 410
+    assert client.get("/api/campaigns/changes", params={"since": seq}).json()["changes"][0]["seq"] == seq + 1
+
+
+@pytest.mark.parametrize("races, status", [(1, 200), (3, 409)])
+def test_toggle_redoes_flips_that_lose_a_race(client, monkeypatch, races, status):
+    from sqlalchemy import update
+    from models.models import Campaign
+    from service import service
+
+    campaign = client.post("/api/campaigns/campaigns/", json={
+        "title": "Racy", "landing_url": "http://racy.com", "is_running": True, "payouts": []
+    }).json()
+    get_campaign = service.campaign_service.get_campaign
+    raced = []
+
+    def write_in_between(db, campaign_id):
+        found = get_campaign(db, campaign_id)
+        # Another write bumps the version between the toggle's read and its UPDATE
+        if len(raced) < races:
+            raced.append(db.connection().execute(
+                update(Campaign).where(Campaign.id == campaign_id).values(version=Campaign.version + 1)
+            ))
+        return found
+
+    monkeypatch.setattr(service.campaign_service, "get_campaign", write_in_between)
+    response = client.patch(f"/api/campaigns/{campaign['id']}/toggle")
+    assert response.status_code == status
+    monkeypatch.undo()
+    assert client.get(f"/api/campaigns/{campaign['id']}").json()["is_running"] is (status != 200)
+
+
+def test_delete_wins_a_race_with_an_update(client, monkeypatch):
+    from sqlalchemy import update
+    from models.models import Campaign
+    from service import service
+
+    campaign = client.post("/api/campaigns/campaigns/", json={
+        "title": "Racy", "landing_url": "http://racy.com", "is_running": True, "payouts": []
+    }).json()
+    lock_campaigns = service.lock_campaigns
+
+    def write_in_between(db, campaign_ids):
+        # Another write bumps the version just before the delete takes its lock
+        db.connection().execute(update(Campaign).where(Campaign.id.in_(campaign_ids)).values(version=Campaign.version + 1))
+        return lock_campaigns(db, campaign_ids)
+
+    monkeypatch.setattr(service, "lock_campaigns", write_in_between)
+    assert client.delete(f"/api/campaigns/{campaign['id']}").status_code == 204
+    monkeypatch.undo()
+    assert client.get(f"/api/campaigns/{campaign['id']}").status_code == 404
+    assert [(c["version"], c["deleted"]) for c in client.get("/api/campaigns/changes").json()["changes"]][-1] == (2, True)